@@ -0,0 +1,160 @@
+import json
+import logging
+import os
+import threading
+from datetime import datetime
+
+
+class AggregateIndex:
+    """
+    任务统计聚合索引：任务名集合、每天每个任务的秒数、每天总秒数和每个任务的累计秒数。
+    由 TaskManager.end_current_task 增量更新，下拉框、每日日志和图表直接查询，
+    与历史长度无关。
+    持久化方式：快照文件 + 追加式增量日志。每次更新只追加一行，关闭时写入新快照；
+    快照不存在时从存储中的全部任务记录重建一次。
+    快照记录所属的存储后端（storage.source()）和已记录的任务数，加载时与存储比对，
+    切换了存储后端或上次在写入存储后、更新索引前崩溃时同样重建。
+    """
+
+    def __init__(self, storage, path="task_aggregates.json"):
+        """
+        Args:
+            storage: 存储后端（用于首次重建）
+            path (str): 快照文件路径，增量日志为 <path>.journal
+        """
+        self.storage = storage
+        self.path = path
+        self.journal_path = path + ".journal"
+        self._lock = threading.Lock()
+        self.data = self.load()
+        self._journal = open(self.journal_path, "a")
+
+    def _empty(self):
+        return {"source": self.storage.source(), "sessions": 0,
+                "tasks": [], "days": {}, "day_totals": {}, "task_totals": {}}
+
+    def load(self):
+        """
+        加载快照并重放增量日志；没有快照或与存储不一致时从存储重建
+        """
+        data = None
+        if os.path.exists(self.path):
+            with open(self.path, "r") as f:
+                data = json.load(f)
+            if os.path.exists(self.journal_path):
+                with open(self.journal_path, "r") as f:
+                    for line in f:
+                        try:
+                            record = json.loads(line)
+                        except ValueError:
+                            continue
+                        self._apply(data, record)
+            if data.get("source") != self.storage.source():
+                logging.info(f"Task aggregates in {self.path} belong to {data.get('source')}, rebuilding")
+                data = None
+            elif data.get("sessions") != self.storage.session_count():
+                logging.warning(f"Task aggregates in {self.path} are out of sync with the storage, rebuilding")
+                data = None
+        if data is None:
+            data = self.rebuild()
+            self._write_snapshot(data)
+            if os.path.exists(self.journal_path):
+                os.remove(self.journal_path)
+        return data
+
+    def rebuild(self):
+        """
+        从存储中的全部任务记录重建聚合数据
+        """
+        data = self._empty()
+        for task_name in self.storage.get_task_names():
+            self._apply(data, {"task": task_name})
+        for date_str, records in self.storage.get_all_sessions().items():
+            for record in records:
+                if not record["end_time"]:
+                    continue
+                start = datetime.strptime(record["start_time"], "%Y-%m-%d %H:%M:%S")
+                end = datetime.strptime(record["end_time"], "%Y-%m-%d %H:%M:%S")
+                self._apply(data, {"task": record["task_name"], "date": date_str,
+                                   "seconds": (end - start).total_seconds()})
+        # 以存储报告的记录数为准，避免计数方式的差异导致每次启动都重建
+        data["sessions"] = self.storage.session_count()
+        logging.info(f"Rebuilt task aggregates into {self.path}")
+        return data
+
+    @staticmethod
+    def _apply(data, record):
+        task_name = record["task"]
+        if task_name not in data["task_totals"]:
+            data["tasks"].append(task_name)
+            data["task_totals"][task_name] = 0
+        if "date" not in record:
+            return
+        date_str, seconds = record["date"], record["seconds"]
+        day = data["days"].setdefault(date_str, {})
+        day[task_name] = day.get(task_name, 0) + seconds
+        data["day_totals"][date_str] = data["day_totals"].get(date_str, 0) + seconds
+        data["task_totals"][task_name] += seconds
+        data["sessions"] = data.get("sessions", 0) + 1
+
+    def _record(self, record):
+        with self._lock:
+            self._apply(self.data, record)
+            self._journal.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self._journal.flush()
+
+    def add_task(self, task_name):
+        """
+        登记任务名（新建任务时调用）
+        """
+        if task_name not in self.data["task_totals"]:
+            self._record({"task": task_name})
+
+    def record_session(self, date_str, task_name, seconds):
+        """
+        记录一段已结束的任务
+        Args:
+            date_str (str): 日期 'YYYY-MM-DD'
+            task_name (str): 任务名称
+            seconds (float): 持续秒数
+        """
+        self._record({"task": task_name, "date": date_str, "seconds": seconds})
+
+    def task_names(self):
+        """
+        Returns:
+            list: 所有任务名称（按首次出现顺序）
+        """
+        with self._lock:
+            return list(self.data["tasks"])
+
+    def get_day(self, date_str):
+        """
+        Returns:
+            dict: 指定日期每个任务的秒数 {task_name: seconds}
+        """
+        with self._lock:  # 图表在后台线程中查询
+            return dict(self.data["days"].get(date_str, {}))
+
+    def get_day_total(self, date_str):
+        with self._lock:
+            return self.data["day_totals"].get(date_str, 0)
+
+    def get_task_total(self, task_name):
+        with self._lock:
+            return self.data["task_totals"].get(task_name, 0)
+
+    def _write_snapshot(self, data):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def close(self):
+        """
+        写入快照并清空增量日志
+        """
+        with self._lock:
+            self._write_snapshot(self.data)
+            self._journal.close()
+            os.remove(self.journal_path)
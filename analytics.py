@@ -0,0 +1,215 @@
+import threading
+
+import numpy as np
+
+PERIODS = ("day", "week", "month", "year")
+WEEKDAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+
+
+class SessionTable:
+    """
+    已结束任务记录的列式表示：每条记录对应各数组中的同一位置
+        day      datetime64[D]  记录所属日期（任务日志的日期键）
+        start    datetime64[s]  开始时间
+        end      datetime64[s]  结束时间
+        task     int32          task_names 中的索引
+        seconds  float64        持续秒数
+    """
+
+    def __init__(self, sessions):
+        """
+        Args:
+            sessions (dict): {date: [{task_name, start_time, end_time}]}（storage.get_all_sessions()）
+        """
+        days, starts, ends, names = [], [], [], []
+        for date_str, records in sessions.items():
+            for record in records:
+                if record["end_time"]:
+                    days.append(date_str)
+                    starts.append(record["start_time"])
+                    ends.append(record["end_time"])
+                    names.append(record["task_name"])
+        self.day = np.array(days, dtype="datetime64[D]")
+        self.start = np.array(starts, dtype="datetime64[s]")
+        self.end = np.array(ends, dtype="datetime64[s]")
+        self.task_names, task = np.unique(np.array(names, dtype=str), return_inverse=True)
+        self.task_names = self.task_names.tolist()
+        self.task = task.astype(np.int32)
+        self.seconds = np.maximum((self.end - self.start).astype(np.float64), 0)
+
+    def __len__(self):
+        return len(self.day)
+
+    def select(self, start_date, end_date):
+        """
+        Returns:
+            numpy.ndarray: 日期在 [start_date, end_date] 内的记录掩码
+        """
+        return (self.day >= np.datetime64(start_date, "D")) & (self.day <= np.datetime64(end_date, "D"))
+
+
+def period_starts(days, period):
+    """
+    把日期映射到所在周期的第一天（周从周一开始）
+    Args:
+        days (numpy.ndarray): datetime64[D] 数组
+        period (str): day / week / month / year
+    Returns:
+        numpy.ndarray: datetime64[D] 数组
+    """
+    if period == "day":
+        return days
+    if period == "week":
+        # 1970-01-01 是周四
+        offset = (days.astype(np.int64) + 3) % 7
+        return days - offset.astype("timedelta64[D]")
+    if period == "month":
+        return days.astype("datetime64[M]").astype("datetime64[D]")
+    if period == "year":
+        return days.astype("datetime64[Y]").astype("datetime64[D]")
+    raise ValueError(f"Unknown period: {period}")
+
+
+class RangeAnalytics:
+    """
+    日期范围内的学习统计：按日 / 周 / 月 / 年统计各任务时间、滚动平均、连续学习天数和
+    按星期 × 小时的热力图。全部在 SessionTable 的 NumPy 数组上向量化计算，
+    与记录条数近似线性，几年的记录也只需几毫秒。
+    表在首次使用时从存储加载，任务记录变化后调用 invalidate()。
+    """
+
+    def __init__(self, storage):
+        """
+        Args:
+            storage: 存储后端（读取 get_all_sessions）
+        """
+        self.storage = storage
+        self._table = None
+        self._lock = threading.Lock()
+
+    @property
+    def table(self):
+        with self._lock:
+            if self._table is None:
+                self._table = SessionTable(self.storage.get_all_sessions())
+            return self._table
+
+    def invalidate(self):
+        """
+        任务记录变化后调用，下次查询时重新加载
+        """
+        with self._lock:
+            self._table = None
+
+    def task_totals(self, start_date, end_date, period="week"):
+        """
+        每个周期内各任务的学习时间
+        Args:
+            start_date (str): 起始日期 'YYYY-MM-DD'
+            end_date (str): 结束日期 'YYYY-MM-DD'
+            period (str): day / week / month / year
+        Returns:
+            tuple: (periods, task_names, hours) periods 为各周期第一天的 datetime64[D] 数组（包括没有记录的周期），
+                hours 为 [周期, 任务] 小时数矩阵；只包含范围内出现过的任务
+        """
+        table = self.table
+        mask = table.select(start_date, end_date)
+        first = period_starts(np.array([start_date], dtype="datetime64[D]"), period)[0]
+        last = period_starts(np.array([end_date], dtype="datetime64[D]"), period)[0]
+        if period in ("day", "week"):
+            step = np.timedelta64(1 if period == "day" else 7, "D")
+            periods = np.arange(first, last + step, step)
+        else:
+            unit = "M" if period == "month" else "Y"
+            periods = np.arange(first.astype(f"datetime64[{unit}]"), last.astype(f"datetime64[{unit}]") + 1)
+            periods = periods.astype("datetime64[D]")
+        used_tasks, task_index = np.unique(table.task[mask], return_inverse=True)
+        period_index = np.searchsorted(periods, period_starts(table.day[mask], period))
+        hours = np.zeros((len(periods), len(used_tasks)))
+        np.add.at(hours, (period_index, task_index), table.seconds[mask] / 3600)
+        return periods, [table.task_names[i] for i in used_tasks], hours
+
+    def daily_totals(self, start_date, end_date):
+        """
+        Returns:
+            tuple: (days, hours) 范围内每天（包括没有记录的日期）的总学习小时数
+        """
+        table = self.table
+        first, last = np.datetime64(start_date, "D"), np.datetime64(end_date, "D")
+        days = np.arange(first, last + 1)
+        mask = table.select(start_date, end_date)
+        hours = np.bincount((table.day[mask] - first).astype(np.int64), weights=table.seconds[mask] / 3600,
+                            minlength=len(days))
+        return days, hours
+
+    def rolling_average(self, start_date, end_date, window=7):
+        """
+        每日学习时间的滚动平均（包括范围开始前的 window - 1 天，使第一天也是完整窗口）
+        Returns:
+            tuple: (days, daily_hours, average_hours)
+        """
+        padded_start = str(np.datetime64(start_date, "D") - (window - 1))
+        days, hours = self.daily_totals(padded_start, end_date)
+        cumulative = np.concatenate(([0.0], np.cumsum(hours)))
+        average = (cumulative[window:] - cumulative[:-window]) / window
+        return days[window - 1:], hours[window - 1:], average
+
+    def streaks(self, end_date, min_hours=0.0):
+        """
+        连续学习天数（当天学习时间超过 min_hours 计为学习日）
+        Args:
+            end_date (str): 计算当前连续天数的截止日期（通常为今天）
+            min_hours (float): 计为学习日的最少小时数
+        Returns:
+            dict: {current, longest, longest_start, longest_end}，没有记录时日期为 None
+        """
+        table = self.table
+        result = {"current": 0, "longest": 0, "longest_start": None, "longest_end": None}
+        if not len(table):
+            return result
+        first = table.day.min()
+        days, hours = self.daily_totals(str(first), end_date)
+        studied = hours > min_hours
+        if not studied.any():
+            return result
+        # 连续区间的起止位置：studied 由 False 变 True / 由 True 变 False 的位置
+        edges = np.diff(np.concatenate(([0], studied.astype(np.int8), [0])))
+        run_starts = np.flatnonzero(edges == 1)
+        run_ends = np.flatnonzero(edges == -1)
+        lengths = run_ends - run_starts
+        best = int(np.argmax(lengths))
+        result["longest"] = int(lengths[best])
+        result["longest_start"] = str(days[run_starts[best]])
+        result["longest_end"] = str(days[run_ends[best] - 1])
+        # 当前连续天数：以截止日期结束的区间；截止日期当天尚未学习时，以前一天结束的区间也算
+        last_end = run_ends[-1]
+        if last_end >= len(days) - 1:
+            result["current"] = int(lengths[-1])
+        return result
+
+    def hour_heatmap(self, start_date, end_date):
+        """
+        按星期 × 小时统计学习时间，跨越整点的记录按实际时长拆分到各小时
+        Returns:
+            numpy.ndarray: [7, 24] 小时数矩阵，行为周一到周日
+        """
+        table = self.table
+        mask = table.select(start_date, end_date)
+        start = table.start[mask].astype(np.int64)
+        end = table.end[mask].astype(np.int64)
+        valid = end > start
+        start, end = start[valid], end[valid]
+        if not len(start):
+            return np.zeros((7, 24))
+        first_hour = start // 3600
+        slot_counts = (end - 1) // 3600 - first_hour + 1
+        # 展开为 (记录, 小时) 槽位：每条记录覆盖的每个整点小时一个槽位
+        owner = np.repeat(np.arange(len(start)), slot_counts)
+        offsets = np.arange(len(owner)) - np.repeat(np.cumsum(slot_counts) - slot_counts, slot_counts)
+        slot_hour = first_hour[owner] + offsets
+        overlap = (np.minimum(end[owner], (slot_hour + 1) * 3600)
+                   - np.maximum(start[owner], slot_hour * 3600))
+        weekday = (slot_hour // 24 + 3) % 7
+        hour = slot_hour % 24
+        heatmap = np.bincount(weekday * 24 + hour, weights=overlap / 3600, minlength=7 * 24)
+        return heatmap.reshape(7, 24)
@@ -0,0 +1,86 @@
+import json
+import os
+import sys
+
+DEFAULT_CONFIG = {
+    "text_size": 20,
+    "text_color": "#FFFFFF",
+    "capture_interval": 5,
+    "camera_device": 0,
+    "camera_width": 0,
+    "camera_height": 0,
+    "camera_fps": 0,
+    "camera_fourcc": "",
+    "camera_buffer_size": 1,
+    "camera_flush_grabs": 4,
+    "extra_cameras": [],
+    "frame_size": [1920, 1080],
+    "capture_mode": "fixed",
+    "motion_threshold": 0.02,
+    "motion_keepalive_interval": 60,
+    "motion_active_hold": 30,
+    "active_capture_interval": 0,
+    "fps": 2,
+    "font_path": "assets/fonts/Arial.ttf",
+    "frame_format": "png",
+    "png_compress_level": 1,
+    "frame_quality": 90,
+    "writer_workers": 2,
+    "frame_backend": "pil",
+    "resize_interpolation": "area",
+    "storage_backend": "json",
+    "storage_path": "timelapsecam.db",
+    "event_log_dir": "task_events",
+    "frame_catalog_path": "frame_catalog.db",
+    "study_time_flush_interval": 60,
+    "live_encode": False,
+    "live_segment_frames": 300,
+    "live_encode_fourcc": "mp4v",
+    "compile_workers": 0,
+    "compile_memory_mb": 512,
+    "encoder_backend": "moviepy",
+    "ffmpeg_preset": "veryfast",
+    "ffmpeg_crf": 23,
+    "ffmpeg_threads": 0,
+    "ffmpeg_pix_fmt": "yuv420p",
+    "metrics_port": 0,
+    "metrics_log_interval": 60,
+    "metrics_log_path": "logs/metrics.log"
+}
+
+
+def resource_path(relative_path):
+    """Get absolute path to resource, works for dev and for PyInstaller."""
+    try:
+        base_path = sys._MEIPASS
+    except Exception:
+        base_path = os.path.abspath(".")
+    return os.path.join(base_path, relative_path)
+
+
+def load_config():
+    """
+    加载 config.json，不存在时用默认配置创建；旧配置文件缺少的新选项使用默认值
+    Returns:
+        dict: 应用配置
+    """
+    default_config = dict(DEFAULT_CONFIG)
+    config_path = resource_path('config.json')
+    if not os.path.exists(config_path):
+        with open(config_path, 'w') as f:
+            json.dump(default_config, f, indent=4)
+        config = default_config
+    else:
+        with open(config_path, 'r') as f:
+            config = {**default_config, **json.load(f)}
+    # Ensure font path exists
+    font_path = resource_path(config["font_path"])
+    if not os.path.exists(font_path):
+        config["font_path"] = "assets/fonts/Arial.ttf"  # fallback to default
+        save_config(config)
+    return config
+
+
+def save_config(config):
+    with open('config.json', 'w') as f:
+        json.dump(config, f, indent=4)
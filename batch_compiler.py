@@ -0,0 +1,207 @@
+import logging
+import multiprocessing
+import os
+import queue
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from frame_store import list_frame_files
+from video_compiler import IncrementalCompiler
+from video_encoder import EncodeCancelled, concat_segments
+
+FRAME_EVENT_INTERVAL = 0.2  # 工作进程上报帧进度的最小间隔（秒）
+
+
+def default_workers():
+    """
+    默认并行任务数：libx264 本身是多线程的，每个任务按两个核计算
+    """
+    return max(1, (os.cpu_count() or 1) // 2)
+
+
+def dates_in_range(frames_root, start_date, end_date):
+    """
+    列出帧根目录中位于日期范围内（含两端）的日期文件夹
+    Args:
+        frames_root (str): 帧根目录
+        start_date (str): 起始日期 'YYYY-MM-DD'
+        end_date (str): 结束日期 'YYYY-MM-DD'
+    Returns:
+        list: 已排序的日期字符串
+    """
+    if not os.path.isdir(frames_root):
+        return []
+    return sorted(
+        d for d in os.listdir(frames_root)
+        if start_date <= d <= end_date and os.path.isdir(os.path.join(frames_root, d))
+    )
+
+
+def _compile_day(job):
+    """
+    在工作进程中增量编译一天的视频
+    Args:
+        job (tuple): (date_str, output_filename, fps, frames_root, cache_root, encoder_options, memory_mb,
+            events, cancel_event)
+    Returns:
+        tuple: (date_str, output_filename 或 None（没有帧）)
+    Raises:
+        EncodeCancelled: cancel_event 被设置（已完成的分段保留在缓存中）
+    """
+    date_str, output_filename, fps, frames_root, cache_root, encoder_options, memory_mb, events, cancel_event = job
+    events.put((date_str, "running", None))
+    last_event = 0
+
+    def on_progress(done, total):
+        nonlocal last_event
+        now = time.monotonic()
+        if done < total and now - last_event < FRAME_EVENT_INTERVAL:
+            return
+        last_event = now
+        events.put((date_str, "frames", (done, total)))
+
+    compiler = IncrementalCompiler(frames_root=frames_root, cache_root=cache_root, encoder_options=encoder_options,
+                                   memory_mb=memory_mb)
+    if compiler.compile(date_str, output_filename, fps, on_progress=on_progress, should_cancel=cancel_event.is_set):
+        return date_str, output_filename
+    return date_str, None
+
+
+class BatchCompiler:
+    """
+    多日期批量编译：每天作为一个任务提交到进程池并行增量编译，
+    可输出每天一个视频，或再把各天的视频无损拼接为一个视频。
+    任务状态（queued / running / done / skipped / failed / cancelled）通过回调报告，
+    所有任务合计的帧进度通过 on_frames 回调报告。
+    """
+
+    def __init__(self, frames_root="frames", cache_root=os.path.join("output", "cache"), output_dir="output",
+                 workers=0, encoder_options=None, memory_mb=0):
+        """
+        Args:
+            frames_root (str): 帧根目录
+            cache_root (str): 分段缓存根目录
+            output_dir (str): 视频输出目录
+            workers (int): 进程数，0 表示自动
+            encoder_options (dict): 编码器设置（video_encoder.encoder_options）
+            memory_mb (int): 预读解码帧的总内存上限（MB），由同时运行的进程平分
+        """
+        self.frames_root = frames_root
+        self.cache_root = cache_root
+        self.output_dir = output_dir
+        self.workers = workers or default_workers()
+        self.encoder_options = encoder_options
+        self.memory_mb = memory_mb
+
+    def day_output(self, date_str):
+        return os.path.join(self.output_dir, f"timelapse_{date_str}.mp4")
+
+    def compile_range(self, start_date, end_date, fps, single=False, on_progress=None, should_cancel=None,
+                      on_frames=None):
+        """
+        编译日期范围内的所有日期
+        Args:
+            start_date (str): 起始日期 'YYYY-MM-DD'
+            end_date (str): 结束日期 'YYYY-MM-DD'
+            fps (int): 帧率
+            single (bool): 是否合并为一个视频 timelapse_<start>_<end>.mp4
+            on_progress (callable): on_progress(date_str, status, completed, total)
+            should_cancel (callable): 返回 True 时取消所有任务，已生成的视频保留，不再合并
+            on_frames (callable): on_frames(frames_done, frames_total)，所有日期合计，缓存的帧计入已完成
+        Returns:
+            list: 生成的视频路径（single 时只有合并后的视频）
+        """
+        dates = dates_in_range(self.frames_root, start_date, end_date)
+        outputs = self.compile_dates(dates, fps, on_progress, should_cancel, on_frames)
+        if not single or not outputs or (should_cancel and should_cancel()):
+            return outputs
+        if len(outputs) == 1:
+            return outputs
+        combined = os.path.join(self.output_dir, f"timelapse_{start_date}_{end_date}.mp4")
+        # 各天的视频编码参数相同，分辨率也相同时无损拼接，否则重新编码
+        concat_segments(outputs, combined, options=self.encoder_options)
+        return [combined]
+
+    def compile_dates(self, dates, fps, on_progress=None, should_cancel=None, on_frames=None):
+        """
+        并行编译若干天，每天输出 output/timelapse_<date>.mp4
+        Args:
+            dates (list): 日期字符串列表
+            fps (int): 帧率
+            on_progress (callable): on_progress(date_str, status, completed, total)
+            should_cancel (callable): 返回 True 时取消尚未开始的任务，并中止正在编码的任务
+            on_frames (callable): on_frames(frames_done, frames_total)，所有日期合计
+        Returns:
+            list: 按日期排序的已生成视频路径
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        total = len(dates)
+        completed = 0
+        outputs = {}
+        # 每天的 [已完成帧数, 总帧数]；总帧数先按帧文件数估计，任务开始后以编译器报告的为准
+        frame_counts = {}
+        if on_frames:
+            for date_str in dates:
+                frames_dir = os.path.join(self.frames_root, date_str)
+                frame_counts[date_str] = [0, len(list_frame_files(frames_dir)) if os.path.isdir(frames_dir) else 0]
+
+        def report(date_str, status, value=None):
+            if status == "frames":
+                if on_frames:
+                    frame_counts[date_str] = list(value)
+                    on_frames(sum(done for done, _ in frame_counts.values()),
+                              sum(count for _, count in frame_counts.values()))
+            elif on_progress:
+                on_progress(date_str, status, completed, total)
+
+        workers = min(self.workers, max(1, total))
+        # 内存上限针对整个批量编译，各进程平分
+        memory_mb = max(1, self.memory_mb // workers) if self.memory_mb > 0 else 0
+        with multiprocessing.Manager() as manager:
+            events = manager.Queue()
+            cancel_event = manager.Event()
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = {}
+                for date_str in dates:
+                    job = (date_str, self.day_output(date_str), fps, self.frames_root, self.cache_root,
+                           self.encoder_options, memory_mb, events, cancel_event)
+                    futures[pool.submit(_compile_day, job)] = date_str
+                    report(date_str, "queued")
+                pending = set(futures)
+                while pending:
+                    if should_cancel and should_cancel() and not cancel_event.is_set():
+                        cancel_event.set()
+                        for future in pending:
+                            future.cancel()
+                    done, pending = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+                    self._drain_events(events, report)
+                    for future in done:
+                        date_str = futures[future]
+                        completed += 1
+                        if future.cancelled():
+                            report(date_str, "cancelled")
+                            continue
+                        try:
+                            _, output_filename = future.result()
+                        except EncodeCancelled:
+                            report(date_str, "cancelled")
+                            continue
+                        except Exception as e:
+                            logging.exception(f"Error creating video for {date_str}")
+                            report(date_str, f"failed: {e}")
+                            continue
+                        if output_filename:
+                            outputs[date_str] = output_filename
+                            report(date_str, "done")
+                        else:
+                            report(date_str, "skipped")
+        return [outputs[d] for d in sorted(outputs)]
+
+    @staticmethod
+    def _drain_events(events, report):
+        while True:
+            try:
+                date_str, status, value = events.get_nowait()
+            except queue.Empty:
+                return
+            report(date_str, status, value)
@@ -0,0 +1,343 @@
+"""
+性能基准：在合成帧上无界面运行（不需要摄像头），覆盖采集热路径的各个环节：
+
+    processing   每帧处理延迟（pil / numpy 路径，缩放 + 叠加）和单独的叠加渲染
+    save         各 frame_format 的保存吞吐量和文件大小
+    persistence  add_study_time / add_session 在不同历史长度下的开销（json / sqlite / eventlog / 日志延迟写入）
+    compile      端到端增量编译速度（moviepy / ffmpeg 后端）
+
+结果写入 JSON（默认 benchmarks/results/<时间>.json），可作为基线与之后的运行对比：
+
+    python benchmarks/run_benchmarks.py [--suite processing,save,...] [--quick] [--output FILE]
+                                        [--baseline FILE] [--tolerance 0.15]
+
+--baseline 时逐项打印与基线的比值，超出容差的退化项使退出码为 1。
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app_config import DEFAULT_CONFIG  # noqa: E402
+
+SUITES = ("processing", "save", "persistence", "compile")
+CAMERA_SIZE = (1280, 720)
+SEED = 1234
+
+
+def synthetic_frame(size, seed=SEED, shift=0):
+    """
+    生成可复现的合成 BGR 帧：平滑渐变背景、几个色块和轻微传感器噪声，
+    压缩难度接近真实画面（纯噪声或纯色都会让编码耗时失真）
+    """
+    width, height = size
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+    frame = np.empty((height, width, 3), dtype=np.float32)
+    frame[..., 0] = 96 + 64 * np.sin((x + shift * 8) / 97.0)
+    frame[..., 1] = 80 + 60 * np.cos(y / 53.0)
+    frame[..., 2] = 128 + 48 * np.sin((x + y) / 151.0)
+    for _ in range(6):
+        x0, y0 = rng.integers(0, width - width // 6), rng.integers(0, height - height // 6)
+        frame[y0:y0 + height // 6, x0:x0 + width // 6] = rng.integers(0, 255, 3)
+    frame += rng.normal(0, 4, frame.shape)
+    return np.clip(frame, 0, 255).astype(np.uint8)
+
+
+def bench_config(**overrides):
+    config = dict(DEFAULT_CONFIG, font_path=os.path.join(ROOT, DEFAULT_CONFIG["font_path"]))
+    config.update(overrides)
+    return config
+
+
+def overlay_info(index=0):
+    return {
+        "current_time": f"12:{index // 60 % 60:02d}:{index % 60:02d}",
+        "study_time": 3600 + index,
+        "task_name": "Benchmark",
+        "total_study_time": 7200 + index,
+    }
+
+
+def measure(fn, repeat, warmup=2):
+    """
+    Returns:
+        list: 每次调用的耗时（秒），fn(i) 接收调用序号
+    """
+    for i in range(warmup):
+        fn(i)
+    samples = []
+    for i in range(repeat):
+        started = time.perf_counter()
+        fn(warmup + i)
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def latency(samples):
+    """
+    延迟类结果（越小越好）：中位数和 p95，单位 ms
+    """
+    ordered = sorted(samples)
+    return {
+        "median_ms": {"value": round(1000 * statistics.median(ordered), 3), "better": "lower"},
+        "p95_ms": {"value": round(1000 * ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))], 3),
+                   "better": "lower"},
+    }
+
+
+def bench_processing(args, workdir):
+    from frame_processor import FrameProcessor
+    from overlay_renderer import OverlayRenderer
+
+    repeat = 20 if args.quick else 100
+    frame = synthetic_frame(CAMERA_SIZE)
+    results = {}
+    for backend in ("pil", "numpy"):
+        for label, target_size in (("resize_1080p", (1920, 1080)), ("native", None)):
+            processor = FrameProcessor(bench_config(frame_backend=backend), target_size)
+            samples = measure(lambda i: processor.process(frame, overlay_info(i)), repeat)
+            results[f"process[{backend},{label}]"] = latency(samples)
+
+    config = bench_config()
+    renderer = OverlayRenderer(config["font_path"], config["text_size"], config["text_color"])
+    frame_1080p = synthetic_frame((1920, 1080))
+    samples = measure(lambda i: renderer.render(frame_1080p, overlay_info(i), bgr=True), repeat)
+    results["overlay[1080p]"] = latency(samples)
+    return results
+
+
+def bench_save(args, workdir):
+    from frame_store import FRAME_FORMATS, save_frame
+
+    repeat = 10 if args.quick else 40
+    frame = synthetic_frame((1920, 1080))
+    frame_rgb = np.ascontiguousarray(frame[..., ::-1])
+    results = {}
+    for frame_format in FRAME_FORMATS:
+        config = bench_config(frame_format=frame_format)
+        extension = FRAME_FORMATS[frame_format][0]
+        for bgr in (False, True):
+            if frame_format == "npy" and bgr:
+                continue
+            path = os.path.join(workdir, f"frame{extension}")
+            image = frame if bgr else frame_rgb
+            samples = measure(lambda i: save_frame(image, path, config, bgr), repeat)
+            name = f"save[{frame_format},{'bgr' if bgr else 'rgb'}]"
+            results[name] = {
+                "frames_per_s": {"value": round(len(samples) / sum(samples), 2), "better": "higher"},
+                "size_kb": {"value": round(os.path.getsize(path) / 1024, 1), "better": "lower"},
+                **latency(samples),
+            }
+    return results
+
+
+def seed_history(directory, days):
+    """
+    写入 days 天的原 JSON 格式历史（每天两条任务记录），供各存储后端首次打开时导入
+    """
+    os.makedirs(directory, exist_ok=True)
+    start = datetime(2020, 1, 1)
+    study_time, task_log = {}, {}
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        date_str = day.strftime("%Y-%m-%d")
+        study_time[date_str] = 3600 + offset
+        task_log[date_str] = [
+            {"task_name": f"Task {n}",
+             "start_time": (day + timedelta(hours=9 + n)).strftime("%Y-%m-%d %H:%M:%S"),
+             "end_time": (day + timedelta(hours=10 + n)).strftime("%Y-%m-%d %H:%M:%S")}
+            for n in range(2)
+        ]
+    paths = {name: os.path.join(directory, f"{name}.json") for name in ("tasks", "task_log", "study_time")}
+    for name, data in (("tasks", {"Task 0": 3600.0 * days, "Task 1": 3600.0 * days}),
+                       ("task_log", task_log), ("study_time", study_time)):
+        with open(paths[name], "w") as f:
+            json.dump(data, f, indent=4)
+    return paths
+
+
+def open_backend(backend, directory, paths):
+    from storage import EventLogStorage, JsonStorage, SQLiteStorage
+
+    files = {"task_file": paths["tasks"], "log_file": paths["task_log"], "study_time_file": paths["study_time"]}
+    if backend == "sqlite":
+        return SQLiteStorage(db_path=os.path.join(directory, "timelapsecam.db"), **files)
+    if backend == "eventlog":
+        return EventLogStorage(events_dir=os.path.join(directory, "task_events"), compact=False, **files)
+    return JsonStorage(**files)
+
+
+def bench_persistence(args, workdir):
+    from study_time_manager import StudyTimeManager
+
+    history_sizes = (30, 365) if args.quick else (30, 365, 3650)
+    repeat = 20 if args.quick else 100
+    results = {}
+    for days in history_sizes:
+        for backend, flush_interval in (("json", 0), ("json", 3600), ("sqlite", 0), ("eventlog", 0)):
+            directory = os.path.join(workdir, f"{backend}_{flush_interval}_{days}")
+            paths = seed_history(directory, days)
+            storage = open_backend(backend, directory, paths)
+            manager = StudyTimeManager(storage=storage, flush_interval=flush_interval,
+                                       journal_path=os.path.join(directory, "study_time.journal"))
+            label = backend if not flush_interval else f"{backend}+journal"
+            samples = measure(lambda i: manager.add_study_time(5), repeat)
+            results[f"add_study_time[{label},{days}d]"] = latency(samples)
+            manager.close()
+
+            if not flush_interval:
+                now = datetime.now()
+
+                def add_session(i):
+                    start = (now + timedelta(minutes=i)).strftime("%Y-%m-%d %H:%M:%S")
+                    storage.add_session(now.strftime("%Y-%m-%d"), "Benchmark", start, start, 60)
+
+                samples = measure(add_session, max(10, repeat // 5))
+                results[f"add_session[{backend},{days}d]"] = latency(samples)
+            storage.close()
+    return results
+
+
+def bench_compile(args, workdir):
+    from frame_store import save_frame
+    from video_compiler import IncrementalCompiler
+    from video_encoder import encoder_options
+
+    frame_count = 48 if args.quick else 240
+    date_str = "2024-01-01"
+    frames_dir = os.path.join(workdir, "frames", date_str)
+    os.makedirs(frames_dir)
+    config = bench_config(frame_format="jpeg")
+    start = datetime(2024, 1, 1, 9)
+    for i in range(frame_count):
+        captured_at = start + timedelta(seconds=5 * i)
+        path = os.path.join(frames_dir, f"frame_{captured_at.strftime('%Y%m%d_%H%M%S')}.jpg")
+        save_frame(synthetic_frame((1920, 1080), shift=i), path, config, bgr=True)
+
+    results = {}
+    for backend in ("moviepy", "ffmpeg"):
+        options = encoder_options(bench_config(encoder_backend=backend))
+        cache_root = os.path.join(workdir, f"cache_{backend}")
+        output = os.path.join(workdir, f"timelapse_{backend}.mp4")
+        compiler = IncrementalCompiler(frames_root=os.path.join(workdir, "frames"), cache_root=cache_root,
+                                       encoder_options=options, memory_mb=DEFAULT_CONFIG["compile_memory_mb"])
+        started = time.perf_counter()
+        compiler.compile(date_str, output, fps=DEFAULT_CONFIG["fps"])
+        elapsed = time.perf_counter() - started
+        results[f"compile[{backend},1080p]"] = {
+            "frames_per_s": {"value": round(frame_count / elapsed, 2), "better": "higher"},
+            "output_kb": {"value": round(os.path.getsize(output) / 1024, 1), "better": "lower"},
+        }
+        # 帧未变化时再次编译（检查清单和缓存后直接返回）
+        started = time.perf_counter()
+        compiler.compile(date_str, output, fps=DEFAULT_CONFIG["fps"])
+        results[f"recompile_unchanged[{backend}]"] = {
+            "seconds": {"value": round(time.perf_counter() - started, 3), "better": "lower"},
+        }
+    return results
+
+
+BENCHMARKS = {
+    "processing": bench_processing,
+    "save": bench_save,
+    "persistence": bench_persistence,
+    "compile": bench_compile,
+}
+
+
+def compare(results, baseline, tolerance):
+    """
+    打印与基线的对比
+    Returns:
+        list: 超出容差的退化项名称
+    """
+    regressions = []
+    for case, metrics in sorted(results.items()):
+        for metric, entry in metrics.items():
+            base = baseline.get(case, {}).get(metric)
+            if not base or not base["value"]:
+                continue
+            ratio = entry["value"] / base["value"]
+            worse = ratio > 1 + tolerance if entry["better"] == "lower" else ratio < 1 - tolerance
+            marker = "  REGRESSION" if worse else ""
+            print(f"{case:40s} {metric:14s} {base['value']:>10} -> {entry['value']:>10} ({ratio:.2f}x){marker}")
+            if worse:
+                regressions.append(f"{case} {metric}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run headless performance benchmarks on synthetic frames")
+    parser.add_argument("--suite", default=",".join(SUITES), help=f"comma-separated subset of {', '.join(SUITES)}")
+    parser.add_argument("--quick", action="store_true", help="fewer iterations and frames (smoke run)")
+    parser.add_argument("--output", help="result file (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--baseline", help="earlier result file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed relative slowdown before flagging")
+    args = parser.parse_args(argv)
+
+    suites = [suite.strip() for suite in args.suite.split(",") if suite.strip()]
+    for suite in suites:
+        if suite not in BENCHMARKS:
+            parser.error(f"unknown suite: {suite}")
+
+    results = {}
+    workdir = tempfile.mkdtemp(prefix="timelapsecam-bench-")
+    try:
+        for suite in suites:
+            suite_dir = os.path.join(workdir, suite)
+            os.makedirs(suite_dir)
+            started = time.perf_counter()
+            suite_results = BENCHMARKS[suite](args, suite_dir)
+            print(f"{suite}: {len(suite_results)} cases in {time.perf_counter() - started:.1f}s")
+            for case, metrics in suite_results.items():
+                summary = ", ".join(f"{metric}={entry['value']}" for metric, entry in metrics.items())
+                print(f"  {case:40s} {summary}")
+            results.update(suite_results)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "time": datetime.now().strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+            "quick": args.quick,
+            "suites": suites,
+        },
+        "results": results,
+    }
+    output = args.output or os.path.join(ROOT, "benchmarks", "results",
+                                         f"{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+        if baseline["meta"].get("quick") != args.quick:
+            print("Warning: baseline was recorded with a different --quick setting")
+        regressions = compare(results, baseline["results"], args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} regression(s) beyond {args.tolerance:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
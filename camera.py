@@ -0,0 +1,121 @@
+import logging
+
+import cv2
+
+
+def frame_size(config):
+    """
+    输出帧分辨率
+    Returns:
+        tuple | None: (width, height)，None 表示保持摄像头原始分辨率
+    """
+    return tuple(config["frame_size"]) if config["frame_size"] else None
+
+
+def camera_configs(config):
+    """
+    所有摄像头的设置：主摄像头（camera_* 配置，帧保存在 frames/）和 extra_cameras 中的附加摄像头
+    （帧保存在 frames_<name>/，未指定的项沿用主摄像头的设置）
+    Returns:
+        list: [{name, device, width, height, fps, fourcc, buffer_size, flush_grabs, frames_root}]
+    """
+    size = frame_size(config) or (0, 0)
+    primary = {
+        "name": "main",
+        "device": config["camera_device"],
+        # 未指定分辨率时向摄像头请求输出分辨率，避免额外缩放
+        "width": config["camera_width"] or size[0],
+        "height": config["camera_height"] or size[1],
+        "fps": config["camera_fps"],
+        "fourcc": config["camera_fourcc"],
+        "buffer_size": config["camera_buffer_size"],
+        "flush_grabs": config["camera_flush_grabs"],
+        "frames_root": "frames",
+    }
+    configs = [primary]
+    for extra in config["extra_cameras"]:
+        settings = dict(primary, frames_root=f"frames_{extra['name']}")
+        settings.update(extra)
+        configs.append(settings)
+    return configs
+
+
+class Camera:
+    """
+    按配置打开的摄像头：协商分辨率 / 帧率 / FOURCC / 缓冲区大小，
+    读取前先丢弃驱动缓冲区中的旧帧，长间隔采集时也能得到最新画面。
+    接口与 cv2.VideoCapture 的 read / isOpened / release 一致。
+    """
+
+    def __init__(self, settings):
+        """
+        Args:
+            settings (dict): camera_configs() 中的一项；device 可以是索引或设备路径 / URL
+        """
+        self.settings = settings
+        self.name = settings["name"]
+        self.flush_grabs = settings["flush_grabs"]
+        device = settings["device"]
+        if isinstance(device, str) and device.isdigit():
+            device = int(device)
+        self.cap = cv2.VideoCapture(device)
+        if self.cap.isOpened():
+            self._configure()
+
+    def _configure(self):
+        settings = self.settings
+        # FOURCC 需在分辨率之前设置，部分摄像头只有 MJPG 才支持高分辨率下的高帧率
+        if settings["fourcc"]:
+            self.cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*settings["fourcc"]))
+        if settings["width"] and settings["height"]:
+            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, settings["width"])
+            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, settings["height"])
+        if settings["fps"]:
+            self.cap.set(cv2.CAP_PROP_FPS, settings["fps"])
+        if settings["buffer_size"]:
+            self.cap.set(cv2.CAP_PROP_BUFFERSIZE, settings["buffer_size"])
+        width, height = self.size
+        logging.info(f"Camera {self.name} ({settings['device']}) opened at {width}x{height}, "
+                     f"{self.cap.get(cv2.CAP_PROP_FPS):.0f} fps")
+
+    @property
+    def size(self):
+        """
+        Returns:
+            tuple: 协商后的实际分辨率 (width, height)
+        """
+        return int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def read(self):
+        """
+        丢弃缓冲区中的旧帧后读取一帧
+        Returns:
+            tuple: (ret, frame)
+        """
+        for _ in range(self.flush_grabs):
+            if not self.cap.grab():
+                break
+        return self.cap.read()
+
+    def release(self):
+        self.cap.release()
+
+
+def open_cameras(config):
+    """
+    打开所有配置的摄像头，无法打开的记录错误后跳过
+    Returns:
+        list: 已打开的 Camera（主摄像头打开时位于第一个）
+    """
+    cameras = []
+    for settings in camera_configs(config):
+        camera = Camera(settings)
+        if camera.isOpened():
+            cameras.append(camera)
+        else:
+            logging.error(f"Camera {settings['name']} ({settings['device']}) could not be accessed.")
+            camera.release()
+    return cameras
@@ -0,0 +1,261 @@
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from functools import partial
+
+from frame_store import FrameWriter
+from metrics import metrics
+from motion_detector import CaptureDecisionLog, MotionDetector
+
+_STOP = object()  # 队列结束标记
+
+
+class CapturePipeline:
+    """
+    生产者/消费者采集流水线：
+        采集线程 --(有界队列)--> 处理线程（转换/缩放/叠加）--(有界队列)--> 写入线程（实时编码）
+        写入线程再把帧提交给后台写入池（图像编码/磁盘 I/O），保存格式由 frame_format 决定
+    采集线程按单调时钟调度，处理和写入的耗时不会造成采集间隔漂移；
+    下游积压时丢弃新帧而不是阻塞采集。结果只通过回调报告，不依赖 Qt。
+    各阶段耗时、帧计数和调度抖动记录在 metrics.metrics 中。
+    指定 catalog 时，每帧写入后连同采集时间和当时的任务登记到帧索引（frame_catalog.FrameCatalog）。
+    capture_mode 为 "adaptive" 时，采集线程先做变化检测，静止画面在处理前即被丢弃，
+    检测到变化时可按 active_capture_interval 提高采集频率。
+    """
+
+    def __init__(self, cap, processor, config, overlay_info_provider, frames_root='frames',
+                 live_encoder=None, on_frame_saved=None, on_status=None, on_capture=None, catalog=None,
+                 queue_size=4):
+        """
+        Args:
+            cap (camera.Camera | cv2.VideoCapture): 已打开的摄像头（只调用 read()）
+            processor (FrameProcessor): 帧处理器
+            config (dict): 应用配置（读取 capture_interval / capture_mode / fps / 帧保存格式）
+            overlay_info_provider (callable): 采集时调用，返回叠加信息 dict
+            frames_root (str): 帧根目录，帧保存到 <frames_root>/<date>/
+            live_encoder (LiveVideoEncoder): 可选的实时编码器
+            on_frame_saved (callable): on_frame_saved(frame_filename)，在写入线程池中调用
+            on_status (callable): on_status(message)，在工作线程中调用
+            on_capture (callable): on_capture(kept, elapsed)，每次成功采集后在采集线程中调用，
+                elapsed 为距上次采集的秒数（丢弃的帧同样计入，用于累计学习时间）
+            catalog (FrameCatalog): 可选的帧索引，任务取自叠加信息的 task_name
+            queue_size (int): 每个阶段队列的容量
+        """
+        self.cap = cap
+        self.processor = processor
+        self.config = config
+        self.overlay_info_provider = overlay_info_provider
+        self.frames_root = frames_root
+        self.live_encoder = live_encoder
+        self.on_frame_saved = on_frame_saved
+        self.on_status = on_status
+        self.on_capture = on_capture
+        self.catalog = catalog
+        self.motion_detector = None
+        self.decision_log = None
+        if config["capture_mode"] == "adaptive":
+            self.motion_detector = MotionDetector(
+                threshold=config["motion_threshold"],
+                keepalive_interval=config["motion_keepalive_interval"],
+                active_hold=config["motion_active_hold"]
+            )
+            self.decision_log = CaptureDecisionLog(frames_root)
+        self.kept_frames = 0
+        self.dropped_frames = 0
+        self.process_queue = queue.Queue(maxsize=queue_size)
+        self.write_queue = queue.Queue(maxsize=queue_size)
+        self._stop_event = threading.Event()
+        self._wake_event = threading.Event()
+        self._threads = []
+        self.frame_writer = None
+
+    @property
+    def running(self):
+        return bool(self._threads)
+
+    def start(self):
+        """
+        启动各阶段线程
+        """
+        if self.running:
+            return
+        self._stop_event.clear()
+        self._wake_event.clear()
+        if self.motion_detector:
+            self.motion_detector.reset()
+        self.frame_writer = FrameWriter(self.config, max_workers=self.config["writer_workers"])
+        self._threads = [
+            threading.Thread(target=self._capture_loop, name="capture", daemon=True),
+            threading.Thread(target=self._process_loop, name="process", daemon=True),
+            threading.Thread(target=self._write_loop, name="write", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        """
+        停止采集，并等待已采集的帧处理和写入完毕
+        """
+        if not self.running:
+            return
+        self._stop_event.set()
+        self._wake_event.set()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        self.frame_writer.close()
+        self.frame_writer = None
+
+    def reschedule(self):
+        """
+        采集间隔改变后立即按新间隔重新调度
+        """
+        self._wake_event.set()
+
+    def _report(self, message):
+        if self.on_status:
+            self.on_status(message)
+
+    def _interval(self):
+        """
+        当前采集间隔：自适应模式下检测到变化时使用 active_capture_interval
+        """
+        interval = self.config["capture_interval"]
+        active_interval = self.config["active_capture_interval"]
+        if self.motion_detector and active_interval > 0 and self.motion_detector.is_active():
+            return min(interval, active_interval)
+        return interval
+
+    def _capture_loop(self):
+        last_capture = time.monotonic()
+        next_tick = last_capture + self._interval()
+        while not self._stop_event.is_set():
+            timeout = next_tick - time.monotonic()
+            if timeout > 0 and self._wake_event.wait(timeout):
+                self._wake_event.clear()
+                next_tick = time.monotonic() + self._interval()
+                continue
+            if self._stop_event.is_set():
+                break
+            # 调度抖动：实际唤醒时刻晚于理想时刻的秒数
+            metrics.observe("capture_jitter_seconds", max(0.0, time.monotonic() - next_tick))
+
+            try:
+                with metrics.timer("read"):
+                    ret, frame = self.cap.read()
+                captured_at = datetime.now()
+                now = time.monotonic()
+                elapsed, last_capture = now - last_capture, now
+                if not ret:
+                    metrics.inc("frames", "capture_failed")
+                    self._report("Status: Failed to capture frame")
+                    logging.error("Failed to capture frame")
+                    continue
+                if not self._keep_frame(frame, captured_at, now, elapsed):
+                    continue
+                item = (frame, captured_at, self.overlay_info_provider(captured_at))
+                self.process_queue.put_nowait(item)
+                metrics.set_gauge("process_queue_depth", self.process_queue.qsize())
+            except queue.Full:
+                metrics.inc("frames", "dropped_queue")
+                self._report("Status: Processing is falling behind, frame dropped")
+                logging.warning("Process queue full, dropped frame")
+            except Exception:
+                logging.exception("Exception occurred during frame capture.")
+                self._report("Status: Error during frame capture")
+            finally:
+                # 以理想时刻为基准调度，避免误差累积；严重落后时跳过错过的周期
+                # （在采集后计算，使变化检测触发的频率调整立即生效）
+                interval = self._interval()
+                next_tick += interval
+                if next_tick < time.monotonic():
+                    next_tick = time.monotonic() + interval
+        self.process_queue.put(_STOP)
+
+    def _keep_frame(self, frame, captured_at, now, elapsed):
+        """
+        变化检测并记录保留/丢弃决定；无论是否保留，经过的时间都通过 on_capture 报告
+        """
+        kept, score = True, None
+        if self.motion_detector:
+            with metrics.timer("motion"):
+                kept, score = self.motion_detector.check(frame, now)
+            self.decision_log.record(captured_at, kept, score, elapsed)
+        if kept:
+            self.kept_frames += 1
+            metrics.inc("frames", "captured")
+        else:
+            self.dropped_frames += 1
+            metrics.inc("frames", "dropped_static")
+            logging.debug(f"Dropped static frame (change {score:.4f})")
+            self._report(f"Status: Static scene, frame skipped ({self.dropped_frames} skipped)")
+        if self.on_capture:
+            self.on_capture(kept, elapsed)
+        return kept
+
+    def _process_loop(self):
+        while True:
+            item = self.process_queue.get()
+            if item is _STOP:
+                break
+            frame, captured_at, overlay_info = item
+            try:
+                image = self.processor.process(frame, overlay_info)
+                self.write_queue.put((image, captured_at, overlay_info.get("task_name")))
+                metrics.set_gauge("write_queue_depth", self.write_queue.qsize())
+            except Exception:
+                metrics.inc("frames", "process_failed")
+                logging.exception("Exception occurred during frame processing.")
+                self._report("Status: Error during frame processing")
+        self.write_queue.put(_STOP)
+
+    def _write_loop(self):
+        while True:
+            item = self.write_queue.get()
+            if item is _STOP:
+                break
+            image, captured_at, task = item
+            try:
+                date_str = captured_at.strftime('%Y-%m-%d')
+                frames_dir = os.path.join(self.frames_root, date_str)
+                os.makedirs(frames_dir, exist_ok=True)
+                frame_filename = self.frame_writer.frame_path(frames_dir, captured_at)
+                bgr = self.processor.output_bgr
+                # 写入池已满时 submit 阻塞，等待时间反映磁盘是否跟不上
+                with metrics.timer("save_wait"):
+                    self.frame_writer.submit(image, frame_filename, partial(self._on_frame_saved, captured_at, task),
+                                             self._on_write_error, bgr)
+                if self.live_encoder:
+                    self._write_live_frame(image, date_str, bgr)
+            except Exception:
+                logging.exception("Exception occurred while saving frame.")
+                self._report("Status: Error while saving frame")
+
+    def _on_frame_saved(self, captured_at, task, frame_filename):
+        logging.debug(f"Captured frame: {frame_filename}")
+        metrics.inc("frames", "saved")
+        if self.catalog:
+            try:
+                with metrics.timer("catalog"):
+                    self.catalog.add(frame_filename, captured_at, task, self.frames_root)
+            except Exception:
+                logging.exception(f"Exception occurred while cataloging frame {frame_filename}.")
+        if self.on_frame_saved:
+            self.on_frame_saved(frame_filename)
+
+    def _on_write_error(self, frame_filename, error):
+        metrics.inc("frames", "write_failed")
+        self._report(f"Status: Error while saving frame - {error}")
+
+    def _write_live_frame(self, image, date_str, bgr):
+        """
+        将帧推入实时编码器，失败时仅记录日志，不影响帧保存
+        """
+        try:
+            with metrics.timer("live_encode"):
+                self.live_encoder.write(image, date_str, self.config["fps"], bgr)
+        except Exception:
+            logging.exception("Exception occurred during live encoding.")
@@ -0,0 +1,356 @@
+"""
+TimeLapseCam 无界面命令行入口，不导入 PyQt5 / matplotlib，适合在无人值守的机器上后台运行。
+
+    python cli.py capture [--task NAME] [--interval SECONDS] [--duration SECONDS]
+    python cli.py compile [--date YYYY-MM-DD | --range START END | --all] [--single] [--fps N] [--workers N]
+    python cli.py compile --between "YYYY-MM-DD HH:MM" "YYYY-MM-DD HH:MM" [--task NAME] [--fps N]
+    python cli.py frames [--at "YYYY-MM-DD HH:MM" | --between START END] [--task NAME] [--sync]
+    python cli.py stats [--date YYYY-MM-DD]
+    python cli.py trends [--range START END] [--period day|week|month|year]
+"""
+import argparse
+import logging
+import os
+import re
+import signal
+import sys
+import threading
+from datetime import datetime, timedelta
+
+from app_config import load_config
+
+
+def open_storage(config):
+    """
+    创建存储后端和统计聚合索引
+    """
+    from aggregates import AggregateIndex
+    from storage import create_storage
+
+    storage = create_storage(config)
+    return storage, AggregateIndex(storage, path="task_aggregates.json")
+
+
+def run_capture(args, config):
+    """
+    无界面采集，直到 Ctrl+C / SIGTERM 或达到 --duration
+    """
+    from camera import frame_size, open_cameras
+    from capture_pipeline import CapturePipeline
+    from frame_catalog import FrameCatalog
+    from frame_processor import FrameProcessor
+    from metrics import MetricsExporter, metrics
+    from study_time_manager import StudyTimeManager
+    from task_manager import TaskManager
+    from video_encoder import LiveVideoEncoder
+
+    cameras = open_cameras(config)
+    if not cameras:
+        logging.error("Camera could not be accessed.")
+        return 1
+
+    if args.interval:
+        config["capture_interval"] = args.interval
+    storage, aggregates = open_storage(config)
+    task_manager = TaskManager(storage=storage, aggregates=aggregates)
+    study_time_manager = StudyTimeManager(
+        storage=storage,
+        flush_interval=config["study_time_flush_interval"],
+        journal_path="study_time.journal"
+    )
+    if args.task:
+        task_manager.start_task(args.task)
+    catalog = FrameCatalog(config["frame_catalog_path"], storage=storage)
+
+    live_encoder = None
+    if config["live_encode"]:
+        live_encoder = LiveVideoEncoder(
+            segments_root='segments',
+            segment_frames=config["live_segment_frames"],
+            fourcc=config["live_encode_fourcc"]
+        )
+
+    state = {"study_time": study_time_manager.get_today_study_time()}
+    state_lock = threading.Lock()
+
+    def overlay_info(captured_at):
+        return {
+            "current_time": captured_at.strftime("%H:%M:%S"),
+            "study_time": state["study_time"],
+            "task_name": task_manager.current_task,
+            "total_study_time": state["study_time"]
+        }
+
+    def on_capture(kept, elapsed):
+        # 按实际经过的时间累计学习时间，自适应模式下丢弃的帧同样计入
+        with state_lock, metrics.timer("study_time"):
+            study_time_manager.add_study_time(elapsed)
+            state["study_time"] = study_time_manager.get_today_study_time()
+
+    # 每个摄像头一条独立的采集流水线；学习时间和实时编码只跟随第一个（主）摄像头
+    pipelines = []
+    for index, camera in enumerate(cameras):
+        primary = index == 0
+        pipelines.append(CapturePipeline(
+            camera,
+            FrameProcessor(config, frame_size(config)),
+            config,
+            overlay_info,
+            frames_root=camera.settings["frames_root"],
+            live_encoder=live_encoder if primary else None,
+            on_status=logging.info,
+            on_capture=on_capture if primary else None,
+            catalog=catalog
+        ))
+
+    stop_event = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop_event.set())
+    exporter = MetricsExporter(config)
+    exporter.start()
+    for pipeline in pipelines:
+        pipeline.start()
+    logging.info(f"Capturing every {config['capture_interval']} seconds")
+    try:
+        stop_event.wait(args.duration)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for pipeline in pipelines:
+            pipeline.stop()
+        exporter.stop()
+        if live_encoder:
+            live_encoder.close()
+        for camera in cameras:
+            camera.release()
+        task_manager.end_current_task()
+        catalog.close()
+        aggregates.close()
+        study_time_manager.close()
+        storage.close()
+        for camera, pipeline in zip(cameras, pipelines):
+            logging.info(f"Stopped capturing {camera.name} "
+                         f"({pipeline.kept_frames} frames kept, {pipeline.dropped_frames} skipped)")
+    return 0
+
+
+def run_compile(args, config):
+    """
+    增量编译一天、一个日期范围或全部日期的视频，多天时在进程池中并行编译
+    """
+    from batch_compiler import BatchCompiler
+    from video_encoder import encoder_options
+
+    if args.between or args.task:
+        return run_compile_clip(args, config)
+    fps = args.fps or config["fps"]
+    frames_root = args.frames_root
+    if args.all:
+        start_date, end_date = "0000-00-00", "9999-99-99"
+    elif args.range:
+        start_date, end_date = args.range
+    else:
+        start_date = end_date = args.date
+    cache_root = os.path.join('output', 'cache')
+    if os.path.normpath(frames_root) != 'frames':
+        # 其他帧目录（例如 tools/dedupe_frames.py 生成的去重目录）使用独立的分段缓存
+        cache_root = os.path.join('output', 'cache_' + os.path.basename(os.path.normpath(frames_root)))
+    compiler = BatchCompiler(frames_root=frames_root, cache_root=cache_root, output_dir='output',
+                             workers=args.workers or config["compile_workers"], encoder_options=encoder_options(config),
+                             memory_mb=config["compile_memory_mb"])
+
+    def on_progress(date_str, status, completed, total):
+        if status != "queued":
+            print(f"[{completed}/{total}] {date_str}: {status}")
+
+    outputs = compiler.compile_range(start_date, end_date, fps, single=args.single, on_progress=on_progress)
+    if not outputs:
+        print(f"No frames found for {start_date if start_date == end_date else f'{start_date} - {end_date}'}")
+    for output_filename in outputs:
+        print(f"Video saved to {output_filename}")
+    return 0
+
+
+def time_bounds(args):
+    """
+    compile / frames 命令所选的时间范围
+    Returns:
+        tuple: (start, end) '%Y-%m-%d %H:%M:%S'
+    """
+    from frame_catalog import parse_time
+
+    if args.between:
+        start, end = args.between
+    elif getattr(args, "all", False):
+        start, end = "0001-01-01", "9999-12-31"
+    elif getattr(args, "range", None):
+        start, end = args.range
+    else:
+        start = end = args.date
+    return parse_time(start), parse_time(end, end=True)
+
+
+def run_compile_clip(args, config):
+    """
+    从帧索引按时间范围和任务取帧，编码为一个视频
+    """
+    from frame_catalog import FrameCatalog
+    from storage import create_storage
+    from video_encoder import encode_frame_files, encoder_options
+
+    start, end = time_bounds(args)
+    storage = create_storage(config)
+    catalog = FrameCatalog(config["frame_catalog_path"], storage=storage)
+    try:
+        frame_files = catalog.frame_paths(start, end, args.task, args.frames_root)
+    finally:
+        catalog.close()
+        storage.close()
+    label = f"{start} - {end}" + (f" ({args.task})" if args.task else "")
+    if not frame_files:
+        print(f"No frames found for {label}")
+        return 0
+    name = f"timelapse_{start[:16]}_{end[:16]}" + (f"_{args.task}" if args.task else "")
+    output_filename = os.path.join('output', re.sub(r"[^\w.-]+", "_", name) + ".mp4")
+    os.makedirs('output', exist_ok=True)
+    print(f"Encoding {len(frame_files)} frames for {label}")
+    encode_frame_files(frame_files, output_filename, args.fps or config["fps"], options=encoder_options(config),
+                       memory_mb=config["compile_memory_mb"])
+    print(f"Video saved to {output_filename}")
+    return 0
+
+
+def run_frames(args, config):
+    """
+    查找某一时刻最近的帧，或列出时间范围内（某任务）的帧
+    """
+    from frame_catalog import FrameCatalog, parse_time
+    from storage import create_storage
+
+    storage = create_storage(config)
+    catalog = FrameCatalog(config["frame_catalog_path"], storage=storage)
+    try:
+        if args.sync:
+            added = catalog.sync(args.frames_root, force=True)
+            print(f"Catalog synced, {added} frames added or updated")
+        if args.at:
+            entry = catalog.nearest(parse_time(args.at), args.frames_root)
+            if entry is None:
+                print(f"No frames found on {args.at[:10]}")
+            else:
+                print(f"{entry['timestamp']}  {entry['path']}  task: {entry['task'] or '-'}")
+        elif args.between or not args.sync:
+            start, end = time_bounds(args)
+            entries = catalog.frames(start, end, args.task, args.frames_root)
+            for entry in entries:
+                print(f"{entry['timestamp']}  {entry['path']}  task: {entry['task'] or '-'}")
+            print(f"{len(entries)} frames between {start} and {end}")
+    finally:
+        catalog.close()
+        storage.close()
+    return 0
+
+
+def run_stats(args, config):
+    """
+    打印指定日期的任务时间和学习时间
+    """
+    from overlay_renderer import format_duration
+    from study_time_manager import StudyTimeManager
+
+    storage, aggregates = open_storage(config)
+    try:
+        study_time = StudyTimeManager(storage=storage).get_study_time_for_date(args.date)
+        print(f"Date: {args.date}")
+        for task_name, seconds in sorted(aggregates.get_day(args.date).items(), key=lambda item: -item[1]):
+            print(f"- {task_name}: {format_duration(seconds)}")
+        print(f"Total Task Time: {format_duration(aggregates.get_day_total(args.date))}")
+        print(f"Total Study Time: {format_duration(study_time)}")
+    finally:
+        aggregates.close()
+        storage.close()
+    return 0
+
+
+def run_trends(args, config):
+    """
+    打印日期范围内各周期的任务时间、最近 7 天平均和连续学习天数
+    """
+    from analytics import RangeAnalytics
+    from overlay_renderer import format_duration
+    from storage import create_storage
+
+    storage = create_storage(config)
+    try:
+        start_date, end_date = args.range
+        analytics = RangeAnalytics(storage)
+        periods, task_names, hours = analytics.task_totals(start_date, end_date, args.period)
+        print(f"{args.period.capitalize()} totals, {start_date} to {end_date}:")
+        for period, row in zip(periods, hours):
+            tasks = ", ".join(f"{name} {format_duration(h * 3600)}" for name, h in zip(task_names, row) if h > 0)
+            print(f"- {period}: {format_duration(row.sum() * 3600)}" + (f" ({tasks})" if tasks else ""))
+        _, _, average = analytics.rolling_average(end_date, end_date, window=7)
+        print(f"7-day average up to {end_date}: {format_duration(average[-1] * 3600)} per day")
+        streaks = analytics.streaks(end_date)
+        print(f"Current streak: {streaks['current']} days, longest: {streaks['longest']} days"
+              + (f" ({streaks['longest_start']} to {streaks['longest_end']})" if streaks['longest'] else ""))
+    finally:
+        storage.close()
+    return 0
+
+
+def main(argv=None):
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    today = datetime.now().strftime('%Y-%m-%d')
+    parser = argparse.ArgumentParser(prog="timelapsecam", description="TimeLapseCam headless mode")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    capture_parser = subparsers.add_parser("capture", help="capture frames without the GUI")
+    capture_parser.add_argument("--task", help="task to record while capturing")
+    capture_parser.add_argument("--interval", type=int, help="capture interval in seconds (default: config)")
+    capture_parser.add_argument("--duration", type=float, help="stop after this many seconds")
+    capture_parser.set_defaults(func=run_capture)
+
+    compile_parser = subparsers.add_parser("compile", help="compile captured frames into videos")
+    compile_group = compile_parser.add_mutually_exclusive_group()
+    compile_group.add_argument("--date", default=today, help="date to compile (default: today)")
+    compile_group.add_argument("--all", action="store_true", help="compile every date folder")
+    compile_group.add_argument("--range", nargs=2, metavar=("START", "END"), help="compile a date range (inclusive)")
+    compile_group.add_argument("--between", nargs=2, metavar=("START", "END"),
+                               help="compile the frames between two times ('YYYY-MM-DD [HH:MM[:SS]]') into one video")
+    compile_parser.add_argument("--task", help="only use frames captured while this task was active")
+    compile_parser.add_argument("--single", action="store_true",
+                                help="join the range into one video timelapse_<start>_<end>.mp4")
+    compile_parser.add_argument("--workers", type=int, help="parallel compile processes (default: config)")
+    compile_parser.add_argument("--fps", type=int, help="output frame rate (default: config)")
+    compile_parser.add_argument("--frames-root", default="frames",
+                                help="frame root directory, e.g. frames_dedup from tools/dedupe_frames.py")
+    compile_parser.set_defaults(func=run_compile)
+
+    frames_parser = subparsers.add_parser("frames", help="look up captured frames by time or task")
+    frames_group = frames_parser.add_mutually_exclusive_group()
+    frames_group.add_argument("--date", default=today, help="list the frames of a date (default: today)")
+    frames_group.add_argument("--at", metavar="TIME", help="show the frame closest to 'YYYY-MM-DD HH:MM[:SS]'")
+    frames_group.add_argument("--between", nargs=2, metavar=("START", "END"), help="list the frames between two times")
+    frames_parser.add_argument("--task", help="only list frames captured while this task was active")
+    frames_parser.add_argument("--sync", action="store_true",
+                               help="rescan every date folder (after frames were deleted or replaced)")
+    frames_parser.add_argument("--frames-root", default="frames", help="frame root directory")
+    frames_parser.set_defaults(func=run_frames)
+
+    stats_parser = subparsers.add_parser("stats", help="show task and study time statistics")
+    stats_parser.add_argument("--date", default=today, help="date to show (default: today)")
+    stats_parser.set_defaults(func=run_stats)
+
+    trends_parser = subparsers.add_parser("trends", help="show task totals, averages and streaks over a date range")
+    month_ago = (datetime.now() - timedelta(days=29)).strftime('%Y-%m-%d')
+    trends_parser.add_argument("--range", nargs=2, metavar=("START", "END"), default=[month_ago, today],
+                               help="date range (default: the last 30 days)")
+    trends_parser.add_argument("--period", choices=("day", "week", "month", "year"), default="week")
+    trends_parser.set_defaults(func=run_trends)
+
+    args = parser.parse_args(argv)
+    return args.func(args, load_config())
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,331 @@
+import logging
+import os
+import re
+import sqlite3
+import threading
+from bisect import bisect_right
+from datetime import datetime
+
+from frame_manifest import file_checksum, frame_timestamp
+from frame_store import list_frame_files
+
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+DATE_PATTERN = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+
+def parse_time(text, end=False):
+    """
+    解析命令行 / 界面输入的时间，可省略时分秒
+    Args:
+        text (str): 'YYYY-MM-DD'、'YYYY-MM-DD HH:MM' 或 'YYYY-MM-DD HH:MM:SS'
+        end (bool): 作为范围终点时补齐到省略部分的末尾（当天 23:59:59 / 该分钟 59 秒）
+    Returns:
+        str: '%Y-%m-%d %H:%M:%S'
+    """
+    text = text.strip().replace("T", " ")
+    for fmt, suffix in (("%Y-%m-%d %H:%M:%S", ""), ("%Y-%m-%d %H:%M", ":59"), ("%Y-%m-%d", " 23:59:59")):
+        try:
+            parsed = datetime.strptime(text, fmt)
+        except ValueError:
+            continue
+        if end and suffix:
+            return parsed.strftime(fmt) + suffix
+        return parsed.strftime(TIME_FORMAT)
+    raise ValueError(f"Invalid time: {text!r} (expected YYYY-MM-DD [HH:MM[:SS]])")
+
+
+def session_resolver(sessions, now=None):
+    """
+    根据任务记录判断某一时刻进行中的任务（用于补录已有帧）
+    Args:
+        sessions (list): [{task_name, start_time, end_time}]（storage.get_sessions()），
+            end_time 为空的记录视为持续到 now
+        now (str): 未结束任务的截止时间，默认当前时间
+    Returns:
+        callable: task_at(timestamp) -> str | None
+    """
+    now = now or datetime.now().strftime(TIME_FORMAT)
+    intervals = sorted((s["start_time"], s["end_time"] or now, s["task_name"]) for s in sessions)
+    starts = [start for start, _, _ in intervals]
+
+    def task_at(timestamp):
+        index = bisect_right(starts, timestamp) - 1
+        # 记录不重叠时只需检查开始时间不晚于该时刻的最后一条
+        if index >= 0 and timestamp <= intervals[index][1]:
+            return intervals[index][2]
+        return None
+
+    return task_at
+
+
+def open_existing_catalog(config):
+    """
+    打开已建立的帧索引（tools/ 修改帧后更新索引）；从未建立过索引时返回 None，不创建空索引
+    Args:
+        config (dict): 应用配置（读取 frame_catalog_path）
+    """
+    path = config["frame_catalog_path"]
+    return FrameCatalog(path) if os.path.exists(path) else None
+
+
+class FrameCatalog:
+    """
+    持久化的帧索引（SQLite）：每帧的采集时间、路径、大小、当时进行中的任务和校验和，
+    按 (帧根目录, 时间) 和 (任务, 时间) 建立索引，按时间范围 / 任务查找帧无需扫描目录。
+    采集流水线在每帧写入后登记；采用目录之前已有的帧在首次查询到该日期时（或 sync()）补录，
+    任务由任务记录推断。修改或删除帧的工具（tools/）通过 update / remove / invalidate 保持索引一致。
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS frames (
+            path TEXT PRIMARY KEY,
+            root TEXT NOT NULL,
+            date TEXT NOT NULL,
+            timestamp TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            task TEXT,
+            checksum TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_frames_root_time ON frames(root, timestamp);
+        CREATE INDEX IF NOT EXISTS idx_frames_task_time ON frames(task, timestamp);
+        CREATE TABLE IF NOT EXISTS synced_dates (
+            root TEXT NOT NULL,
+            date TEXT NOT NULL,
+            PRIMARY KEY (root, date)
+        );
+    """
+
+    COLUMNS = ("timestamp", "path", "size", "task", "checksum")
+
+    def __init__(self, db_path="frame_catalog.db", storage=None):
+        """
+        Args:
+            db_path (str): 数据库文件路径
+            storage: 存储后端，补录已有帧时用任务记录推断任务（可选）
+        """
+        self.db_path = db_path
+        self.storage = storage
+        self._lock = threading.Lock()
+        # 补录互斥：后台补录和查询同时补录同一天时，后者等待前者完成后只需比较文件大小
+        self._sync_lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(self.SCHEMA)
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    @staticmethod
+    def _root(frames_root):
+        return os.path.normpath(frames_root)
+
+    # ---- 登记 ----
+
+    def add(self, path, captured_at, task=None, frames_root="frames"):
+        """
+        登记一帧（采集流水线在帧写入完成后调用，位于写入线程中）
+        Args:
+            path (str): 帧文件路径
+            captured_at (datetime): 采集时间
+            task (str): 采集时进行中的任务
+            frames_root (str): 帧根目录
+        """
+        size = os.path.getsize(path)
+        checksum = file_checksum(path)
+        path = os.path.normpath(path)
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO frames (path, root, date, timestamp, size, task, checksum) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (path, self._root(frames_root), captured_at.strftime("%Y-%m-%d"),
+                 captured_at.strftime(TIME_FORMAT), size, task, checksum)
+            )
+
+    def update(self, path, new_path=None, checksum=None):
+        """
+        帧被修复、缩放或重新编码（可能改变扩展名）后更新大小和校验和，保留采集时间和任务
+        Args:
+            path (str): 原帧文件路径
+            new_path (str): 新的帧文件路径，None 表示路径不变
+            checksum (str): 新文件的校验和，None 时重新计算
+        Returns:
+            bool: 索引中是否有这一帧（尚未补录的日期在补录时登记）
+        """
+        new_path = new_path or path
+        size = os.path.getsize(new_path)
+        checksum = checksum or file_checksum(new_path)
+        with self._lock, self.conn:
+            cursor = self.conn.execute(
+                "UPDATE frames SET path = ?, size = ?, checksum = ? WHERE path = ?",
+                (os.path.normpath(new_path), size, checksum, os.path.normpath(path))
+            )
+        return cursor.rowcount > 0
+
+    def remove(self, paths):
+        """
+        删除帧后从索引中移除
+        Args:
+            paths (list): 已删除的帧文件路径
+        """
+        with self._lock, self.conn:
+            self.conn.executemany("DELETE FROM frames WHERE path = ?", [(os.path.normpath(path),) for path in paths])
+
+    def invalidate(self, frames_root, dates):
+        """
+        标记日期需要重新补录（帧文件夹被外部工具批量改写后调用），下次查询该日期时与文件夹重新对齐
+        Args:
+            frames_root (str): 帧根目录
+            dates (list): 日期 'YYYY-MM-DD'
+        """
+        root = self._root(frames_root)
+        with self._lock, self.conn:
+            self.conn.executemany("DELETE FROM synced_dates WHERE root = ? AND date = ?",
+                                  [(root, date_str) for date_str in dates])
+
+    def sync_date(self, date_str, frames_root="frames"):
+        """
+        将某天的帧文件夹与索引对齐：补录新增或大小变化的帧，删除已不存在的帧
+        Returns:
+            int: 补录的帧数
+        """
+        with self._sync_lock:
+            return self._sync_date(date_str, frames_root)
+
+    def _sync_date(self, date_str, frames_root):
+        root = self._root(frames_root)
+        frames_dir = os.path.join(frames_root, date_str)
+        known = dict(self._query("SELECT path, size FROM frames WHERE root = ? AND date = ?", (root, date_str)))
+        on_disk = []
+        if os.path.isdir(frames_dir):
+            on_disk = [os.path.normpath(path) for path in list_frame_files(frames_dir)]
+        task_at = None
+        rows = []
+        # 校验和在锁外计算，补录期间采集线程仍可登记新帧
+        for path in on_disk:
+            size = os.path.getsize(path)
+            if known.get(path) == size:
+                continue
+            if task_at is None:
+                sessions = self.storage.get_sessions(date_str) if self.storage is not None else []
+                task_at = session_resolver(sessions)
+            captured_at = frame_timestamp(path) or datetime.fromtimestamp(os.path.getmtime(path))
+            timestamp = captured_at.strftime(TIME_FORMAT)
+            rows.append((path, root, date_str, timestamp, size, task_at(timestamp), file_checksum(path)))
+        removed = set(known) - set(on_disk)
+        with self._lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO frames (path, root, date, timestamp, size, task, checksum) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", rows
+            )
+            self.conn.executemany("DELETE FROM frames WHERE path = ?", [(path,) for path in removed])
+            self.conn.execute("INSERT OR IGNORE INTO synced_dates (root, date) VALUES (?, ?)", (root, date_str))
+        if rows or removed:
+            logging.info(f"Frame catalog {frames_dir}: {len(rows)} added, {len(removed)} removed")
+        return len(rows)
+
+    def sync(self, frames_root="frames", start_date=None, end_date=None, force=False, should_stop=None):
+        """
+        补录帧根目录下尚未同步过的日期（force 时重新检查所有日期）
+        Args:
+            frames_root (str): 帧根目录
+            start_date / end_date (str): 只同步该日期范围，None 表示不限
+            force (bool): 重新检查已同步的日期（帧被删除或替换后使用）
+            should_stop (callable): 返回 True 时在下一天之前停止
+        Returns:
+            int: 补录的帧数
+        """
+        if not os.path.isdir(frames_root):
+            return 0
+        synced = {date for (date,) in self._query("SELECT date FROM synced_dates WHERE root = ?",
+                                                   (self._root(frames_root),))}
+        added = 0
+        for date_str in sorted(os.listdir(frames_root)):
+            if not DATE_PATTERN.match(date_str) or (date_str in synced and not force):
+                continue
+            if (start_date and date_str < start_date) or (end_date and date_str > end_date):
+                continue
+            if should_stop and should_stop():
+                break
+            added += self.sync_date(date_str, frames_root)
+        return added
+
+    # ---- 查询 ----
+
+    def _where(self, start, end, task, frames_root):
+        sql = "root = ? AND timestamp >= ? AND timestamp <= ?"
+        params = [self._root(frames_root), start, end]
+        if task is not None:
+            sql += " AND task = ?"
+            params.append(task)
+        return sql, params
+
+    def frames(self, start, end, task=None, frames_root="frames"):
+        """
+        时间范围内的帧（按采集时间排序）；范围内尚未同步的日期先补录
+        Args:
+            start (str): 起始时间 '%Y-%m-%d %H:%M:%S'（含）
+            end (str): 结束时间 '%Y-%m-%d %H:%M:%S'（含）
+            task (str): 只返回该任务进行中时采集的帧，None 表示不限
+            frames_root (str): 帧根目录
+        Returns:
+            list: [{timestamp, path, size, task, checksum}]
+        """
+        self.sync(frames_root, start[:10], end[:10])
+        where, params = self._where(start, end, task, frames_root)
+        rows = self._query(f"SELECT {', '.join(self.COLUMNS)} FROM frames WHERE {where} ORDER BY timestamp, path", params)
+        return [dict(zip(self.COLUMNS, row)) for row in rows]
+
+    def frame_paths(self, start, end, task=None, frames_root="frames"):
+        """
+        Returns:
+            list: 时间范围内帧的路径（按采集时间排序）
+        """
+        return [entry["path"] for entry in self.frames(start, end, task, frames_root)]
+
+    def count(self, start, end, task=None, frames_root="frames"):
+        """
+        Returns:
+            int: 时间范围内的帧数
+        """
+        self.sync(frames_root, start[:10], end[:10])
+        where, params = self._where(start, end, task, frames_root)
+        return self._query(f"SELECT COUNT(*) FROM frames WHERE {where}", params)[0][0]
+
+    def nearest(self, timestamp, frames_root="frames"):
+        """
+        离指定时刻最近的一帧（同一天内查找）
+        Args:
+            timestamp (str): '%Y-%m-%d %H:%M:%S'
+        Returns:
+            dict | None: {timestamp, path, size, task, checksum}
+        """
+        date_str = timestamp[:10]
+        self.sync(frames_root, date_str, date_str)
+        root = self._root(frames_root)
+        columns = ", ".join(self.COLUMNS)
+        before = self._query(f"SELECT {columns} FROM frames WHERE root = ? AND timestamp <= ? AND date = ? "
+                             "ORDER BY timestamp DESC LIMIT 1", (root, timestamp, date_str))
+        after = self._query(f"SELECT {columns} FROM frames WHERE root = ? AND timestamp > ? AND date = ? "
+                            "ORDER BY timestamp LIMIT 1", (root, timestamp, date_str))
+        candidates = [dict(zip(self.COLUMNS, row)) for row in before + after]
+        if not candidates:
+            return None
+        target = datetime.strptime(timestamp, TIME_FORMAT)
+        return min(candidates,
+                   key=lambda entry: abs((datetime.strptime(entry["timestamp"], TIME_FORMAT) - target).total_seconds()))
+
+    def task_names(self, start=None, end=None, frames_root="frames"):
+        """
+        Returns:
+            list: 时间范围内帧上记录过的任务名称
+        """
+        where, params = self._where(start or "0000", end or "9999", None, frames_root)
+        rows = self._query(f"SELECT DISTINCT task FROM frames WHERE {where} AND task IS NOT NULL ORDER BY task",
+                           params)
+        return [task for (task,) in rows]
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
@@ -0,0 +1,118 @@
+import hashlib
+import json
+import os
+from datetime import datetime
+
+from frame_store import list_frame_files
+
+
+def frame_timestamp(filename):
+    """
+    从帧文件名解析采集时间（frame_%Y%m%d_%H%M%S.xxx，同一秒内的后续帧带 _NNN 序号）
+    Args:
+        filename (str): 帧文件名
+    Returns:
+        datetime | None: 采集时间，无法解析时返回 None
+    """
+    stem = os.path.splitext(os.path.basename(filename))[0]
+    if len(stem) > len("frame_YYYYmmdd_HHMMSS") and stem[len("frame_YYYYmmdd_HHMMSS")] == "_":
+        stem = stem[:len("frame_YYYYmmdd_HHMMSS")]
+    try:
+        return datetime.strptime(stem[len("frame_"):], "%Y%m%d_%H%M%S")
+    except ValueError:
+        return None
+
+
+def file_checksum(path, chunk_size=1 << 20):
+    """
+    计算文件的 MD5 校验和
+    """
+    md5 = hashlib.md5()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            md5.update(chunk)
+    return md5.hexdigest()
+
+
+class FrameManifest:
+    """
+    每日帧清单：frames/<date>/manifest.json
+    记录每帧的文件名、采集时间、大小、修改时间和校验和。
+    刷新时只对新增或发生变化的文件计算校验和。
+    """
+
+    MANIFEST_NAME = "manifest.json"
+
+    def __init__(self, frames_dir):
+        """
+        Args:
+            frames_dir (str): 日期帧目录，如 frames/2024-01-01
+        """
+        self.frames_dir = frames_dir
+        self.manifest_path = os.path.join(frames_dir, self.MANIFEST_NAME)
+        self.entries = self.load()
+
+    def load(self):
+        """
+        加载清单
+        Returns:
+            list: [{file, timestamp, size, mtime, checksum}]
+        """
+        if not os.path.exists(self.manifest_path):
+            return []
+        try:
+            with open(self.manifest_path, "r") as f:
+                return json.load(f)["frames"]
+        except (ValueError, KeyError):
+            return []
+
+    def save(self):
+        """
+        原子地保存清单
+        """
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"frames": self.entries}, f)
+        os.replace(tmp_path, self.manifest_path)
+
+    def list_frame_names(self):
+        """
+        列出目录中的帧文件名（已排序）
+        """
+        return [os.path.basename(path) for path in list_frame_files(self.frames_dir)]
+
+    def refresh(self):
+        """
+        扫描目录并更新清单
+        Returns:
+            list: 按文件名排序的清单条目
+        """
+        known = {entry["file"]: entry for entry in self.entries}
+        entries = []
+        changed = False
+        for name in self.list_frame_names():
+            path = os.path.join(self.frames_dir, name)
+            stat = os.stat(path)
+            entry = known.get(name)
+            if entry is None or entry["size"] != stat.st_size or entry["mtime"] != stat.st_mtime:
+                timestamp = frame_timestamp(name) or datetime.fromtimestamp(stat.st_mtime)
+                entry = {
+                    "file": name,
+                    "timestamp": timestamp.strftime("%Y-%m-%d %H:%M:%S"),
+                    "size": stat.st_size,
+                    "mtime": stat.st_mtime,
+                    "checksum": file_checksum(path)
+                }
+                changed = True
+            entries.append(entry)
+        if changed or len(entries) != len(self.entries):
+            self.entries = entries
+            self.save()
+        return self.entries
+
+    def frame_paths(self):
+        """
+        Returns:
+            list: 清单中所有帧的完整路径
+        """
+        return [os.path.join(self.frames_dir, entry["file"]) for entry in self.entries]
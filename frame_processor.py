@@ -0,0 +1,106 @@
+import cv2
+import numpy as np
+from PIL import Image
+
+from metrics import metrics
+from overlay_renderer import OverlayRenderer
+
+# resize_interpolation 配置 -> OpenCV 插值方式
+INTERPOLATIONS = {
+    "nearest": cv2.INTER_NEAREST,
+    "linear": cv2.INTER_LINEAR,
+    "cubic": cv2.INTER_CUBIC,
+    "area": cv2.INTER_AREA,
+    "lanczos": cv2.INTER_LANCZOS4,
+}
+
+
+class FrameProcessor:
+    """
+    帧处理：颜色转换、缩放到目标分辨率并叠加文字。
+    不依赖 Qt，可在采集线程或无界面模式中使用。
+    frame_backend 配置选择处理路径：
+        pil:   BGR -> RGB -> PIL LANCZOS 缩放 -> RGB 数组
+        numpy: cv2.resize 写入预分配缓冲区 -> 原地叠加，全程保持 OpenCV 的 BGR 数组
+    """
+
+    def __init__(self, config, target_size=(1920, 1080), buffer_count=16):
+        """
+        Args:
+            config (dict): 应用配置（读取 font_path / text_size / text_color / frame_backend / resize_interpolation）
+            target_size (tuple): 目标分辨率 (width, height)，None 表示保持摄像头原始分辨率（不缩放）
+            buffer_count (int): numpy 路径循环使用的输出缓冲区数量，
+                必须大于处理后仍在排队或写入中的帧数（采集流水线默认最多 14 帧）
+        """
+        self.config = config
+        self.target_size = target_size
+        self.buffer_count = buffer_count
+        self._buffers = []
+        self._next_buffer = 0
+        self.overlay_renderer = OverlayRenderer(config["font_path"], config["text_size"], config["text_color"])
+
+    def update_overlay_style(self):
+        """
+        字号或颜色改变后调用，使叠加缓存失效
+        """
+        self.overlay_renderer.set_style(self.config["font_path"], self.config["text_size"], self.config["text_color"])
+
+    @property
+    def output_bgr(self):
+        """
+        process() 的输出是否为 BGR 顺序（numpy 路径）
+        """
+        return self.config["frame_backend"] == "numpy"
+
+    def process(self, frame, overlay_info):
+        """
+        处理一帧
+        Args:
+            frame (numpy.ndarray): 摄像头读取的 BGR 帧
+            overlay_info (dict): 叠加信息 {current_time, study_time, task_name, total_study_time}
+        Returns:
+            numpy.ndarray: 处理后的帧，颜色顺序见 output_bgr
+        """
+        if self.output_bgr:
+            return self.process_numpy(frame, overlay_info)
+        return self.process_pil(frame, overlay_info)
+
+    def _take_buffer(self):
+        """
+        循环取用预分配的输出缓冲区
+        """
+        width, height = self.target_size
+        if not self._buffers or self._buffers[0].shape != (height, width, 3):
+            self._buffers = [np.empty((height, width, 3), dtype=np.uint8) for _ in range(self.buffer_count)]
+            self._next_buffer = 0
+        buffer = self._buffers[self._next_buffer]
+        self._next_buffer = (self._next_buffer + 1) % self.buffer_count
+        return buffer
+
+    def process_numpy(self, frame, overlay_info):
+        """
+        NumPy/OpenCV 路径：不经过 PIL，输出 BGR 数组
+        """
+        if self.target_size and (frame.shape[1], frame.shape[0]) != self.target_size:
+            interpolation = INTERPOLATIONS[self.config["resize_interpolation"]]
+            with metrics.timer("resize"):
+                frame = cv2.resize(frame, self.target_size, dst=self._take_buffer(), interpolation=interpolation)
+        with metrics.timer("overlay"):
+            return self.overlay_renderer.render(frame, overlay_info, bgr=True)
+
+    def process_pil(self, frame, overlay_info):
+        """
+        PIL 路径：输出 RGB 数组
+        """
+        with metrics.timer("convert"):
+            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            pil_image = Image.fromarray(frame_rgb)
+
+        # Resize image to target size
+        if self.target_size and pil_image.size != self.target_size:
+            with metrics.timer("resize"):
+                pil_image = pil_image.resize(self.target_size, Image.LANCZOS)
+
+        frame_rgb = np.array(pil_image)
+        with metrics.timer("overlay"):
+            return self.overlay_renderer.render(frame_rgb, overlay_info)
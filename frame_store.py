@@ -0,0 +1,166 @@
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from metrics import metrics
+
+# frame_format -> (文件扩展名, Pillow 格式名；None 表示 NumPy 原始数组)
+FRAME_FORMATS = {
+    "png": (".png", "PNG"),
+    "jpeg": (".jpg", "JPEG"),
+    "webp": (".webp", "WEBP"),
+    "npy": (".npy", None),
+}
+
+FRAME_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp", ".npy")
+
+
+def list_frame_files(frames_dir):
+    """
+    列出目录中所有支持格式的帧文件（按文件名即采集时间排序）
+    Args:
+        frames_dir (str): 帧目录
+    Returns:
+        list: 帧文件完整路径列表
+    """
+    return sorted(
+        os.path.join(frames_dir, f) for f in os.listdir(frames_dir)
+        if f.lower().endswith(FRAME_EXTENSIONS)
+    )
+
+
+def load_frame(path):
+    """
+    读取任意支持格式的帧
+    Args:
+        path (str): 帧文件路径
+    Returns:
+        numpy.ndarray: RGB uint8 数组
+    """
+    if path.lower().endswith(".npy"):
+        return np.load(path)
+    with Image.open(path) as img:
+        return np.asarray(img.convert("RGB"))
+
+
+def encode_bgr(frame, frame_format, config):
+    """
+    用 OpenCV 直接编码 BGR 数组（无需转换为 PIL 图像）
+    Returns:
+        bytes: 编码后的图像数据
+    """
+    if frame_format == "png":
+        params = [cv2.IMWRITE_PNG_COMPRESSION, config["png_compress_level"]]
+    elif frame_format == "jpeg":
+        params = [cv2.IMWRITE_JPEG_QUALITY, config["frame_quality"]]
+    else:
+        params = [cv2.IMWRITE_WEBP_QUALITY, config["frame_quality"]]
+    ok, buffer = cv2.imencode(FRAME_FORMATS[frame_format][0], frame, params)
+    if not ok:
+        raise RuntimeError(f"Cannot encode frame as {frame_format}")
+    return buffer.tobytes()
+
+
+def save_frame(image, path, config, bgr=False):
+    """
+    按配置的格式保存帧；先写临时文件再重命名，读取方不会看到写了一半的帧
+    Args:
+        image (PIL.Image | numpy.ndarray): 帧
+        path (str): 目标路径（含扩展名）
+        config (dict): 应用配置（读取 frame_format / png_compress_level / frame_quality）
+        bgr (bool): image 是否为 BGR 数组（numpy 处理路径）
+    """
+    frame_format = config["frame_format"]
+    pil_format = FRAME_FORMATS[frame_format][1]
+    tmp_path = path + ".part"
+    with open(tmp_path, "wb") as f:
+        if pil_format is None:
+            # .npy 始终按 RGB 保存
+            np.save(f, image[..., ::-1] if bgr else np.asarray(image))
+        elif bgr:
+            f.write(encode_bgr(image, frame_format, config))
+        else:
+            if isinstance(image, np.ndarray):
+                image = Image.fromarray(image)
+            if pil_format == "PNG":
+                image.save(f, format=pil_format, compress_level=config["png_compress_level"])
+            else:
+                image.save(f, format=pil_format, quality=config["frame_quality"])
+    os.replace(tmp_path, path)
+
+
+class FrameWriter:
+    """
+    后台帧写入池：编码和磁盘 I/O 在线程池中完成，不阻塞采集。
+    待写入帧数达到上限时 submit 会阻塞，从而限制内存占用。
+    """
+
+    def __init__(self, config, max_workers=2, max_pending=8):
+        """
+        Args:
+            config (dict): 应用配置（保存格式相关选项）
+            max_workers (int): 写入线程数
+            max_pending (int): 最多排队/写入中的帧数
+        """
+        self.config = config
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="frame-writer")
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._last_stem = None
+        self._sequence = 0
+
+    def frame_path(self, frames_dir, captured_at):
+        """
+        根据采集时间和当前格式生成帧文件路径。
+        文件名精确到秒；同一秒内的后续帧（采集间隔小于 1 秒）追加序号 _001、_002……，
+        避免互相覆盖，按文件名排序仍是采集顺序。只在采集线程中调用
+        """
+        extension = FRAME_FORMATS[self.config["frame_format"]][0]
+        stem = f"frame_{captured_at.strftime('%Y%m%d_%H%M%S')}"
+        if stem == self._last_stem:
+            self._sequence += 1
+        else:
+            self._last_stem, self._sequence = stem, 0
+        while True:
+            name = stem if self._sequence == 0 else f"{stem}_{self._sequence:03d}"
+            path = os.path.join(frames_dir, name + extension)
+            # 重启后同一秒内的帧可能已在磁盘上
+            if not os.path.exists(path):
+                return path
+            self._sequence += 1
+
+    def submit(self, image, path, on_saved=None, on_error=None, bgr=False):
+        """
+        提交一帧异步写入
+        Args:
+            image (PIL.Image | numpy.ndarray): 帧
+            path (str): 目标路径
+            on_saved (callable): on_saved(path)，写入成功后在写入线程中调用
+            on_error (callable): on_error(path, exception)
+            bgr (bool): image 是否为 BGR 数组
+        """
+        self._slots.acquire()
+        self.executor.submit(self._write, image, path, on_saved, on_error, bgr)
+
+    def _write(self, image, path, on_saved, on_error, bgr):
+        try:
+            with metrics.timer("save"):
+                save_frame(image, path, self.config, bgr)
+            if on_saved:
+                on_saved(path)
+        except Exception as e:
+            logging.exception(f"Exception occurred while saving frame {path}.")
+            if on_error:
+                on_error(path, e)
+        finally:
+            self._slots.release()
+
+    def close(self):
+        """
+        等待所有待写入的帧完成
+        """
+        self.executor.shutdown(wait=True)
@@ -1,27 +1,25 @@
+from startup_timing import startup_timer
 import logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
-import cv2
 import time
 import os
-import json
+import re
+import sys
+import multiprocessing
 from datetime import datetime, timedelta
-from PIL import Image, ImageDraw, ImageFont
 from PyQt5.QtWidgets import (
-    QApplication, QWidget, QLabel, QSlider, QPushButton, QColorDialog, QFileDialog, QVBoxLayout, QHBoxLayout, QComboBox, QLineEdit, QTextEdit, QCalendarWidget, QDialog, QProgressBar
+    QApplication, QWidget, QLabel, QSlider, QPushButton, QColorDialog, QFileDialog, QVBoxLayout, QHBoxLayout, QComboBox, QLineEdit, QTextEdit, QCalendarWidget, QDialog, QProgressBar,
+    QDateEdit, QDateTimeEdit
 )
-from PyQt5.QtCore import Qt, QTimer, QThread, pyqtSignal
+from PyQt5.QtCore import Qt, QThread, QObject, QTimer, QDate, QDateTime, QTime, pyqtSignal
 from PyQt5.QtGui import QColor
-from moviepy.video.io.ImageSequenceClip import ImageSequenceClip
-import sys
+from app_config import load_config, save_config, resource_path
 from study_time_manager import StudyTimeManager
 from task_manager import TaskManager
-from visualize_logs import LogVisualizer
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-from matplotlib.figure import Figure
-import matplotlib.pyplot as plt
-
-import sys
-import os
+from storage import create_storage
+from aggregates import AggregateIndex
+# cv2、moviepy、matplotlib 等较重的模块在首次使用时才导入，以缩短窗口出现前的启动时间
+startup_timer.mark("imports_done")
 
 class DateSelectorDialog(QDialog):
     def __init__(self, parent=None):
@@ -43,32 +41,374 @@ class DateSelectorDialog(QDialog):
         layout.addLayout(button_layout)
         self.setLayout(layout)
 
-def resource_path(relative_path):
-    """Get absolute path to resource, works for dev and for PyInstaller."""
-    try:
-        base_path = sys._MEIPASS
-    except Exception:
-        base_path = os.path.abspath(".")
-    return os.path.join(base_path, relative_path)
+class DateRangeDialog(QDialog):
+    """
+    选择日期范围（本周 / 本月 / 今年快捷按钮）和一个选项（视频输出方式或图表类型）
+    """
+
+    def __init__(self, parent=None, modes=("合并为一个视频", "每天一个视频"), title="选择日期范围"):
+        super().__init__(parent)
+        self.setWindowTitle(title)
+        layout = QVBoxLayout()
+
+        today = QDate.currentDate()
+        range_layout = QHBoxLayout()
+        self.start_edit = QDateEdit(today.addDays(1 - today.dayOfWeek()))
+        self.start_edit.setCalendarPopup(True)
+        self.start_edit.setDisplayFormat('yyyy-MM-dd')
+        self.end_edit = QDateEdit(today)
+        self.end_edit.setCalendarPopup(True)
+        self.end_edit.setDisplayFormat('yyyy-MM-dd')
+        range_layout.addWidget(QLabel("从"))
+        range_layout.addWidget(self.start_edit)
+        range_layout.addWidget(QLabel("到"))
+        range_layout.addWidget(self.end_edit)
+        layout.addLayout(range_layout)
+
+        preset_layout = QHBoxLayout()
+        week_button = QPushButton("本周")
+        week_button.clicked.connect(lambda: self.start_edit.setDate(today.addDays(1 - today.dayOfWeek())))
+        month_button = QPushButton("本月")
+        month_button.clicked.connect(lambda: self.start_edit.setDate(QDate(today.year(), today.month(), 1)))
+        year_button = QPushButton("今年")
+        year_button.clicked.connect(lambda: self.start_edit.setDate(QDate(today.year(), 1, 1)))
+        preset_layout.addWidget(week_button)
+        preset_layout.addWidget(month_button)
+        preset_layout.addWidget(year_button)
+        layout.addLayout(preset_layout)
+
+        self.mode_dropdown = QComboBox()
+        self.mode_dropdown.addItems(list(modes))
+        layout.addWidget(self.mode_dropdown)
+
+        button_layout = QHBoxLayout()
+        ok_button = QPushButton("确定")
+        cancel_button = QPushButton("取消")
+        ok_button.clicked.connect(self.accept)
+        cancel_button.clicked.connect(self.reject)
+        button_layout.addWidget(ok_button)
+        button_layout.addWidget(cancel_button)
+        layout.addLayout(button_layout)
+        self.setLayout(layout)
+
+    def selected_range(self):
+        """
+        Returns:
+            tuple: (start_date, end_date, single)
+        """
+        start = self.start_edit.date().toString('yyyy-MM-dd')
+        end = self.end_edit.date().toString('yyyy-MM-dd')
+        return min(start, end), max(start, end), self.mode_dropdown.currentIndex() == 0
+
+    def selected_mode(self):
+        """
+        Returns:
+            int: 所选选项的序号
+        """
+        return self.mode_dropdown.currentIndex()
+
+
+class ClipDialog(QDialog):
+    """
+    选择时间范围和任务，生成该时间段内（该任务进行中时）采集的帧的视频
+    """
+
+    ALL_TASKS = "全部任务"
+
+    def __init__(self, parent=None, task_names=()):
+        super().__init__(parent)
+        self.setWindowTitle("按时间 / 任务生成视频")
+        layout = QVBoxLayout()
+
+        now = QDateTime.currentDateTime()
+        range_layout = QHBoxLayout()
+        self.start_edit = QDateTimeEdit(QDateTime(now.date(), QTime(0, 0)))
+        self.start_edit.setCalendarPopup(True)
+        self.start_edit.setDisplayFormat('yyyy-MM-dd HH:mm')
+        self.end_edit = QDateTimeEdit(now)
+        self.end_edit.setCalendarPopup(True)
+        self.end_edit.setDisplayFormat('yyyy-MM-dd HH:mm')
+        range_layout.addWidget(QLabel("从"))
+        range_layout.addWidget(self.start_edit)
+        range_layout.addWidget(QLabel("到"))
+        range_layout.addWidget(self.end_edit)
+        layout.addLayout(range_layout)
+
+        self.task_dropdown = QComboBox()
+        self.task_dropdown.addItem(self.ALL_TASKS)
+        self.task_dropdown.addItems(list(task_names))
+        layout.addWidget(self.task_dropdown)
+
+        button_layout = QHBoxLayout()
+        ok_button = QPushButton("确定")
+        cancel_button = QPushButton("取消")
+        ok_button.clicked.connect(self.accept)
+        cancel_button.clicked.connect(self.reject)
+        button_layout.addWidget(ok_button)
+        button_layout.addWidget(cancel_button)
+        layout.addLayout(button_layout)
+        self.setLayout(layout)
+
+    def selected_clip(self):
+        """
+        Returns:
+            tuple: (start, end, task) 时间为 '%Y-%m-%d %H:%M:%S'（结束时间包含该分钟），task 为 None 表示全部任务
+        """
+        start = self.start_edit.dateTime().toString('yyyy-MM-dd HH:mm:00')
+        end = self.end_edit.dateTime().toString('yyyy-MM-dd HH:mm:59')
+        task = self.task_dropdown.currentText()
+        return min(start, end), max(start, end), None if task == self.ALL_TASKS else task
+
+
+class ProgressMeter:
+    """
+    把帧进度换算为编码帧率和剩余时间，并限制进度信号的频率
+    """
+
+    INTERVAL = 0.2  # 进度信号的最小间隔（秒）
+
+    def __init__(self, emit):
+        """
+        Args:
+            emit (callable): emit(done, total, speed, eta)
+        """
+        self.emit = emit
+        self._started_at = None
+        self._start_frames = 0
+        self._last_emit = 0
+
+    def update(self, done, total):
+        now = time.monotonic()
+        if self._started_at is None:
+            # 缓存中已有的帧不计入编码速度
+            self._started_at, self._start_frames = now, done
+        if done < total and now - self._last_emit < self.INTERVAL:
+            return
+        self._last_emit = now
+        encoded = done - self._start_frames
+        elapsed = now - self._started_at
+        speed = encoded / elapsed if elapsed > 0 else 0.0
+        eta = (total - done) / speed if speed > 0 else -1.0
+        self.emit(done, total, speed, eta)
+
+
+class BatchCompileThread(QThread):
+    """
+    在后台线程中调度多日期编译（实际编码在进程池中进行）
+    """
+    progress = pyqtSignal(str, str, int, int)            # 日期，任务状态，已完成数，总数
+    frame_progress = pyqtSignal(int, int, float, float)  # 所有日期合计的已完成帧数，总帧数，编码帧率，剩余秒数
+    finished = pyqtSignal(list)                          # 生成的视频路径
+    error = pyqtSignal(str)                              # 错误信息
+    cancelled = pyqtSignal()                             # 已取消（已完成的日期视频保留）
+
+    def __init__(self, start_date, end_date, fps, single, workers=0, encoder_options=None, memory_mb=0):
+        super().__init__()
+        self.start_date = start_date
+        self.end_date = end_date
+        self.fps = fps
+        self.single = single
+        self.workers = workers
+        self.encoder_options = encoder_options
+        self.memory_mb = memory_mb
+        self._cancel_requested = False
+
+    def cancel(self):
+        """
+        请求取消：尚未开始的日期不再编译，正在编码的日期在下一帧停止
+        """
+        self._cancel_requested = True
+
+    def run(self):
+        from batch_compiler import BatchCompiler
+
+        try:
+            compiler = BatchCompiler(workers=self.workers, encoder_options=self.encoder_options,
+                                     memory_mb=self.memory_mb)
+            outputs = compiler.compile_range(
+                self.start_date, self.end_date, self.fps, single=self.single, on_progress=self.progress.emit,
+                should_cancel=lambda: self._cancel_requested,
+                on_frames=ProgressMeter(self.frame_progress.emit).update
+            )
+            if self._cancel_requested:
+                self.cancelled.emit()
+            else:
+                self.finished.emit(outputs)
+        except Exception as e:
+            self.error.emit(str(e))
+
 
 class VideoGeneratorThread(QThread):
     finished = pyqtSignal(str)  # 发送生成完成的视频路径
     error = pyqtSignal(str)     # 发送错误信息
-    
-    def __init__(self, frame_files, output_filename, fps):
+    progress = pyqtSignal(int, int, float, float)  # 已完成帧数，总帧数，编码帧率，剩余秒数（未知时为 -1）
+    cancelled = pyqtSignal()    # 已取消
+
+    def __init__(self, date_str, output_filename, fps, catalog=None, live_encoder=None, encoder_options=None,
+                 memory_mb=0):
         super().__init__()
-        self.frame_files = frame_files
+        self.date_str = date_str
         self.output_filename = output_filename
         self.fps = fps
-        
+        self.catalog = catalog  # 帧索引，在工作线程中查询当天的帧（未补录的日期需要计算校验和）
+        self.live_encoder = live_encoder  # 实时编码的分段覆盖全部帧时直接无损拼接
+        self.encoder_options = encoder_options
+        self.memory_mb = memory_mb  # 预读解码帧的内存上限
+        self._cancel_requested = False
+        self._on_progress = ProgressMeter(self.progress.emit).update
+
+    def cancel(self):
+        """
+        请求取消：编码器在下一帧停止，编码了一半的分段被删除
+        """
+        self._cancel_requested = True
+
     def run(self):
+        from video_compiler import IncrementalCompiler
+        from video_encoder import EncodeCancelled, concat_segments
+
         try:
-            clip = ImageSequenceClip(self.frame_files, fps=self.fps)
-            clip.write_videofile(self.output_filename, codec='libx264')
+            frames = self.catalog.frames(f"{self.date_str} 00:00:00", f"{self.date_str} 23:59:59")
+            if not frames:
+                raise ValueError(f"No frames found for {self.date_str}")
+            segment_files = None
+            if self.live_encoder:
+                segment_files = self.live_encoder.get_segment_files(self.date_str, self.fps,
+                                                                    expected_frames=len(frames))
+            if segment_files:
+                concat_segments(segment_files, self.output_filename)
+            else:
+                # 只编码上次编译后新增的帧，并与缓存分段拼接；帧列表取自帧索引，无需扫描帧文件夹
+                compiler = IncrementalCompiler(encoder_options=self.encoder_options, memory_mb=self.memory_mb)
+                compiler.compile(
+                    self.date_str, self.output_filename, self.fps,
+                    on_progress=self._on_progress, should_cancel=lambda: self._cancel_requested, frames=frames
+                )
+            self.finished.emit(self.output_filename)
+        except EncodeCancelled:
+            self.cancelled.emit()
+        except Exception as e:
+            self.error.emit(str(e))
+
+class ClipGeneratorThread(VideoGeneratorThread):
+    """
+    从帧索引按时间范围和任务取帧并编码为一个视频（不使用分段缓存）
+    """
+
+    def __init__(self, catalog, start, end, task, output_filename, fps, encoder_options=None, memory_mb=0):
+        super().__init__(f"{start} - {end}", output_filename, fps, catalog, encoder_options=encoder_options,
+                         memory_mb=memory_mb)
+        self.start_time = start
+        self.end_time = end
+        self.task = task
+
+    def run(self):
+        from video_encoder import EncodeCancelled, encode_frame_files
+
+        try:
+            frame_files = self.catalog.frame_paths(self.start_time, self.end_time, self.task)
+            if not frame_files:
+                raise ValueError(f"No frames found for {self.date_str}" + (f" ({self.task})" if self.task else ""))
+            total = len(frame_files)
+            encode_frame_files(
+                frame_files, self.output_filename, self.fps,
+                on_progress=lambda done: self._on_progress(done, total),
+                should_cancel=lambda: self._cancel_requested,
+                options=self.encoder_options, memory_mb=self.memory_mb
+            )
             self.finished.emit(self.output_filename)
+        except EncodeCancelled:
+            if os.path.exists(self.output_filename):
+                os.remove(self.output_filename)
+            self.cancelled.emit()
         except Exception as e:
             self.error.emit(str(e))
 
+class CatalogSyncThread(QThread):
+    """
+    在后台补录帧索引中尚未登记的日期（首次补录时需要为已有的帧计算校验和）
+    """
+
+    def __init__(self, catalog, frames_roots):
+        super().__init__()
+        self.catalog = catalog
+        self.frames_roots = frames_roots
+        self._stop_requested = False
+
+    def stop(self):
+        """
+        在下一天之前停止补录
+        """
+        self._stop_requested = True
+
+    def run(self):
+        try:
+            for frames_root in self.frames_roots:
+                self.catalog.sync(frames_root, should_stop=lambda: self._stop_requested)
+        except Exception:
+            logging.exception("Exception occurred while syncing the frame catalog.")
+
+class ChartThread(QThread):
+    """
+    在后台线程中获取（或生成）图表
+    """
+    finished = pyqtSignal(int, str, object)  # 请求编号，图表标识（日期或范围），Figure（没有数据时为 None）
+
+    def __init__(self, request_id, label, build):
+        """
+        Args:
+            request_id (int): 请求编号
+            label (str): 图表标识
+            build (callable): 返回 Figure 或 None
+        """
+        super().__init__()
+        self.request_id = request_id
+        self.label = label
+        self.build = build
+
+    def run(self):
+        fig = None
+        try:
+            fig = self.build()
+        except Exception:
+            logging.exception(f"Exception occurred while rendering the chart for {self.label}.")
+        self.finished.emit(self.request_id, self.label, fig)
+
+class CaptureSignals(QObject):
+    """
+    将采集流水线工作线程的回调转发到界面线程
+    """
+    frame_saved = pyqtSignal(str)  # 已保存的帧文件路径
+    status = pyqtSignal(str)       # 状态信息
+    captured = pyqtSignal(bool, float)  # 是否保留该帧，距上次采集的秒数
+
+
+class CameraOpener(QThread):
+    """
+    在后台线程中打开所有配置的摄像头（cv2.VideoCapture 可能阻塞数秒），避免阻塞窗口显示
+    """
+    opened = pyqtSignal(list)  # 已打开的 Camera 列表
+    failed = pyqtSignal(str)   # 错误信息
+
+    def __init__(self, config):
+        super().__init__()
+        self.config = config
+        self.cameras = []
+
+    def run(self):
+        try:
+            from camera import open_cameras
+
+            self.cameras = open_cameras(self.config)
+            if self.cameras:
+                self.opened.emit(self.cameras)
+            else:
+                self.failed.emit("Camera could not be accessed.")
+        except Exception as e:
+            logging.exception("Exception occurred while setting up the camera.")
+            self.failed.emit(str(e))
+
+
 class TimeLapseCam(QWidget):
     """
     Main application window for TimeLapseCam.
@@ -78,54 +418,183 @@ class TimeLapseCam(QWidget):
     def __init__(self) -> None:
         super().__init__()
         self.load_config()
-        self.task_manager = TaskManager(task_file="tasks.json", log_file="task_log.json")
+        self.storage = create_storage(self.config)
+        self.aggregates = AggregateIndex(self.storage, path="task_aggregates.json")
+        self.task_manager = TaskManager(
+            task_file="tasks.json", log_file="task_log.json", storage=self.storage, aggregates=self.aggregates
+        )
+        self.study_time_manager = StudyTimeManager(
+            storage=self.storage,
+            flush_interval=self.config["study_time_flush_interval"],
+            journal_path="study_time.journal"
+        )
         self.init_ui()
         self.setup_directories()
+        self.cameras = []
+        self.live_encoder = None
+        self.metrics_exporter = None
+        self.frame_catalog = None
+        self.catalog_sync_thread = None
+        self.frame_processor = None
+        self.visualization_canvas = None
+        self.visualizer = None
+        self.chart_threads = []
+        self.chart_request_id = 0
+        self.displayed_chart_date = None
         self.setup_camera()
 
         self.start_time = time.time()
-        self.study_time_manager = StudyTimeManager()
         self.study_time = self.study_time_manager.get_today_study_time()
+        self.total_study_time = self.study_time
 
         self.capturing = False
-        self.timer = QTimer()
-        self.timer.timeout.connect(self.capture_frame)
+        self.capture_signals = CaptureSignals()
+        self.capture_signals.frame_saved.connect(self.on_frame_saved)
+        self.capture_signals.captured.connect(self.on_captured)
+        self.capture_signals.status.connect(self.status_label.setText)
+        self.capture_pipelines = []
+        self.video_thread = None
+        self.batch_thread = None
         self.date_str = datetime.now().strftime('%Y-%m-%d')
 
-        # Default to displaying today's data
-        today_str = datetime.now().strftime('%Y-%m-%d')
-        visualizer = LogVisualizer()
-        fig = visualizer.visualize_daily_study_time(today_str)
-        if fig:
-            self.display_figure(fig, today_str)
+        # 今日图表、帧处理器等在窗口首次绘制后再初始化
+        self.deferred_init_done = False
+        self.pending_startup_marks = {"camera", "chart"}
+        startup_timer.mark("window_constructed")
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if not self.deferred_init_done:
+            self.deferred_init_done = True
+            QTimer.singleShot(0, self.deferred_init)
+
+    def deferred_init(self):
+        """
+        首次绘制后的初始化：采集组件和今日图表
+        """
+        startup_timer.mark("first_paint")
+        try:
+            self.init_capture_components()
+        except Exception:
+            logging.exception("Exception occurred while initializing capture components.")
+        try:
+            # Default to displaying today's data（在后台生成，完成后记录启动阶段）
+            self.request_chart(datetime.now().strftime('%Y-%m-%d'))
+        except Exception:
+            logging.exception("Exception occurred during deferred initialization.")
+            self.finish_startup_mark("chart")
+
+    def finish_startup_mark(self, name):
+        """
+        记录启动阶段完成；摄像头和图表都就绪后输出启动耗时报告
+        """
+        if name not in self.pending_startup_marks:
+            return
+        startup_timer.mark(f"{name}_ready")
+        self.pending_startup_marks.discard(name)
+        if not self.pending_startup_marks:
+            startup_timer.report()
+
+    def init_capture_components(self):
+        """
+        创建帧处理器、实时编码器、指标导出和帧索引（首次调用时导入 cv2 / PIL），并在后台补录帧索引
+        """
+        if self.frame_processor is not None:
+            return
+        from camera import camera_configs, frame_size
+        from frame_processor import FrameProcessor
+        from metrics import MetricsExporter
+
+        self.frame_processor = FrameProcessor(self.config, frame_size(self.config))
+        self.catalog_sync_thread = CatalogSyncThread(
+            self.ensure_frame_catalog(), [settings["frames_root"] for settings in camera_configs(self.config)]
+        )
+        self.catalog_sync_thread.start()
+        self.metrics_exporter = MetricsExporter(self.config)
+        self.metrics_exporter.start()
+        if self.config["live_encode"]:
+            from video_encoder import LiveVideoEncoder
+
+            self.live_encoder = LiveVideoEncoder(
+                segments_root='segments',
+                segment_frames=self.config["live_segment_frames"],
+                fourcc=self.config["live_encode_fourcc"]
+            )
+
+    def ensure_frame_catalog(self):
+        """
+        打开帧索引（frame_catalog 依赖 frame_store，会导入 cv2）
+        """
+        if self.frame_catalog is None:
+            from frame_catalog import FrameCatalog
+
+            self.frame_catalog = FrameCatalog(self.config["frame_catalog_path"], storage=self.storage)
+        return self.frame_catalog
+
+    def ensure_visualizer(self):
+        if self.visualizer is None:
+            from visualize_logs import LogVisualizer
+
+            self.visualizer = LogVisualizer(storage=self.storage, aggregates=self.aggregates)
+        return self.visualizer
+
+    def request_chart(self, date_str):
+        """
+        在后台线程中获取某天的图表；缓存命中时几乎立即返回
+        """
+        visualizer = self.ensure_visualizer()
+        self.start_chart_thread(date_str, lambda: visualizer.visualize_daily_study_time(date_str))
+
+    def start_chart_thread(self, label, build):
+        """
+        只显示最后一次请求的结果，快速切换日期时较早的结果被丢弃
+        """
+        self.chart_request_id += 1
+        thread = ChartThread(self.chart_request_id, label, build)
+        thread.finished.connect(self.on_chart_ready)
+        self.chart_threads.append(thread)
+        thread.start()
+
+    def on_chart_ready(self, request_id, date_str, fig):
+        """
+        图表生成完成（界面线程）
+        """
+        self.chart_threads = [thread for thread in self.chart_threads if thread.isRunning()]
+        startup = "chart" in self.pending_startup_marks
+        if request_id == self.chart_request_id:
+            if fig:
+                self.display_figure(fig, date_str)
+            elif not startup:
+                self.status_label.setText(f"Status: No data to visualize for {date_str}")
+        self.finish_startup_mark("chart")
+
+    def refresh_chart(self):
+        """
+        任务记录变化后刷新当前显示的今日图表（缓存按数据变化自动失效）
+        """
+        if self.visualizer is not None:
+            self.visualizer.invalidate()
+        if self.displayed_chart_date == datetime.now().strftime('%Y-%m-%d'):
+            self.request_chart(self.displayed_chart_date)
+
+    def ensure_visualization_canvas(self):
+        """
+        首次显示图表时创建 matplotlib 画布
+        """
+        if self.visualization_canvas is None:
+            from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+            from matplotlib.figure import Figure
+
+            self.visualization_canvas = FigureCanvas(Figure(figsize=(16, 8)))
+            self.visualization_layout.addWidget(self.visualization_canvas)
+        return self.visualization_canvas
 
     def load_config(self):
         # Load configuration from config.json
-        default_config = {
-            "text_size": 20,
-            "text_color": "#FFFFFF",
-            "capture_interval": 5,
-            "font_path": "assets/fonts/Arial.ttf"
-            
-        }
-        config_path = resource_path('config.json')
-        if not os.path.exists(config_path):
-            with open(config_path, 'w') as f:
-                json.dump(default_config, f, indent=4)
-            self.config = default_config
-        else:
-            with open(config_path, 'r') as f:
-                self.config = json.load(f)
-        # Ensure font path exists
-        font_path = resource_path(self.config["font_path"])
-        if not os.path.exists(font_path):
-            self.config["font_path"] = "assets/fonts/Arial.ttf"  # fallback to default
-            with open('config.json', 'w') as f:
-                json.dump(self.config, f, indent=4)
+        self.config = load_config()
 
     def save_config(self):
-        with open('config.json', 'w') as f:
-            json.dump(self.config, f, indent=4)
+        save_config(self.config)
 
     def init_ui(self) -> None:
         """
@@ -183,6 +652,7 @@ class TimeLapseCam(QWidget):
             
             # read from config
             self.fps_slider.setValue(self.config.get("fps", 2))
+            self.fps_slider.valueChanged.connect(self.update_fps)
             fps_layout.addWidget(fps_label)
             fps_layout.addWidget(self.fps_slider)
             layout.addLayout(fps_layout)
@@ -229,6 +699,18 @@ class TimeLapseCam(QWidget):
             self.status_label = QLabel("Status: Idle")
             layout.addWidget(self.status_label)
 
+            # 视频生成进度和取消按钮（生成时显示）
+            progress_layout = QHBoxLayout()
+            self.video_progress_bar = QProgressBar()
+            self.video_progress_bar.setFormat("%v / %m frames")
+            self.cancel_video_button = QPushButton("取消生成")
+            self.cancel_video_button.clicked.connect(self.cancel_video_generation)
+            progress_layout.addWidget(self.video_progress_bar)
+            progress_layout.addWidget(self.cancel_video_button)
+            layout.addLayout(progress_layout)
+            self.video_progress_bar.hide()
+            self.cancel_video_button.hide()
+
             # Save and Exit Button
             save_exit_layout = QHBoxLayout()
             self.save_button = QPushButton("Save Settings")
@@ -254,6 +736,16 @@ class TimeLapseCam(QWidget):
             
             video_buttons_layout.addWidget(self.generate_today_video_button)
             video_buttons_layout.addWidget(self.generate_video_button)
+
+            # 按日期范围生成视频按钮
+            self.generate_range_video_button = QPushButton("按日期范围生成视频")
+            self.generate_range_video_button.clicked.connect(self.show_generate_range_dialog)
+            video_buttons_layout.addWidget(self.generate_range_video_button)
+
+            # 按时间范围 / 任务生成视频按钮
+            self.generate_clip_video_button = QPushButton("按时间/任务生成视频")
+            self.generate_clip_video_button.clicked.connect(self.show_generate_clip_dialog)
+            video_buttons_layout.addWidget(self.generate_clip_video_button)
             layout.addLayout(video_buttons_layout)
 
             # Add Visualize Logs Button
@@ -261,9 +753,14 @@ class TimeLapseCam(QWidget):
             visualize_logs_button.clicked.connect(self.open_log_visualizer)
             layout.addWidget(visualize_logs_button)
 
+            trends_button = QPushButton("Study Trends")
+            trends_button.clicked.connect(self.open_trends_dialog)
+            layout.addWidget(trends_button)
+
             # Add Visualization Display
-            self.visualization_canvas = FigureCanvas(Figure(figsize=(16, 8)))  # Further increased figure size
-            layout.addWidget(self.visualization_canvas)
+            # 画布在首次显示图表时创建（见 ensure_visualization_canvas）
+            self.visualization_layout = QVBoxLayout()
+            layout.addLayout(self.visualization_layout)
 
             self.setLayout(layout)
             logging.info("UI initialized successfully")
@@ -275,7 +772,9 @@ class TimeLapseCam(QWidget):
         """
         选择任务
         """
+        self.study_time_manager.flush()
         self.task_manager.start_task(task_name)
+        self.refresh_chart()
         #log out the task choose
         logging.info(f"Task selected: {task_name}")
 
@@ -285,7 +784,9 @@ class TimeLapseCam(QWidget):
         """
         task_name = self.new_task_input.text()
         if (task_name and task_name not in self.task_manager.get_all_tasks()):
+            self.study_time_manager.flush()
             self.task_manager.start_task(task_name)
+            self.refresh_chart()
             self.task_dropdown.addItem(task_name)
             self.new_task_input.clear()
             logging.info(f"New task added: {task_name}")
@@ -304,176 +805,135 @@ class TimeLapseCam(QWidget):
 
     def setup_camera(self) -> None:
         """
-        Initialize the camera for capturing frames.
+        Open the camera in a background thread; capturing is enabled once it is ready.
         """
-        try:
-            self.cap = cv2.VideoCapture(0)
-            if not self.cap.isOpened():
-                self.status_label.setText("Status: Cannot access camera")
-                self.start_button.setEnabled(False)
-                logging.error("Camera could not be accessed.")
-            else:
-                self.status_label.setText("Status: Camera Ready")
-                logging.info("Camera initialized successfully.")
-        except Exception as e:
-            logging.exception("Exception occurred while setting up the camera.")
-            self.status_label.setText("Status: Camera Setup Failed")
+        self.start_button.setEnabled(False)
+        self.status_label.setText("Status: Opening camera...")
+        self.camera_opener = CameraOpener(self.config)
+        self.camera_opener.opened.connect(self.on_camera_opened)
+        self.camera_opener.failed.connect(self.on_camera_failed)
+        self.camera_opener.start()
+
+    def on_camera_opened(self, cameras):
+        self.cameras = cameras
+        self.start_button.setEnabled(True)
+        if len(cameras) > 1:
+            self.status_label.setText(f"Status: {len(cameras)} Cameras Ready")
+        else:
+            self.status_label.setText("Status: Camera Ready")
+        logging.info(f"Camera initialized successfully: {', '.join(camera.name for camera in cameras)}")
+        self.finish_startup_mark("camera")
+
+    def on_camera_failed(self, error_msg):
+        self.status_label.setText("Status: Cannot access camera")
+        logging.error(error_msg)
+        self.finish_startup_mark("camera")
+
+    def update_overlay_styles(self):
+        """
+        字号或颜色改变后更新所有摄像头的帧处理器
+        """
+        processors = {pipeline.processor for pipeline in self.capture_pipelines}
+        if self.frame_processor:
+            processors.add(self.frame_processor)
+        for processor in processors:
+            processor.update_overlay_style()
 
     def update_text_size(self, value):
         self.config["text_size"] = value
+        self.update_overlay_styles()
 
     def choose_text_color(self):
         color = QColorDialog.getColor()
         if color.isValid():
             self.config["text_color"] = color.name()
+            self.update_overlay_styles()
             self.text_color_button.setStyleSheet(f"background-color: {self.config['text_color']}")
 
     def update_capture_interval(self, value):
         self.config["capture_interval"] = value
-        if self.capturing:
-            self.timer.stop()
-            self.timer.start(self.config["capture_interval"] * 1000)
+        for pipeline in self.capture_pipelines:
+            pipeline.reschedule()
+
+    def update_fps(self, value):
+        self.config["fps"] = value
 
     def toggle_capturing(self):
         if not self.capturing:
+            from camera import frame_size
+            from capture_pipeline import CapturePipeline
+            from frame_processor import FrameProcessor
+
+            self.init_capture_components()
             self.capturing = True
             self.start_button.setText("Stop Capturing")
             self.status_label.setText("Status: Capturing")
-            self.timer.start(self.config["capture_interval"] * 1000)
+            # 每个摄像头一条独立的采集流水线；学习时间、状态和实时编码只跟随第一个（主）摄像头
+            for index, camera in enumerate(self.cameras):
+                primary = index == 0
+                pipeline = CapturePipeline(
+                    camera,
+                    self.frame_processor if primary else FrameProcessor(self.config, frame_size(self.config)),
+                    self.config,
+                    self.get_overlay_info,
+                    frames_root=camera.settings["frames_root"],
+                    live_encoder=self.live_encoder if primary else None,
+                    on_frame_saved=self.capture_signals.frame_saved.emit if primary else None,
+                    on_status=self.capture_signals.status.emit,
+                    on_capture=self.capture_signals.captured.emit if primary else None,
+                    catalog=self.frame_catalog
+                )
+                pipeline.start()
+                self.capture_pipelines.append(pipeline)
             logging.info("Started capturing")
         else:
             self.capturing = False
             self.start_button.setText("Start Capturing")
             self.status_label.setText("Status: Idle")
-            self.timer.stop()
+            self.stop_capture_pipeline()
             logging.info("Stopped capturing")
 
+    def stop_capture_pipeline(self):
+        """
+        停止采集流水线并关闭实时编码分段
+        """
+        for pipeline in self.capture_pipelines:
+            pipeline.stop()
+        self.capture_pipelines = []
+        if self.live_encoder:
+            self.live_encoder.close()
+
     def save_settings(self):
         self.save_config()
         self.status_label.setText("Status: Settings Saved")
 
-    target_size = (1920, 1080)  # 目标分辨率
-
-    def capture_frame(self) -> None:
+    def get_overlay_info(self, captured_at):
         """
-        Capture a frame from the camera, process it, and save.
+        采集时的叠加信息（在采集线程中调用，只读取内存中的值）
         """
-        try:
-            ret, frame = self.cap.read()
-            if ret:
-                # Convert frame to PIL Image
-                frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                pil_image = Image.fromarray(frame_rgb)
-
-                # Resize image to target size
-                if (pil_image.size != self.target_size):
-                    pil_image = pil_image.resize(self.target_size, Image.LANCZOS)
-
-                # Overlay text
-                overlaid_image = self.overlay_text(pil_image)
-
-                # Save frame
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                frame_filename = os.path.join(self.frames_dir, f"frame_{timestamp}.png")
-                overlaid_image.save(frame_filename)
-
-                # Update study time
-                self.study_time += self.config["capture_interval"]
-                self.study_time_manager.add_study_time(self.config["capture_interval"])  # 保存到文件
-                self.status_label.setText(f"Status: Captured {frame_filename}. Study Time: {self.study_time} seconds")
-                logging.debug(f"Captured frame: {frame_filename}")
-            else:
-                self.status_label.setText("Status: Failed to capture frame")
-                logging.error("Failed to capture frame")
-        except Exception as e:
-            logging.exception("Exception occurred during frame capture.")
-            self.status_label.setText("Status: Error during frame capture")
-
-    def overlay_text(self, image):
-        draw = ImageDraw.Draw(image)
-        font = ImageFont.truetype(self.config["font_path"], self.config["text_size"])
-
-        # Current Time
-        current_time = datetime.now().strftime("%H:%M:%S")
-        draw.text((10, 10), f"Current Time: {current_time}", fill=self.config["text_color"], font=font)
-
-        # Study Time
-        hours, remainder = divmod(int(self.study_time), 3600)
-        minutes, seconds = divmod(remainder, 60)
-        study_time_str = f"Study Time: {hours:02d}:{minutes:02d}:{seconds:02d}"
-        draw.text((10, 10 + self.config["text_size"] + 5), study_time_str, fill=self.config["text_color"], font=font)
-        
-        # current task time
-        task_name = self.task_manager.current_task
-        if task_name:
-            #task_time = self.task_manager.get_task_time(task_name)
-            #hours, remainder = divmod(task_time, 3600)
-            #minutes, seconds = divmod(remainder, 60)
-            task_time_str = f"Task: {task_name} "
-            draw.text((10, 10 + 2 * (self.config["text_size"] + 5)), task_time_str, fill=self.config["text_color"], font=font)
-
-        # 叠加学习总时间
-        study_time = self.study_time_manager.get_today_study_time()
-        hours, remainder = divmod(int(study_time), 3600)
-        minutes, seconds = divmod(remainder, 60)
-        study_time_str = f"Total Study Time: {hours:02d}:{minutes:02d}:{seconds:02d}"
-        draw.text(
-            (10, 10 + 3 * (self.config["text_size"] + 5)),
-            study_time_str,
-            fill=self.config["text_color"],
-            font=font
-        )
-
-        return image
+        return {
+            "current_time": captured_at.strftime("%H:%M:%S"),
+            "study_time": self.study_time,
+            "task_name": self.task_manager.current_task,
+            "total_study_time": self.total_study_time
+        }
 
-    def compile_video(self) -> None:
+    def on_captured(self, kept, elapsed):
         """
-        Compile captured frames into a time-lapse video.
+        完成一次采集（界面线程）：按实际经过的时间累计学习时间，自适应模式下丢弃的帧同样计入
         """
-        try:
-            frames_dir = 'frames'
-            output_dir = 'output'
-            output_filename = f"{output_dir}/timelapse_{datetime.now().strftime('%Y%m%d_%H%M%S')}.mp4"
+        from metrics import metrics
 
-            # Get list of frame files
-            frame_files = sorted(
-                [os.path.join(frames_dir, f) for f in os.listdir(frames_dir) if f.endswith('.png')]
-            )
+        self.study_time += elapsed
+        with metrics.timer("study_time"):
+            self.study_time_manager.add_study_time(elapsed)  # 保存到文件
+        self.total_study_time = self.study_time_manager.get_today_study_time()
 
-            if not frame_files:
-                self.status_label.setText("Status: No frames to compile")
-                return
-                    # 从滑块读取 FPS
-            fps = self.fps_slider.value()  # 用户通过 GUI 滑块选择帧率
-        # Create the video using MoviePy
-            try:
-                clip = ImageSequenceClip(frame_files, fps=fps)
-                clip.write_videofile(output_filename, codec='libx264')
-                print(f"Timelapse video saved at {output_filename}")
-            except Exception as e:
-                print(f"Error creating video: {e}")
-
-            self.status_label.setText(f"Status: Video saved to {output_filename}")
-            date_folders = [d for d in os.listdir('frames') if os.path.isdir(os.path.join('frames', d))]
-            for date_str in date_folders:
-                frames_dir = os.path.join('frames', date_str)
-                output_filename = os.path.join(self.output_dir, f"timelapse_{date_str}.mp4")
-                frame_files = sorted(
-                    [os.path.join(frames_dir, f) for f in os.listdir(frames_dir) if f.endswith('.png')]
-                )
-                if not frame_files:
-                    continue
-                fps = self.fps_slider.value()
-                try:
-                    clip = ImageSequenceClip(frame_files, fps=fps)
-                    clip.write_videofile(output_filename, codec='libx264')
-                except Exception as e:
-                    print(f"Error creating video for {date_str}: {e}")
-            self.status_label.setText("Status: Videos compiled")
-            logging.info(f"Video compiled successfully: {output_filename}")
-        except Exception as e:
-            logging.exception("Exception occurred during video compilation.")
-            self.status_label.setText("Status: Error creating video")
+    def on_frame_saved(self, frame_filename):
+        """
+        帧保存完成（界面线程）：更新状态
+        """
+        self.status_label.setText(f"Status: Captured {frame_filename}. Study Time: {int(self.study_time)} seconds")
 
     def show_generate_video_dialog(self):
         self.status_label.setText(f"Status: Generating video...")
@@ -485,40 +945,151 @@ class TimeLapseCam(QWidget):
             self.generate_video_for_date(date_str)
 
     def generate_video_for_date(self, date_str):
-        frames_dir = os.path.join('frames', date_str)
-        if not os.path.exists(frames_dir):
-            self.status_label.setText(f"Status: No frames found for {date_str}")
-            logging.warning(f"No frames found for {date_str}")
-            return
+        from video_encoder import encoder_options
 
         output_filename = os.path.join(self.output_dir, f"timelapse_{date_str}.mp4")
-        frame_files = sorted(
-            [os.path.join(frames_dir, f) for f in os.listdir(frames_dir) if f.endswith('.png')]
-        )
-        
-        if not frame_files:
-            self.status_label.setText(f"Status: No frames found for {date_str}")
-            logging.warning(f"No frames found for {date_str}")
-            return
-
         fps = self.fps_slider.value()
 
         # 禁用生成按钮，避免重复点击
         self.generate_today_video_button.setEnabled(False)
         self.generate_video_button.setEnabled(False)
+        self.generate_range_video_button.setEnabled(False)
+        self.generate_clip_video_button.setEnabled(False)
 
         # 创建并启动视频生成线程
-        self.video_thread = VideoGeneratorThread(frame_files, output_filename, fps)
+        # 当天的帧从帧索引中查询，查询和（未补录时的）补录都在工作线程中进行
+        self.video_thread = VideoGeneratorThread(
+            date_str, output_filename, fps, self.ensure_frame_catalog(), self.live_encoder,
+            encoder_options(self.config), self.config["compile_memory_mb"]
+        )
         self.video_thread.finished.connect(self.on_video_generated)
         self.video_thread.error.connect(self.on_video_error)
+        self.video_thread.progress.connect(self.on_video_progress)
+        self.video_thread.cancelled.connect(self.on_video_cancelled)
         self.video_thread.finished.connect(lambda: self.enable_generate_buttons())
         self.video_thread.error.connect(lambda: self.enable_generate_buttons())
+        self.video_thread.cancelled.connect(lambda: self.enable_generate_buttons())
+        self.video_progress_bar.setRange(0, 0)  # 总帧数未知前显示忙碌状态
+        self.video_progress_bar.show()
+        self.cancel_video_button.setEnabled(True)
+        self.cancel_video_button.show()
         self.video_thread.start()
 
     def enable_generate_buttons(self):
         """重新启用生成按钮"""
         self.generate_today_video_button.setEnabled(True)
         self.generate_video_button.setEnabled(True)
+        self.generate_range_video_button.setEnabled(True)
+        self.generate_clip_video_button.setEnabled(True)
+        self.video_progress_bar.hide()
+        self.cancel_video_button.hide()
+
+    def on_video_progress(self, done, total, speed, eta):
+        """视频编码进度的回调"""
+        from overlay_renderer import format_duration
+
+        self.video_progress_bar.setRange(0, total)
+        self.video_progress_bar.setValue(done)
+        eta_str = format_duration(eta) if eta >= 0 else "--:--:--"
+        self.status_label.setText(f"Status: Encoding {done}/{total} frames, {speed:.1f} fps, ETA {eta_str}")
+
+    def cancel_video_generation(self):
+        """取消正在进行的视频生成"""
+        for thread in (self.video_thread, self.batch_thread):
+            if thread and thread.isRunning():
+                thread.cancel()
+                self.cancel_video_button.setEnabled(False)
+                self.status_label.setText("Status: Cancelling...")
+
+    def on_video_cancelled(self):
+        """视频生成已取消的回调"""
+        self.status_label.setText("Status: Video generation cancelled")
+        logging.info("Video generation cancelled")
+
+    def show_generate_range_dialog(self):
+        """
+        选择日期范围并在进程池中并行编译
+        """
+        dialog = DateRangeDialog(self)
+        if dialog.exec_() != QDialog.Accepted:
+            return
+        start_date, end_date, single = dialog.selected_range()
+        self.generate_today_video_button.setEnabled(False)
+        self.generate_video_button.setEnabled(False)
+        self.generate_range_video_button.setEnabled(False)
+        self.generate_clip_video_button.setEnabled(False)
+        self.status_label.setText(f"Status: Compiling {start_date} - {end_date}...")
+
+        from video_encoder import encoder_options
+
+        self.batch_thread = BatchCompileThread(
+            start_date, end_date, self.fps_slider.value(), single, self.config["compile_workers"],
+            encoder_options(self.config), self.config["compile_memory_mb"]
+        )
+        self.batch_thread.progress.connect(self.on_batch_progress)
+        self.batch_thread.frame_progress.connect(self.on_video_progress)
+        self.batch_thread.finished.connect(self.on_batch_finished)
+        self.batch_thread.error.connect(self.on_video_error)
+        self.batch_thread.cancelled.connect(self.on_video_cancelled)
+        self.batch_thread.finished.connect(lambda: self.enable_generate_buttons())
+        self.batch_thread.error.connect(lambda: self.enable_generate_buttons())
+        self.batch_thread.cancelled.connect(lambda: self.enable_generate_buttons())
+        self.video_progress_bar.setRange(0, 0)
+        self.video_progress_bar.show()
+        self.cancel_video_button.setEnabled(True)
+        self.cancel_video_button.show()
+        self.batch_thread.start()
+
+    def show_generate_clip_dialog(self):
+        """
+        选择时间范围和任务，从帧索引取帧生成一个视频
+        """
+        catalog = self.ensure_frame_catalog()
+        dialog = ClipDialog(self, self.task_manager.get_all_tasks())
+        if dialog.exec_() != QDialog.Accepted:
+            return
+        start, end, task = dialog.selected_clip()
+
+        from video_encoder import encoder_options
+
+        name = f"timelapse_{start[:16]}_{end[:16]}" + (f"_{task}" if task else "")
+        output_filename = os.path.join(self.output_dir, re.sub(r"[^\w.-]+", "_", name) + ".mp4")
+        self.generate_today_video_button.setEnabled(False)
+        self.generate_video_button.setEnabled(False)
+        self.generate_range_video_button.setEnabled(False)
+        self.generate_clip_video_button.setEnabled(False)
+        self.status_label.setText(f"Status: Generating video for {start} - {end}...")
+
+        self.video_thread = ClipGeneratorThread(
+            catalog, start, end, task, output_filename, self.fps_slider.value(), encoder_options(self.config),
+            self.config["compile_memory_mb"]
+        )
+        self.video_thread.finished.connect(self.on_video_generated)
+        self.video_thread.error.connect(self.on_video_error)
+        self.video_thread.progress.connect(self.on_video_progress)
+        self.video_thread.cancelled.connect(self.on_video_cancelled)
+        self.video_thread.finished.connect(lambda: self.enable_generate_buttons())
+        self.video_thread.error.connect(lambda: self.enable_generate_buttons())
+        self.video_thread.cancelled.connect(lambda: self.enable_generate_buttons())
+        self.video_progress_bar.setRange(0, 0)
+        self.video_progress_bar.show()
+        self.cancel_video_button.setEnabled(True)
+        self.cancel_video_button.show()
+        self.video_thread.start()
+
+    def on_batch_progress(self, date_str, status, completed, total):
+        """批量编译任务状态变化的回调"""
+        if status != "queued":
+            self.status_label.setText(f"Status: Compiling {completed}/{total} days - {date_str}: {status}")
+            logging.info(f"Batch compile {date_str}: {status} ({completed}/{total})")
+
+    def on_batch_finished(self, outputs):
+        """批量编译完成的回调"""
+        if not outputs:
+            self.status_label.setText("Status: No frames found in the selected range")
+            return
+        self.status_label.setText(f"Status: {len(outputs)} video(s) saved, e.g. {outputs[-1]}")
+        logging.info(f"Batch compile saved {outputs}")
 
     def on_video_generated(self, output_filename):
         """视频生成完成的回调"""
@@ -572,25 +1143,34 @@ class TimeLapseCam(QWidget):
     def open_log_visualizer(self):
         selected_date = self.select_date_via_dialog()
         if selected_date:
-            visualizer = LogVisualizer()
-            fig = visualizer.visualize_daily_study_time(selected_date)
-            if fig:
-                self.display_figure(fig, selected_date)
-            else:
-                self.status_label.setText(f"Status: No data to visualize for {selected_date}")
+            self.request_chart(selected_date)
+
+    def open_trends_dialog(self):
+        """
+        选择日期范围和图表类型，在后台生成范围统计图表
+        """
+        from visualize_logs import RANGE_CHARTS
+
+        charts = list(RANGE_CHARTS)
+        dialog = DateRangeDialog(self, modes=[RANGE_CHARTS[chart] for chart in charts], title="Study Trends")
+        dialog.mode_dropdown.setCurrentIndex(charts.index("trend"))
+        if dialog.exec_() != QDialog.Accepted:
+            return
+        start_date, end_date, _ = dialog.selected_range()
+        chart = charts[dialog.selected_mode()]
+        visualizer = self.ensure_visualizer()
+        self.start_chart_thread(f"{start_date} - {end_date}",
+                                lambda: visualizer.visualize_range(start_date, end_date, chart))
 
     def display_figure(self, fig, date_str):
-        self.visualization_canvas.figure.clf()
-        canvas_ax = self.visualization_canvas.figure.subplots()
-        for ax in fig.axes:
-            for line in ax.get_children():
-                if isinstance(line, plt.Axes):
-                    pass  # Handle nested axes if any
-                else:
-                    pass  # Customize as needed
-        # Alternatively, you can draw the returned figure directly
-        self.visualization_canvas.figure = fig
-        self.visualization_canvas.draw()
+        canvas = self.ensure_visualization_canvas()
+        # 切换到（可能是缓存的）图表，绑定到画布后按画布大小重新布局并绘制
+        canvas.figure = fig
+        fig.set_canvas(canvas)
+        ratio = canvas.device_pixel_ratio
+        fig.set_size_inches(canvas.width() * ratio / fig.dpi, canvas.height() * ratio / fig.dpi, forward=False)
+        canvas.draw_idle()
+        self.displayed_chart_date = date_str
 
     def select_date_via_dialog(self):
         dialog = DateSelectorDialog(self)
@@ -613,9 +1193,29 @@ class TimeLapseCam(QWidget):
         Handle the application close event.
         """
         try:
+            # 先停止并等待所有工作线程，再关闭它们使用的存储和帧索引
+            if self.video_thread and self.video_thread.isRunning():
+                self.video_thread.cancel()
+            if self.batch_thread and self.batch_thread.isRunning():
+                self.batch_thread.cancel()
+            if self.catalog_sync_thread:
+                self.catalog_sync_thread.stop()
+            self.stop_capture_pipeline()
+            for thread in [self.video_thread, self.batch_thread, self.catalog_sync_thread] + self.chart_threads:
+                if thread:
+                    thread.wait()
+            # 摄像头可能仍在后台打开中，等待后一并释放
+            self.camera_opener.wait()
+            for camera in self.cameras or self.camera_opener.cameras:
+                camera.release()
+            if self.metrics_exporter:
+                self.metrics_exporter.stop()
             self.task_manager.end_current_task()
-            if self.cap.isOpened():
-                self.cap.release()
+            if self.frame_catalog:
+                self.frame_catalog.close()
+            self.aggregates.close()
+            self.study_time_manager.close()
+            self.storage.close()
             logging.info("Application closed")
             event.accept()
         except Exception as e:
@@ -623,9 +1223,11 @@ class TimeLapseCam(QWidget):
             event.accept()
 
 def main():
+    multiprocessing.freeze_support()  # PyInstaller 打包后进程池需要
     app = QApplication(sys.argv)
     window = TimeLapseCam()
     window.show()
+    startup_timer.mark("window_shown")
     sys.exit(app.exec_())
 
 if __name__ == "__main__":
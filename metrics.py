@@ -0,0 +1,264 @@
+import bisect
+import json
+import logging
+import logging.handlers
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 耗时直方图的桶上界（秒）
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """
+    固定桶的累计直方图（Prometheus 语义），另按同样的桶记录自上次日志以来（窗口内）的观测值
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # 最后一个为 +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.reset_window()
+
+    def reset_window(self):
+        self.window_counts = [0] * (len(self.buckets) + 1)
+        self.window_count = 0
+        self.window_sum = 0.0
+        self.window_max = 0.0
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+        self.window_counts[index] += 1
+        self.window_count += 1
+        self.window_sum += value
+        self.window_max = max(self.window_max, value)
+
+    def window_quantile(self, q):
+        """
+        按桶估计窗口内的分位数：返回所在桶的上界，但不超过窗口内的最大值
+        （落在 +Inf 桶时即为最大值，结果总是有限的）
+        """
+        if not self.window_count:
+            return 0.0
+        rank = q * self.window_count
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.window_counts):
+            cumulative += count
+            if cumulative >= rank:
+                return min(bound, self.window_max)
+        return self.window_max
+
+
+class Metrics:
+    """
+    线程安全的轻量指标注册表：各阶段耗时直方图、计数器和瞬时值。
+    采集流水线各线程直接记录，HTTP 端点和滚动日志读取快照。
+    """
+
+    def __init__(self, prefix="timelapse"):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._histograms = {}  # (name, stage) -> Histogram
+        self._counters = {}  # (name, label) -> int
+        self._gauges = {}  # name -> float
+
+    def observe(self, name, value, stage=""):
+        """
+        记录一次观测值
+        Args:
+            name (str): 直方图名，如 "stage_seconds"
+            value (float): 观测值（秒）
+            stage (str): 阶段标签
+        """
+        with self._lock:
+            histogram = self._histograms.get((name, stage))
+            if histogram is None:
+                histogram = self._histograms[(name, stage)] = Histogram()
+            histogram.observe(value)
+
+    @contextmanager
+    def timer(self, stage):
+        """
+        统计 with 块的耗时到 stage_seconds{stage=...}
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe("stage_seconds", time.perf_counter() - started, stage)
+
+    def inc(self, name, label="", amount=1):
+        with self._lock:
+            self._counters[(name, label)] = self._counters.get((name, label), 0) + amount
+
+    def set_gauge(self, name, value):
+        with self._lock:
+            self._gauges[name] = value
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+            self._gauges.clear()
+
+    def render_prometheus(self):
+        """
+        Returns:
+            str: Prometheus 文本格式（0.0.4）
+        """
+        lines = []
+        with self._lock:
+            for name in sorted({name for name, _ in self._histograms}):
+                metric = f"{self.prefix}_{name}"
+                lines.append(f"# TYPE {metric} histogram")
+                for (hist_name, stage), histogram in sorted(self._histograms.items()):
+                    if hist_name != name:
+                        continue
+                    label = f'stage="{stage}",' if stage else ""
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        cumulative += count
+                        lines.append(f'{metric}_bucket{{{label}le="{bound}"}} {cumulative}')
+                    lines.append(f'{metric}_bucket{{{label}le="+Inf"}} {histogram.count}')
+                    suffix = f"{{{label.rstrip(',')}}}" if label else ""
+                    lines.append(f"{metric}_sum{suffix} {histogram.sum:.6f}")
+                    lines.append(f"{metric}_count{suffix} {histogram.count}")
+            for name in sorted({name for name, _ in self._counters}):
+                metric = f"{self.prefix}_{name}_total"
+                lines.append(f"# TYPE {metric} counter")
+                for (counter_name, label), value in sorted(self._counters.items()):
+                    if counter_name == name:
+                        suffix = f'{{result="{label}"}}' if label else ""
+                        lines.append(f"{metric}{suffix} {value}")
+            for name, value in sorted(self._gauges.items()):
+                metric = f"{self.prefix}_{name}"
+                lines.append(f"# TYPE {metric} gauge")
+                lines.append(f"{metric} {value}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self, reset_window=False):
+        """
+        汇总当前指标（滚动日志使用）。直方图的统计只包含窗口内（上次重置以来）的观测值，
+        计数器和瞬时值为当前值
+        Args:
+            reset_window (bool): 汇总后是否重置各直方图的窗口
+        Returns:
+            dict: {histograms: {name[stage]: {count, mean_ms, p95_ms, max_ms}}, counters, gauges}
+        """
+        with self._lock:
+            histograms = {}
+            for (name, stage), histogram in sorted(self._histograms.items()):
+                key = f"{name}[{stage}]" if stage else name
+                count = histogram.window_count
+                histograms[key] = {
+                    "count": count,
+                    "mean_ms": round(1000 * histogram.window_sum / count, 2) if count else 0.0,
+                    "p95_ms": round(1000 * histogram.window_quantile(0.95), 2),
+                    "max_ms": round(1000 * histogram.window_max, 2),
+                }
+                if reset_window:
+                    histogram.reset_window()
+            counters = {f"{name}[{label}]" if label else name: value
+                        for (name, label), value in sorted(self._counters.items())}
+            return {"histograms": histograms, "counters": counters, "gauges": dict(self._gauges)}
+
+
+metrics = Metrics()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = metrics.render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logging.debug("Metrics request: " + format % args)
+
+
+class MetricsExporter:
+    """
+    导出指标：本地 HTTP 端点（http://127.0.0.1:<metrics_port>/metrics，Prometheus 文本格式）
+    和按 metrics_log_interval 写入的滚动日志（JSON 行，按大小轮转）
+    """
+
+    def __init__(self, config):
+        """
+        Args:
+            config (dict): 应用配置（读取 metrics_port / metrics_log_interval / metrics_log_path）
+        """
+        self.config = config
+        self.server = None
+        self.log_thread = None
+        self._stop_event = threading.Event()
+        self.logger = None
+
+    def start(self):
+        port = self.config["metrics_port"]
+        if port:
+            try:
+                self.server = ThreadingHTTPServer(("127.0.0.1", port), _MetricsHandler)
+            except OSError as e:
+                logging.error(f"Could not start metrics endpoint on port {port}: {e}")
+            else:
+                self.server.daemon_threads = True
+                threading.Thread(target=self.server.serve_forever, name="metrics-http", daemon=True).start()
+                logging.info(f"Metrics available at http://127.0.0.1:{port}/metrics")
+        if self.config["metrics_log_interval"] > 0:
+            self.logger = self._create_logger(self.config["metrics_log_path"])
+            self._stop_event.clear()
+            self.log_thread = threading.Thread(target=self._log_loop, name="metrics-log", daemon=True)
+            self.log_thread.start()
+
+    @staticmethod
+    def _create_logger(path):
+        log_dir = os.path.dirname(path)
+        if log_dir:
+            os.makedirs(log_dir, exist_ok=True)
+        logger = logging.getLogger("timelapsecam.metrics")
+        logger.propagate = False
+        logger.setLevel(logging.INFO)
+        for handler in list(logger.handlers):
+            logger.removeHandler(handler)
+            handler.close()
+        handler = logging.handlers.RotatingFileHandler(path, maxBytes=1024 * 1024, backupCount=3, encoding="utf-8")
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        return logger
+
+    def _log_loop(self):
+        while not self._stop_event.wait(self.config["metrics_log_interval"]):
+            self.write_log()
+
+    def write_log(self):
+        if self.logger:
+            entry = {"time": time.strftime("%Y-%m-%dT%H:%M:%S"), **metrics.snapshot(reset_window=True)}
+            self.logger.info(json.dumps(entry))
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+        if self.log_thread:
+            self._stop_event.set()
+            self.log_thread.join()
+            self.log_thread = None
+            self.write_log()
+            for handler in list(self.logger.handlers):
+                self.logger.removeHandler(handler)
+                handler.close()
+            self.logger = None
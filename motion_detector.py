@@ -0,0 +1,120 @@
+import json
+import logging
+import os
+import threading
+import time
+
+import cv2
+import numpy as np
+
+
+class MotionDetector:
+    """
+    基于降采样帧差的变化检测，用于自适应采集。
+    每帧先缩小为小尺寸灰度图，与上一张保留帧做平均绝对差；
+    低于阈值的帧视为静止画面而丢弃，但每隔 keepalive_interval 秒仍保留一帧。
+    检测到变化后的 active_hold 秒内视为活跃状态，可用于提高采集频率。
+    """
+
+    def __init__(self, threshold=0.02, keepalive_interval=60, active_hold=30, sample_width=160):
+        """
+        Args:
+            threshold (float): 变化阈值（0~1，平均像素差 / 255）
+            keepalive_interval (float): 静止时至少每隔多少秒保留一帧，0 表示不保留
+            active_hold (float): 检测到变化后保持活跃状态的秒数
+            sample_width (int): 比较用小图的宽度
+        """
+        self.threshold = threshold
+        self.keepalive_interval = keepalive_interval
+        self.active_hold = active_hold
+        self.sample_width = sample_width
+        self._last_sample = None
+        self._last_kept = None
+        self._last_motion = None
+
+    def _sample(self, frame):
+        height, width = frame.shape[:2]
+        sample_height = max(1, round(height * self.sample_width / width))
+        small = cv2.resize(frame, (self.sample_width, sample_height), interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        # 轻微模糊以抑制传感器噪声
+        return cv2.GaussianBlur(small, (3, 3), 0).astype(np.int16)
+
+    def check(self, frame, now=None):
+        """
+        判断是否保留该帧
+        Args:
+            frame (numpy.ndarray): 摄像头原始 BGR 帧
+            now (float): 单调时钟时间，默认 time.monotonic()
+        Returns:
+            tuple: (keep: bool, score: float) score 为与上一张保留帧的变化量
+        """
+        now = time.monotonic() if now is None else now
+        sample = self._sample(frame)
+        if self._last_sample is None or self._last_sample.shape != sample.shape:
+            score = 1.0
+        else:
+            score = float(np.abs(sample - self._last_sample).mean()) / 255.0
+
+        motion = score >= self.threshold
+        if motion:
+            self._last_motion = now
+        keepalive_due = (self.keepalive_interval > 0 and self._last_kept is not None
+                         and now - self._last_kept >= self.keepalive_interval)
+        keep = motion or keepalive_due
+        if keep:
+            self._last_sample = sample
+            self._last_kept = now
+        return keep, score
+
+    def is_active(self, now=None):
+        """
+        Returns:
+            bool: 最近 active_hold 秒内是否检测到变化
+        """
+        if self._last_motion is None:
+            return False
+        now = time.monotonic() if now is None else now
+        return now - self._last_motion < self.active_hold
+
+    def reset(self):
+        self._last_sample = None
+        self._last_kept = None
+        self._last_motion = None
+
+
+class CaptureDecisionLog:
+    """
+    记录每次采集的保留/丢弃决定，按日期追加到 <frames_root>/<date>/capture_log.jsonl，
+    每行 {time, kept, score, elapsed}，丢弃的帧也计入学习时间，可据此核对学习时间统计。
+    """
+
+    FILE_NAME = "capture_log.jsonl"
+
+    def __init__(self, frames_root="frames"):
+        self.frames_root = frames_root
+        self._lock = threading.Lock()
+
+    def record(self, captured_at, kept, score, elapsed):
+        """
+        Args:
+            captured_at (datetime): 采集时间
+            kept (bool): 是否保留
+            score (float): 变化量，固定间隔模式下为 None
+            elapsed (float): 距上次采集的秒数
+        """
+        frames_dir = os.path.join(self.frames_root, captured_at.strftime('%Y-%m-%d'))
+        record = {
+            "time": captured_at.strftime('%H:%M:%S'),
+            "kept": kept,
+            "score": None if score is None else round(score, 5),
+            "elapsed": round(elapsed, 3)
+        }
+        try:
+            with self._lock:
+                os.makedirs(frames_dir, exist_ok=True)
+                with open(os.path.join(frames_dir, self.FILE_NAME), "a") as f:
+                    f.write(json.dumps(record) + "\n")
+        except OSError:
+            logging.exception("Could not record capture decision.")
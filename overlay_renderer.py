@@ -0,0 +1,174 @@
+import math
+import threading
+
+import numpy as np
+from PIL import Image, ImageColor, ImageDraw, ImageFont
+
+_font_cache = {}
+_font_cache_lock = threading.Lock()
+
+
+def format_duration(seconds):
+    """
+    将秒数格式化为 HH:MM:SS
+    """
+    hours, remainder = divmod(int(seconds), 3600)
+    minutes, seconds = divmod(remainder, 60)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
+
+
+def load_font(font_path, size):
+    """
+    加载字体，按 (路径, 字号) 缓存
+    Args:
+        font_path (str): 字体文件路径
+        size (int): 字号
+    Returns:
+        ImageFont.FreeTypeFont: 字体
+    """
+    key = (font_path, size)
+    with _font_cache_lock:
+        font = _font_cache.get(key)
+        if font is None:
+            font = ImageFont.truetype(font_path, size)
+            _font_cache[key] = font
+        return font
+
+
+class _OverlayStyle:
+    """
+    一种字体/字号/颜色对应的渲染缓存。样式改变时整体替换，渲染线程不会看到清理了一半的缓存。
+    """
+
+    MAX_TEXT_STRIPS = 64
+
+    def __init__(self, font_path, text_size, text_color):
+        self.font = load_font(font_path, text_size)
+        self.text_size = text_size
+        self.color = np.array(ImageColor.getrgb(text_color)[:3], dtype=np.float32)
+        ascent, descent = self.font.getmetrics()
+        self.height = ascent + descent
+        self.glyphs = {}   # 单个字符 -> (alpha, advance)
+        self.strips = {}   # 静态标签 / 任务名 -> alpha
+        self.advances = {}  # 静态标签 -> 宽度
+
+    def render_strip(self, text):
+        """
+        将整段文字渲染为 alpha 遮罩（0~1 的 float32）
+        """
+        width = max(1, int(math.ceil(self.font.getlength(text))) + 2)
+        mask = Image.new("L", (width, self.height), 0)
+        ImageDraw.Draw(mask).text((0, 0), text, fill=255, font=self.font)
+        return np.asarray(mask, dtype=np.float32) / 255
+
+    def strip(self, text):
+        """
+        获取缓存的文字条（用于 "Current Time:" 等静态标签和很少变化的任务名）
+        """
+        alpha = self.strips.get(text)
+        if alpha is None:
+            if len(self.strips) >= self.MAX_TEXT_STRIPS:
+                self.strips.clear()
+            alpha = self.render_strip(text)
+            self.strips[text] = alpha
+        return alpha
+
+    def advance(self, text):
+        width = self.advances.get(text)
+        if width is None:
+            width = int(round(self.font.getlength(text)))
+            self.advances[text] = width
+        return width
+
+    def glyph(self, char):
+        cached = self.glyphs.get(char)
+        if cached is None:
+            cached = (self.render_strip(char), self.font.getlength(char))
+            self.glyphs[char] = cached
+        return cached
+
+    def compose(self, text):
+        """
+        用缓存的字形拼出每帧变化的文字（数字和冒号）
+        """
+        glyphs = [self.glyph(char) for char in text]
+        width = int(math.ceil(sum(advance for _, advance in glyphs))) + 2
+        alpha = np.zeros((self.height, width), dtype=np.float32)
+        x = 0.0
+        for glyph_alpha, advance in glyphs:
+            left = int(round(x))
+            glyph_width = min(glyph_alpha.shape[1], width - left)
+            np.maximum(alpha[:, left:left + glyph_width], glyph_alpha[:, :glyph_width],
+                       out=alpha[:, left:left + glyph_width])
+            x += advance
+        return alpha
+
+
+class OverlayRenderer:
+    """
+    叠加文字渲染器：静态标签预渲染为 alpha 遮罩，变化的数字由缓存字形拼接，
+    最后用 NumPy alpha 混合直接写入帧数组，不再每帧加载字体和绘制整行文字。
+    """
+
+    def __init__(self, font_path, text_size, text_color):
+        """
+        Args:
+            font_path (str): 字体文件路径
+            text_size (int): 字号
+            text_color (str): 颜色，如 '#FFFFFF'
+        """
+        self._style_key = None
+        self._style = None
+        self.set_style(font_path, text_size, text_color)
+
+    def set_style(self, font_path, text_size, text_color):
+        """
+        更新样式；只有样式确实变化时才重建缓存
+        """
+        style_key = (font_path, text_size, text_color)
+        if style_key != self._style_key:
+            self._style = _OverlayStyle(font_path, text_size, text_color)
+            self._style_key = style_key
+
+    def render(self, frame, overlay_info, bgr=False):
+        """
+        在帧上原地叠加文字
+        Args:
+            frame (numpy.ndarray): 可写的 uint8 帧
+            overlay_info (dict): 叠加信息 {current_time, study_time, task_name, total_study_time}
+            bgr (bool): 帧是否为 BGR 顺序
+        Returns:
+            numpy.ndarray: 同一个帧数组
+        """
+        style = self._style
+        color = style.color[::-1] if bgr else style.color
+        line_height = style.text_size + 5
+        lines = [
+            ("Current Time: ", overlay_info["current_time"]),
+            ("Study Time: ", format_duration(overlay_info["study_time"])),
+            ("Task: ", overlay_info["task_name"]),
+            ("Total Study Time: ", format_duration(overlay_info["total_study_time"])),
+        ]
+        for index, (label, value) in enumerate(lines):
+            if label == "Task: ":
+                if not value:
+                    continue
+                # 任务名很少变化，整条缓存
+                value_alpha = style.strip(value)
+            else:
+                value_alpha = style.compose(value)
+            label_alpha = style.strip(label)
+            y = 10 + index * line_height
+            self._blend(frame, label_alpha, 10, y, color)
+            self._blend(frame, value_alpha, 10 + style.advance(label), y, color)
+        return frame
+
+    @staticmethod
+    def _blend(frame, alpha, x, y, color):
+        height = min(alpha.shape[0], frame.shape[0] - y)
+        width = min(alpha.shape[1], frame.shape[1] - x)
+        if height <= 0 or width <= 0:
+            return
+        alpha = alpha[:height, :width, None]
+        region = frame[y:y + height, x:x + width]
+        region[:] = region * (1 - alpha) + color * alpha
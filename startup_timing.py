@@ -0,0 +1,46 @@
+import json
+import logging
+import sys
+import time
+from datetime import datetime
+
+
+class StartupTimer:
+    """
+    记录启动各阶段距进程启动（本模块导入）的耗时，用于跟踪首个窗口出现时间的回归。
+    每次启动追加一行 JSON 到报告文件。
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.marks = []
+
+    def mark(self, name):
+        """
+        记录一个阶段完成的时刻
+        Args:
+            name (str): 阶段名称
+        """
+        self.marks.append((name, time.perf_counter() - self.start))
+
+    def report(self, report_path="startup_timing.jsonl"):
+        """
+        输出日志并追加到报告文件
+        Args:
+            report_path (str): 报告文件路径（JSON Lines）
+        """
+        summary = ", ".join(f"{name}={elapsed * 1000:.0f}ms" for name, elapsed in self.marks)
+        logging.info(f"Startup timing: {summary}")
+        record = {
+            "time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "frozen": bool(getattr(sys, "frozen", False)),  # PyInstaller 打包版本
+            "marks": {name: round(elapsed * 1000, 1) for name, elapsed in self.marks}
+        }
+        try:
+            with open(report_path, "a") as f:
+                f.write(json.dumps(record) + "\n")
+        except OSError:
+            logging.exception("Could not write startup timing report.")
+
+
+startup_timer = StartupTimer()
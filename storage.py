@@ -0,0 +1,545 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+
+class JsonStorage:
+    """
+    JSON 文件存储（原有格式）：tasks.json / task_log.json / study_time.json。
+    每次修改都会重写整个文件，历史越长写入越慢。
+    已结束的任务记录数单独保存在 <log_file>.count 中，查询时无需读取整个日志。
+    """
+
+    def __init__(self, task_file="tasks.json", log_file="task_log.json", study_time_file="study_time.json"):
+        """
+        Args:
+            task_file (str): 任务累计时间文件 {task_name: total_seconds}
+            log_file (str): 任务日志文件 {date: [{task_name, start_time, end_time}]}
+            study_time_file (str): 学习时间文件 {date: seconds}
+        """
+        self.task_file = task_file
+        self.log_file = log_file
+        self.study_time_file = study_time_file
+        self.count_file = log_file + ".count"
+        self._session_count = None
+        self._tasks = None
+        self._task_log = None
+        self._study_time = None
+
+    @staticmethod
+    def _load(path):
+        if not os.path.exists(path):
+            with open(path, "w") as f:
+                json.dump({}, f)
+        with open(path, "r") as f:
+            return json.load(f)
+
+    @staticmethod
+    def _save(path, data):
+        with open(path, "w") as f:
+            json.dump(data, f, indent=4)
+
+    @property
+    def tasks(self):
+        if self._tasks is None:
+            self._tasks = self._load(self.task_file)
+        return self._tasks
+
+    @property
+    def task_log(self):
+        if self._task_log is None:
+            self._task_log = self._load(self.log_file)
+        return self._task_log
+
+    @property
+    def study_time(self):
+        if self._study_time is None:
+            self._study_time = self._load(self.study_time_file) if os.path.exists(self.study_time_file) else {}
+        return self._study_time
+
+    # ---- 任务 ----
+
+    def load_task_totals(self):
+        return dict(self.tasks)
+
+    def ensure_task(self, task_name):
+        if task_name not in self.tasks:
+            self.tasks[task_name] = 0  # 初始化任务累计时间，结束任务时一并保存
+
+    def start_session(self, date_str, task_name, start_time):
+        """
+        记录任务开始。JSON 文件只在任务结束时写入完整记录，这里无需写入
+        """
+
+    def add_session(self, date_str, task_name, start_time, end_time, elapsed_seconds):
+        """
+        记录一段已结束的任务，并累加任务时间
+        Args:
+            date_str (str): 日期 'YYYY-MM-DD'
+            task_name (str): 任务名称
+            start_time (str): 开始时间 '%Y-%m-%d %H:%M:%S'
+            end_time (str): 结束时间 '%Y-%m-%d %H:%M:%S'
+            elapsed_seconds (float): 持续秒数
+        """
+        # 先写记录数：写日志前崩溃时记录数偏大，聚合索引据此发现不一致并重建
+        self._session_count = self.session_count() + 1
+        self._save(self.count_file, {"sessions": self._session_count})
+        self.tasks[task_name] = self.tasks.get(task_name, 0) + elapsed_seconds
+        self.task_log.setdefault(date_str, []).append({
+            "task_name": task_name,
+            "start_time": start_time,
+            "end_time": end_time
+        })
+        self._save(self.task_file, self.tasks)
+        self._save(self.log_file, self.task_log)
+
+    def get_sessions(self, date_str):
+        return list(self.task_log.get(date_str, []))
+
+    def get_all_sessions(self):
+        # 返回快照：图表线程在后台遍历，而 add_session 在 GUI 线程中修改 task_log
+        return {date_str: list(records) for date_str, records in dict(self.task_log).items()}
+
+    def get_task_names(self):
+        names = set(self.tasks.keys())
+        for day_logs in self.get_all_sessions().values():
+            for record in day_logs:
+                names.add(record["task_name"])
+        return list(names)
+
+    def source(self):
+        """
+        Returns:
+            str: 存储后端及其位置，用于判断聚合索引是否来自同一份数据
+        """
+        return f"json:{self.log_file}"
+
+    def session_count(self):
+        """
+        Returns:
+            int: 已结束的任务记录数
+        """
+        if self._session_count is None:
+            if os.path.exists(self.count_file):
+                with open(self.count_file, "r") as f:
+                    self._session_count = json.load(f)["sessions"]
+            else:
+                # 旧版本没有记录数文件，读取一次全部日志补上
+                self._session_count = sum(1 for records in self.get_all_sessions().values()
+                                          for record in records if record["end_time"])
+                self._save(self.count_file, {"sessions": self._session_count})
+        return self._session_count
+
+    # ---- 学习时间 ----
+
+    def get_study_time(self, date_str):
+        return self.study_time.get(date_str, 0)
+
+    def add_study_time(self, date_str, seconds):
+        self.study_time[date_str] = self.study_time.get(date_str, 0) + seconds
+        self._save(self.study_time_file, self.study_time)
+
+    def get_all_study_times(self):
+        return dict(self.study_time)
+
+    def close(self):
+        pass
+
+
+class SQLiteStorage:
+    """
+    SQLite 存储（WAL 模式）：任务、任务记录和每日学习时间分表并按日期建立索引，
+    每次写入只插入/更新一行，与历史长度无关。
+    首次打开时自动从原有 JSON 文件迁移数据（JSON 文件保留不动）。
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS tasks (
+            name TEXT PRIMARY KEY,
+            total_seconds REAL NOT NULL DEFAULT 0
+        );
+        CREATE TABLE IF NOT EXISTS task_sessions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            date TEXT NOT NULL,
+            task_name TEXT NOT NULL,
+            start_time TEXT NOT NULL,
+            end_time TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_task_sessions_date ON task_sessions(date);
+        CREATE TABLE IF NOT EXISTS study_time (
+            date TEXT PRIMARY KEY,
+            seconds INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        );
+    """
+
+    def __init__(self, db_path="timelapsecam.db", task_file="tasks.json", log_file="task_log.json",
+                 study_time_file="study_time.json"):
+        """
+        Args:
+            db_path (str): 数据库文件路径
+            task_file / log_file / study_time_file (str): 需要迁移的原 JSON 文件
+        """
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(self.SCHEMA)
+        self.migrate_from_json(task_file, log_file, study_time_file)
+
+    def migrate_from_json(self, task_file, log_file, study_time_file):
+        """
+        一次性从 JSON 文件导入数据
+        """
+        with self._lock, self.conn:
+            if self.conn.execute("SELECT 1 FROM meta WHERE key = 'json_migrated'").fetchone():
+                return
+            if os.path.exists(task_file):
+                with open(task_file, "r") as f:
+                    tasks = json.load(f)
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO tasks (name, total_seconds) VALUES (?, ?)", tasks.items()
+                )
+            if os.path.exists(log_file):
+                with open(log_file, "r") as f:
+                    task_log = json.load(f)
+                self.conn.executemany(
+                    "INSERT INTO task_sessions (date, task_name, start_time, end_time) VALUES (?, ?, ?, ?)",
+                    [(date_str, record["task_name"], record["start_time"], record["end_time"])
+                     for date_str, records in task_log.items() for record in records]
+                )
+            if os.path.exists(study_time_file):
+                with open(study_time_file, "r") as f:
+                    study_time = json.load(f)
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO study_time (date, seconds) VALUES (?, ?)", study_time.items()
+                )
+            self.conn.execute("INSERT INTO meta (key, value) VALUES ('json_migrated', '1')")
+        logging.info(f"Migrated JSON data into {self.db_path}")
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    # ---- 任务 ----
+
+    def load_task_totals(self):
+        return dict(self._query("SELECT name, total_seconds FROM tasks"))
+
+    def ensure_task(self, task_name):
+        with self._lock, self.conn:
+            self.conn.execute("INSERT OR IGNORE INTO tasks (name) VALUES (?)", (task_name,))
+
+    def start_session(self, date_str, task_name, start_time):
+        """
+        记录任务开始。完整记录在任务结束时插入，这里无需写入
+        """
+
+    def add_session(self, date_str, task_name, start_time, end_time, elapsed_seconds):
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT INTO tasks (name, total_seconds) VALUES (?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET total_seconds = total_seconds + excluded.total_seconds",
+                (task_name, elapsed_seconds)
+            )
+            self.conn.execute(
+                "INSERT INTO task_sessions (date, task_name, start_time, end_time) VALUES (?, ?, ?, ?)",
+                (date_str, task_name, start_time, end_time)
+            )
+
+    def get_sessions(self, date_str):
+        rows = self._query(
+            "SELECT task_name, start_time, end_time FROM task_sessions WHERE date = ? ORDER BY id", (date_str,)
+        )
+        return [{"task_name": name, "start_time": start, "end_time": end} for name, start, end in rows]
+
+    def get_all_sessions(self):
+        sessions = {}
+        for date_str, name, start, end in self._query(
+                "SELECT date, task_name, start_time, end_time FROM task_sessions ORDER BY id"):
+            sessions.setdefault(date_str, []).append({"task_name": name, "start_time": start, "end_time": end})
+        return sessions
+
+    def get_task_names(self):
+        rows = self._query("SELECT name FROM tasks UNION SELECT DISTINCT task_name FROM task_sessions")
+        return [name for (name,) in rows]
+
+    def source(self):
+        return f"sqlite:{self.db_path}"
+
+    def session_count(self):
+        return self._query("SELECT COUNT(*) FROM task_sessions WHERE end_time IS NOT NULL")[0][0]
+
+    # ---- 学习时间 ----
+
+    def get_study_time(self, date_str):
+        row = self._query("SELECT seconds FROM study_time WHERE date = ?", (date_str,))
+        return row[0][0] if row else 0
+
+    def add_study_time(self, date_str, seconds):
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT INTO study_time (date, seconds) VALUES (?, ?) "
+                "ON CONFLICT(date) DO UPDATE SET seconds = seconds + excluded.seconds",
+                (date_str, seconds)
+            )
+
+    def get_all_study_times(self):
+        return dict(self._query("SELECT date, seconds FROM study_time ORDER BY date"))
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+class EventLogStorage(JsonStorage):
+    """
+    任务记录使用按月分区的追加式 JSON Lines 事件日志：<events_dir>/YYYY-MM.jsonl
+        {"event": "start", "date", "task", "time"}              任务开始
+        {"event": "end", "date", "task", "start", "time"}       任务结束
+        {"event": "session", "date", "task", "start", "end"}    压缩后的完整记录
+    index.json 记录每天第一条事件在月文件中的字节偏移（只在新的一天开始时重写），
+    totals.json 记录任务累计时间，sessions.json 记录已结束的任务记录数。
+    启动时只读取索引和累计时间，读取某天记录只需从偏移处读取当月文件，写入只追加一行，
+    均与历史长度无关。过去月份的文件在后台线程中压缩（开始/结束事件合并为一条记录）。
+    学习时间仍使用 study_time.json（见 JsonStorage）。
+    """
+
+    INDEX_NAME = "index.json"
+    TOTALS_NAME = "totals.json"
+    COUNT_NAME = "sessions.json"
+
+    def __init__(self, events_dir="task_events", task_file="tasks.json", log_file="task_log.json",
+                 study_time_file="study_time.json", compact=True):
+        """
+        Args:
+            events_dir (str): 事件日志目录
+            task_file / log_file (str): 首次使用时导入的原 JSON 文件
+            study_time_file (str): 学习时间文件
+            compact (bool): 是否在后台压缩过去月份的日志
+        """
+        super().__init__(task_file=task_file, log_file=log_file, study_time_file=study_time_file)
+        self.events_dir = events_dir
+        self._lock = threading.RLock()
+        first_use = not os.path.exists(events_dir)
+        os.makedirs(events_dir, exist_ok=True)
+        self.index = self._load_json(self.INDEX_NAME, {"days": {}, "compacted": []})
+        self.totals = self._load_json(self.TOTALS_NAME, {})
+        if first_use:
+            self.migrate_from_json()
+        self.counts = self._load_json(self.COUNT_NAME, None)
+        if self.counts is None:
+            # 旧版本没有记录数，读取一次全部日志补上
+            self.counts = {"sessions": sum(1 for records in self.get_all_sessions().values()
+                                           for record in records if record["end_time"])}
+            self._save_json(self.COUNT_NAME, self.counts)
+        self._compact_thread = None
+        if compact:
+            self._compact_thread = threading.Thread(target=self.compact, name="event-log-compaction", daemon=True)
+            self._compact_thread.start()
+
+    def _load_json(self, name, default):
+        path = os.path.join(self.events_dir, name)
+        if not os.path.exists(path):
+            return default
+        with open(path, "r") as f:
+            return json.load(f)
+
+    def _save_json(self, name, data):
+        path = os.path.join(self.events_dir, name)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def _month_path(self, month):
+        return os.path.join(self.events_dir, f"{month}.jsonl")
+
+    def migrate_from_json(self):
+        """
+        首次使用时把 tasks.json / task_log.json 导入为压缩格式的事件日志
+        """
+        if os.path.exists(self.task_file):
+            self.totals.update(self.tasks)
+        if os.path.exists(self.log_file):
+            for date_str in sorted(self.task_log):
+                for record in self.task_log[date_str]:
+                    self.totals.setdefault(record["task_name"], 0)
+                    if record["end_time"]:
+                        self._append({"event": "session", "date": date_str, "task": record["task_name"],
+                                      "start": record["start_time"], "end": record["end_time"]})
+        self._save_json(self.TOTALS_NAME, self.totals)
+        logging.info(f"Migrated JSON task data into {self.events_dir}")
+
+    def _append(self, record):
+        """
+        追加一条事件；某天的第一条事件会登记到索引
+        """
+        line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+        with self._lock:
+            with open(self._month_path(record["date"][:7]), "ab") as f:
+                offset = f.tell()
+                f.write(line)
+            if record["date"] not in self.index["days"]:
+                self.index["days"][record["date"]] = offset
+                self._save_json(self.INDEX_NAME, self.index)
+
+    @staticmethod
+    def _read_records(path, offset=0):
+        records = []
+        with open(path, "rb") as f:
+            f.seek(offset)
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    continue  # 崩溃时写了一半的最后一行
+        return records
+
+    @staticmethod
+    def _sessions_from_records(records):
+        """
+        将事件按顺序还原为任务记录 [{task_name, start_time, end_time}]
+        """
+        sessions = []
+        for record in records:
+            if record["event"] == "session":
+                sessions.append({"task_name": record["task"], "start_time": record["start"], "end_time": record["end"]})
+            elif record["event"] == "start":
+                sessions.append({"task_name": record["task"], "start_time": record["time"], "end_time": None})
+            elif record["event"] == "end":
+                for session in reversed(sessions):
+                    if session["end_time"] is None and session["task_name"] == record["task"]:
+                        session["end_time"] = record["time"]
+                        break
+                else:
+                    sessions.append({"task_name": record["task"], "start_time": record["start"], "end_time": record["time"]})
+        return sessions
+
+    # ---- 任务 ----
+
+    def load_task_totals(self):
+        return dict(self.totals)
+
+    def ensure_task(self, task_name):
+        with self._lock:
+            if task_name not in self.totals:
+                self.totals[task_name] = 0
+                self._save_json(self.TOTALS_NAME, self.totals)
+
+    def start_session(self, date_str, task_name, start_time):
+        self._append({"event": "start", "date": date_str, "task": task_name, "time": start_time})
+
+    def add_session(self, date_str, task_name, start_time, end_time, elapsed_seconds):
+        with self._lock:
+            # 先写记录数：追加事件前崩溃时记录数偏大，聚合索引据此发现不一致并重建
+            self.counts["sessions"] += 1
+            self._save_json(self.COUNT_NAME, self.counts)
+        self._append({"event": "end", "date": date_str, "task": task_name, "start": start_time, "time": end_time})
+        with self._lock:
+            self.totals[task_name] = self.totals.get(task_name, 0) + elapsed_seconds
+            self._save_json(self.TOTALS_NAME, self.totals)
+
+    def get_sessions(self, date_str):
+        with self._lock:
+            offset = self.index["days"].get(date_str)
+            if offset is None:
+                return []
+            records = self._read_records(self._month_path(date_str[:7]), offset)
+        return self._sessions_from_records([record for record in records if record["date"] == date_str])
+
+    def get_all_sessions(self):
+        sessions = {}
+        for name in sorted(os.listdir(self.events_dir)):
+            if not name.endswith(".jsonl"):
+                continue
+            with self._lock:
+                records = self._read_records(os.path.join(self.events_dir, name))
+            by_date = {}
+            for record in records:
+                by_date.setdefault(record["date"], []).append(record)
+            for date_str, day_records in by_date.items():
+                sessions[date_str] = self._sessions_from_records(day_records)
+        return sessions
+
+    def get_task_names(self):
+        return list(self.totals.keys())
+
+    def source(self):
+        return f"eventlog:{self.events_dir}"
+
+    def session_count(self):
+        return self.counts["sessions"]
+
+    # ---- 压缩 ----
+
+    def compact(self):
+        """
+        压缩所有过去月份（当前月份仍在写入，不压缩）
+        """
+        current_month = datetime.now().strftime("%Y-%m")
+        for name in sorted(os.listdir(self.events_dir)):
+            month = name[:-len(".jsonl")]
+            if not name.endswith(".jsonl") or month >= current_month or month in self.index["compacted"]:
+                continue
+            try:
+                self.compact_month(month)
+            except Exception:
+                logging.exception(f"Exception occurred while compacting task events for {month}.")
+
+    def compact_month(self, month):
+        """
+        将一个月的事件重写为每段任务一条 session 记录，并更新索引偏移
+        """
+        path = self._month_path(month)
+        with self._lock:
+            by_date = {}
+            for record in self._read_records(path):
+                by_date.setdefault(record["date"], []).append(record)
+            tmp_path = path + ".tmp"
+            offsets = {}
+            with open(tmp_path, "wb") as f:
+                for date_str in sorted(by_date):
+                    offsets[date_str] = f.tell()
+                    for session in self._sessions_from_records(by_date[date_str]):
+                        if session["end_time"] is None:
+                            record = {"event": "start", "date": date_str, "task": session["task_name"],
+                                      "time": session["start_time"]}
+                        else:
+                            record = {"event": "session", "date": date_str, "task": session["task_name"],
+                                      "start": session["start_time"], "end": session["end_time"]}
+                        f.write((json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8"))
+            os.replace(tmp_path, path)
+            self.index["days"].update(offsets)
+            self.index["compacted"].append(month)
+            self._save_json(self.INDEX_NAME, self.index)
+        logging.info(f"Compacted task events for {month}")
+
+    def close(self):
+        if self._compact_thread is not None:
+            self._compact_thread.join()
+
+
+def create_storage(config):
+    """
+    根据配置创建存储后端
+    Args:
+        config (dict): 应用配置（读取 storage_backend / storage_path）
+    Returns:
+        JsonStorage | SQLiteStorage | EventLogStorage: 存储后端
+    """
+    backend = config["storage_backend"]
+    if backend == "sqlite":
+        return SQLiteStorage(db_path=config["storage_path"])
+    if backend == "eventlog":
+        return EventLogStorage(events_dir=config["event_log_dir"])
+    if backend == "json":
+        return JsonStorage()
+    raise ValueError(f"Unknown storage backend: {backend}")
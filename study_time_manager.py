@@ -1,35 +1,107 @@
 import json
+import logging
 import os
+import threading
+import time
 from datetime import datetime
 
+from storage import JsonStorage
+
 class StudyTimeManager:
-    def __init__(self, file_path="study_time.json"):
+    def __init__(self, file_path="study_time.json", storage=None, flush_interval=0, journal_path="study_time.journal"):
         """
         初始化学习时间管理器
         Args:
-            file_path (str): 存储学习时间的文件路径
+            file_path (str): 存储学习时间的文件路径（未指定 storage 时使用）
+            storage: 存储后端（JsonStorage / SQLiteStorage），默认使用 JSON 文件
+            flush_interval (float): 延迟写入间隔（秒）。0 表示每次增加都立即写入存储；
+                大于 0 时增量先累积在内存中并追加到日志文件，按间隔批量写入存储
+            journal_path (str): 追加式日志文件路径，崩溃后启动时据此恢复未写入的增量
         """
-        self.file_path = file_path
+        self.storage = storage or JsonStorage(study_time_file=file_path)
         self.today = datetime.now().strftime("%Y-%m-%d")
-        self.data = self.load_study_time()
+        self.flush_interval = flush_interval
+        self.journal_path = journal_path
+        self.pending = {}  # 尚未写入存储的增量 {date: seconds}
+        self.last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        self._journal = None
+        if self.flush_interval > 0:
+            self._journal = open(self.journal_path, "a")
+            self.replay_journal()
+
+    def replay_journal(self):
+        """
+        恢复上次未写入存储的日志记录，并按 flush 的步骤写入存储。
+        日志中有两种记录：
+            {"date", "seconds"}  尚未写入存储的增量
+            {"date", "total"}    flush 开始时写下的目标总数；存储已达到该值说明已写入，只补差额
+        """
+        if not os.path.exists(self.journal_path):
+            return
+        recovered, totals = {}, {}
+        with open(self.journal_path, "r") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # 崩溃时写了一半的最后一行
+                if "total" in record:
+                    totals[record["date"]] = record["total"]
+                else:
+                    recovered[record["date"]] = recovered.get(record["date"], 0) + record["seconds"]
+        for date_str, total in totals.items():
+            missing = total - self.storage.get_study_time(date_str)
+            if missing > 0:
+                recovered[date_str] = recovered.get(date_str, 0) + missing
+        if recovered:
+            self.pending = recovered
+            logging.info(f"Recovered study time from journal: {recovered}")
+        self.flush()
 
-    def load_study_time(self):
+    def _rewrite_journal(self, records):
         """
-        加载学习时间数据
-        Returns:
-            dict: 学习时间数据（以日期为键）
+        用 records 原子地替换日志内容（写入临时文件后改名）
         """
-        if os.path.exists(self.file_path):
-            with open(self.file_path, "r") as f:
-                return json.load(f)
-        return {}
+        tmp_path = self.journal_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.writelines(json.dumps(record) + "\n" for record in records)
+        self._journal.close()
+        os.replace(tmp_path, self.journal_path)
+        self._journal = open(self.journal_path, "a")
+
+    def flush(self):
+        """
+        将累积的增量写入存储并清空日志。
+        先把各日期的目标总数原子地写入日志（替换其中的增量），再逐个写入存储，
+        成功后才从 pending 中移除；任一步骤中崩溃或出错，重放日志时都不会重复或丢失
+        """
+        with self._lock:
+            if self.pending:
+                targets = {date_str: self.storage.get_study_time(date_str) + seconds
+                           for date_str, seconds in self.pending.items()}
+                if self._journal is not None:
+                    self._rewrite_journal([{"date": date_str, "total": total} for date_str, total in targets.items()])
+                for date_str, total in targets.items():
+                    # 按目标总数补差额：重试时已写入的日期不会再加一次
+                    missing = total - self.storage.get_study_time(date_str)
+                    if missing > 0:
+                        self.storage.add_study_time(date_str, missing)
+                    del self.pending[date_str]
+                if self._journal is not None:
+                    self._journal.seek(0)
+                    self._journal.truncate()
+            self.last_flush = time.monotonic()
 
-    def save_study_time(self):
+    def close(self):
         """
-        将学习时间数据保存到文件
+        写入剩余增量并关闭日志文件
         """
-        with open(self.file_path, "w") as f:
-            json.dump(self.data, f, indent=4)
+        self.flush()
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+            os.remove(self.journal_path)
 
     def get_today_study_time(self):
         """
@@ -37,7 +109,7 @@ class StudyTimeManager:
         Returns:
             int: 今日学习时间（秒）
         """
-        return self.data.get(self.today, 0)
+        return self.storage.get_study_time(self.today) + self.pending.get(self.today, 0)
 
     def add_study_time(self, seconds):
         """
@@ -45,8 +117,15 @@ class StudyTimeManager:
         Args:
             seconds (int): 增加的时间（秒）
         """
-        self.data[self.today] = self.get_today_study_time() + seconds
-        self.save_study_time()
+        if self._journal is None:
+            self.storage.add_study_time(self.today, seconds)
+            return
+        with self._lock:
+            self.pending[self.today] = self.pending.get(self.today, 0) + seconds
+            self._journal.write(json.dumps({"date": self.today, "seconds": seconds}) + "\n")
+            self._journal.flush()
+        if time.monotonic() - self.last_flush >= self.flush_interval:
+            self.flush()
 
     def get_all_study_times(self):
         """
@@ -54,7 +133,10 @@ class StudyTimeManager:
         Returns:
             dict: 所有学习时间数据（以日期为键）
         """
-        return self.data
+        study_times = dict(self.storage.get_all_study_times())
+        for date_str, seconds in self.pending.items():
+            study_times[date_str] = study_times.get(date_str, 0) + seconds
+        return study_times
 
     def get_study_time_for_date(self, date_str):
         """
@@ -64,7 +146,7 @@ class StudyTimeManager:
         Returns:
             int: 学习时间（秒）
         """
-        return self.data.get(date_str, 0)
+        return self.storage.get_study_time(date_str) + self.pending.get(date_str, 0)
 
     def get_study_records(self):
         """
@@ -72,4 +154,4 @@ class StudyTimeManager:
         Returns:
             dict: 所有学习时间数据（以日期为键）
         """
-        return self.data
\ No newline at end of file
+        return self.get_all_study_times()
@@ -1,62 +1,23 @@
+import logging
 from datetime import datetime, timedelta
-import json
-import os
+
+from storage import JsonStorage
 
 class TaskManager:
-    def __init__(self, task_file="tasks.json", log_file="task_log.json"):
+    def __init__(self, task_file="tasks.json", log_file="task_log.json", storage=None, aggregates=None):
         """
         初始化任务管理器
         Args:
-            task_file (str): 任务累计时间数据存储文件路径
-            log_file (str): 任务日志数据存储文件路径
+            task_file (str): 任务累计时间数据存储文件路径（未指定 storage 时使用）
+            log_file (str): 任务日志数据存储文件路径（未指定 storage 时使用）
+            storage: 存储后端（JsonStorage / SQLiteStorage / EventLogStorage），默认使用 JSON 文件
+            aggregates (AggregateIndex): 可选的统计聚合索引，随任务结束增量更新
         """
-        self.task_file = task_file
-        self.log_file = log_file
-        self.tasks = self.load_tasks()
+        self.storage = storage or JsonStorage(task_file=task_file, log_file=log_file)
+        self.aggregates = aggregates
         self.current_task = None
         self.task_start_time = None
         self.date_str = datetime.now().strftime("%Y-%m-%d")
-        self.task_log = self.load_task_log()
-
-    def load_tasks(self):
-        """
-        从文件加载任务累计时间数据
-        Returns:
-            dict: 任务数据 {task_name: total_seconds}
-        """
-        if not os.path.exists(self.task_file):
-            with open(self.task_file, "w") as f:
-                json.dump({}, f)
-                
-        with open(self.task_file, "r") as f:
-            return json.load(f)
-
-    def load_task_log(self):
-        """
-        加载任务日志
-        Returns:
-            dict: 任务日志 {date: [{task_name, start_time, end_time}]}
-        """
-        if not os.path.exists(self.log_file):
-            with open(self.log_file, "w") as f:
-                json.dump({}, f)
-                
-        with open(self.log_file, "r") as f:
-            return json.load(f)
-
-    def save_tasks(self):
-        """
-        保存任务累计时间数据到文件
-        """
-        with open(self.task_file, "w") as f:
-            json.dump(self.tasks, f, indent=4)
-
-    def save_task_log(self):
-        """
-        保存任务日志到文件
-        """
-        with open(self.log_file, "w") as f:
-            json.dump(self.task_log, f, indent=4)
 
     def start_task(self, task_name):
         """
@@ -69,21 +30,11 @@ class TaskManager:
 
         self.current_task = task_name
         self.task_start_time = datetime.now()
-        if task_name not in self.tasks:
-            self.tasks[task_name] = 0  # 初始化任务累计时间
-        print(f"Task started: {task_name}")
-
-        self.task_start_time = datetime.now()
-        self.current_task = task_name
-        # 确保当日的任务列表存在
-        if self.date_str not in self.task_log:
-            self.task_log[self.date_str] = []
-        # 记录任务开始
-        self.task_log[self.date_str].append({
-            "task_name": task_name,
-            "start_time": self.task_start_time.strftime("%Y-%m-%d %H:%M:%S"),
-            "end_time": None
-        })
+        self.storage.ensure_task(task_name)  # 初始化任务累计时间
+        if self.aggregates:
+            self.aggregates.add_task(task_name)
+        self.storage.start_session(self.date_str, task_name, self.task_start_time.strftime("%Y-%m-%d %H:%M:%S"))
+        logging.info(f"Task started: {task_name}")
 
     def end_current_task(self):
         """
@@ -96,22 +47,21 @@ class TaskManager:
         end_time = datetime.now()
         elapsed_time = (end_time - self.task_start_time).total_seconds()
         
-        # 更新累计时间
-        self.tasks[self.current_task] += elapsed_time
-        
-        # 更新任务日志
-        if self.date_str in self.task_log and self.task_log[self.date_str]:
-            self.task_log[self.date_str][-1]["end_time"] = end_time.strftime("%Y-%m-%d %H:%M:%S")
-        
-        # 保存数据
-        self.save_tasks()
-        self.save_task_log()
-        
+        # 记录任务日志并更新累计时间
+        self.storage.add_session(
+            self.date_str,
+            self.current_task,
+            self.task_start_time.strftime("%Y-%m-%d %H:%M:%S"),
+            end_time.strftime("%Y-%m-%d %H:%M:%S"),
+            elapsed_time
+        )
+        if self.aggregates:
+            self.aggregates.record_session(self.date_str, self.current_task, elapsed_time)
+        logging.info(f"Task ended: {self.current_task}, time added: {elapsed_time:.1f} seconds")
+
         # 重置当前任务状态
         self.task_start_time = None
         self.current_task = None
-        
-        print(f"Task ended: {self.current_task}, time added: {elapsed_time} seconds")
 
     def get_task_time(self, task_name):
         """
@@ -121,7 +71,7 @@ class TaskManager:
         Returns:
             int: 累计时间（秒）
         """
-        return self.tasks.get(task_name, 0)
+        return self.storage.load_task_totals().get(task_name, 0)
 
     def get_all_tasks(self):
         """
@@ -129,11 +79,9 @@ class TaskManager:
         Returns:
             list: 任务名称列表
         """
-        tasks = set(self.tasks.keys())  # 包含来自 tasks.json 的任务名称
-        for day_logs in self.task_log.values():
-            for record in day_logs:
-                tasks.add(record["task_name"])
-        return list(tasks)
+        if self.aggregates:
+            return self.aggregates.task_names()
+        return self.storage.get_task_names()
 
     def get_daily_work_timeline(self):
         """
@@ -143,7 +91,7 @@ class TaskManager:
         """
         # 假设有日志文件记录每个任务切换的时间，可在此实现更详细的时间线分析
         # Placeholder: 可扩展为从日志文件读取并分析
-        return [{"task": task, "time": timedelta(seconds=time)} for task, time in self.tasks.items()]
+        return [{"task": task, "time": timedelta(seconds=time)} for task, time in self.storage.load_task_totals().items()]
 
     def get_daily_log(self, date_str=None):
         """
@@ -151,8 +99,18 @@ class TaskManager:
         Args:
             date_str (str): 日期字符串，格式为 'YYYY-MM-DD'。默认为今天。
         Returns:
-            list: 当日的任务记录列表
+            list: 当日的任务记录列表（进行中的任务 end_time 为 None）
         """
         if date_str is None:
             date_str = self.date_str
-        return self.task_log.get(date_str, [])
\ No newline at end of file
+        records = self.storage.get_sessions(date_str)
+        if date_str == self.date_str and self.current_task:
+            current = {
+                "task_name": self.current_task,
+                "start_time": self.task_start_time.strftime("%Y-%m-%d %H:%M:%S"),
+                "end_time": None
+            }
+            # 事件日志存储已经记录了任务开始事件
+            if current not in records:
+                records.append(current)
+        return records
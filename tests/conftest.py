@@ -0,0 +1,18 @@
+import os
+import sys
+
+import pytest
+
+# 项目模块位于仓库根目录（没有打包为包），测试时从根目录导入
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage import JsonStorage  # noqa: E402
+
+
+@pytest.fixture
+def json_storage(tmp_path):
+    """
+    使用临时目录中 JSON 文件的存储后端
+    """
+    return JsonStorage(task_file=str(tmp_path / "tasks.json"), log_file=str(tmp_path / "task_log.json"),
+                       study_time_file=str(tmp_path / "study_time.json"))
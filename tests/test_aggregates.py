@@ -0,0 +1,71 @@
+from aggregates import AggregateIndex
+from storage import EventLogStorage, SQLiteStorage
+
+
+def add_session(storage, aggregates, date_str, task_name, start, end, seconds):
+    storage.add_session(date_str, task_name, f"{date_str} {start}", f"{date_str} {end}", seconds)
+    if aggregates is not None:
+        aggregates.record_session(date_str, task_name, seconds)
+
+
+def test_reopen_uses_snapshot_and_journal(tmp_path, json_storage):
+    path = str(tmp_path / "task_aggregates.json")
+    aggregates = AggregateIndex(json_storage, path=path)
+    add_session(json_storage, aggregates, "2024-01-02", "Reading", "14:00:00", "14:30:00", 1800)
+    aggregates.close()
+
+    aggregates = AggregateIndex(json_storage, path=path)
+    add_session(json_storage, aggregates, "2024-01-02", "Math", "15:00:00", "15:10:00", 600)
+    aggregates._journal.close()  # 模拟未写快照就退出，重新打开时重放增量日志
+
+    aggregates = AggregateIndex(json_storage, path=path)
+    assert aggregates.get_day("2024-01-02") == {"Reading": 1800, "Math": 600}
+    assert aggregates.get_day_total("2024-01-02") == 2400
+    assert aggregates.task_names() == ["Reading", "Math"]
+    aggregates.close()
+
+
+def test_rebuilds_after_crash_between_storage_and_index(tmp_path, json_storage):
+    path = str(tmp_path / "task_aggregates.json")
+    aggregates = AggregateIndex(json_storage, path=path)
+    add_session(json_storage, aggregates, "2024-01-02", "Reading", "14:00:00", "14:30:00", 1800)
+    aggregates.close()
+    # 任务记录已写入存储，但在更新聚合索引之前崩溃
+    add_session(json_storage, None, "2024-01-02", "Math", "15:00:00", "15:10:00", 600)
+
+    aggregates = AggregateIndex(json_storage, path=path)
+    assert aggregates.get_day("2024-01-02") == {"Reading": 1800, "Math": 600}
+    assert aggregates.get_task_total("Math") == 600
+    aggregates.close()
+
+
+def test_rebuilds_when_storage_backend_changes(tmp_path, json_storage):
+    path = str(tmp_path / "task_aggregates.json")
+    aggregates = AggregateIndex(json_storage, path=path)
+    add_session(json_storage, aggregates, "2024-01-02", "Reading", "14:00:00", "14:30:00", 1800)
+    aggregates.close()
+
+    sqlite_storage = SQLiteStorage(db_path=str(tmp_path / "other.db"), task_file=str(tmp_path / "none.json"),
+                                   log_file=str(tmp_path / "none.json"), study_time_file=str(tmp_path / "none.json"))
+    add_session(sqlite_storage, None, "2024-01-03", "Math", "09:00:00", "09:10:00", 600)
+    aggregates = AggregateIndex(sqlite_storage, path=path)
+    assert aggregates.get_day("2024-01-02") == {}
+    assert aggregates.get_day("2024-01-03") == {"Math": 600}
+    assert aggregates.task_names() == ["Math"]
+    aggregates.close()
+    sqlite_storage.close()
+
+
+def test_event_log_session_count_survives_reopen(tmp_path):
+    events_dir = str(tmp_path / "events")
+    storage = EventLogStorage(events_dir=events_dir, task_file=str(tmp_path / "tasks.json"),
+                              log_file=str(tmp_path / "task_log.json"), compact=False)
+    aggregates = AggregateIndex(storage, path=str(tmp_path / "task_aggregates.json"))
+    add_session(storage, aggregates, "2024-01-02", "Reading", "14:00:00", "14:30:00", 1800)
+    aggregates.close()
+
+    storage = EventLogStorage(events_dir=events_dir, compact=False)
+    assert storage.session_count() == 1
+    aggregates = AggregateIndex(storage, path=str(tmp_path / "task_aggregates.json"))
+    assert aggregates.get_day("2024-01-02") == {"Reading": 1800}
+    aggregates.close()
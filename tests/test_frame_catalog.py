@@ -0,0 +1,124 @@
+import os
+from datetime import datetime
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from frame_catalog import FrameCatalog, parse_time
+
+
+def write_frame(frames_root, timestamp, value=0, extension=".png"):
+    """
+    写入一帧，文件名与采集时的命名一致（frame_%Y%m%d_%H%M%S）
+    """
+    captured_at = datetime.strptime(timestamp, "%Y-%m-%d %H:%M:%S")
+    frames_dir = os.path.join(frames_root, captured_at.strftime("%Y-%m-%d"))
+    os.makedirs(frames_dir, exist_ok=True)
+    path = os.path.join(frames_dir, f"frame_{captured_at.strftime('%Y%m%d_%H%M%S')}{extension}")
+    Image.fromarray(np.full((8, 8, 3), value, np.uint8)).save(path)
+    return path
+
+
+@pytest.fixture
+def storage(json_storage):
+    json_storage.add_session("2024-01-02", "Reading", "2024-01-02 14:00:00", "2024-01-02 14:30:00", 1800)
+    json_storage.add_session("2024-01-02", "Math", "2024-01-02 14:40:00", "2024-01-02 15:10:00", 1800)
+    return json_storage
+
+
+@pytest.fixture
+def catalog(tmp_path, storage):
+    catalog = FrameCatalog(str(tmp_path / "catalog.db"), storage=storage)
+    yield catalog
+    catalog.close()
+
+
+@pytest.fixture
+def frames_root(tmp_path):
+    root = str(tmp_path / "frames")
+    for minute in range(0, 60, 5):
+        write_frame(root, f"2024-01-02 14:{minute:02d}:00", minute)
+    write_frame(root, "2024-01-03 09:00:00")
+    return root
+
+
+def test_parse_time_fills_omitted_parts():
+    assert parse_time("2024-01-02") == "2024-01-02 00:00:00"
+    assert parse_time("2024-01-02", end=True) == "2024-01-02 23:59:59"
+    assert parse_time("2024-01-02 14:32", end=True) == "2024-01-02 14:32:59"
+    with pytest.raises(ValueError):
+        parse_time("yesterday")
+
+
+def test_backfill_infers_tasks_from_sessions(catalog, frames_root):
+    frames = catalog.frames("2024-01-02 00:00:00", "2024-01-02 23:59:59", frames_root=frames_root)
+
+    assert len(frames) == 12
+    assert [frame["timestamp"][11:16] for frame in frames[:3]] == ["14:00", "14:05", "14:10"]
+    tasks = {frame["timestamp"][11:16]: frame["task"] for frame in frames}
+    assert tasks["14:30"] == "Reading"
+    assert tasks["14:35"] is None
+    assert tasks["14:55"] == "Math"
+    assert all(len(frame["checksum"]) == 32 for frame in frames)
+
+
+def test_range_and_task_queries(catalog, frames_root):
+    reading = catalog.frame_paths("2024-01-02 00:00:00", "2024-01-03 23:59:59", "Reading", frames_root)
+    assert [os.path.basename(path) for path in reading] == [
+        f"frame_20240102_14{minute:02d}00.png" for minute in range(0, 31, 5)
+    ]
+    assert catalog.count("2024-01-02 14:50:00", "2024-01-03 09:00:00", frames_root=frames_root) == 3
+    assert catalog.task_names(frames_root=frames_root) == ["Math", "Reading"]
+
+
+def test_nearest_frame_within_the_day(catalog, frames_root):
+    assert catalog.nearest("2024-01-02 14:32:00", frames_root)["timestamp"] == "2024-01-02 14:30:00"
+    assert catalog.nearest("2024-01-02 14:34:00", frames_root)["timestamp"] == "2024-01-02 14:35:00"
+    assert catalog.nearest("2024-01-04 12:00:00", frames_root) is None
+
+
+def test_captured_frames_are_added_without_rescanning(catalog, frames_root):
+    catalog.sync(frames_root)
+    path = write_frame(frames_root, "2024-01-03 10:00:00", 200)
+
+    catalog.add(path, datetime(2024, 1, 3, 10), "Coding", frames_root)
+
+    frames = catalog.frames("2024-01-03 00:00:00", "2024-01-03 23:59:59", frames_root=frames_root)
+    assert [(frame["timestamp"], frame["task"]) for frame in frames] == [
+        ("2024-01-03 09:00:00", None), ("2024-01-03 10:00:00", "Coding")
+    ]
+
+
+def test_sync_detects_deleted_and_changed_frames(catalog, frames_root):
+    catalog.sync(frames_root)
+    deleted = os.path.join(frames_root, "2024-01-02", "frame_20240102_140500.png")
+    os.remove(deleted)
+    # 已同步的日期不会自动重新扫描
+    assert catalog.count("2024-01-02 00:00:00", "2024-01-02 23:59:59", frames_root=frames_root) == 12
+
+    catalog.sync(frames_root, force=True)
+
+    assert catalog.count("2024-01-02 00:00:00", "2024-01-02 23:59:59", frames_root=frames_root) == 11
+
+
+def test_tools_update_remove_and_invalidate(catalog, frames_root):
+    catalog.sync(frames_root)
+    original = os.path.join(frames_root, "2024-01-02", "frame_20240102_141000.png")
+    # 重新编码为另一种格式：采集时间和任务保留，路径和校验和更新
+    recompressed = os.path.splitext(original)[0] + ".jpg"
+    Image.open(original).convert("RGB").save(recompressed, quality=50)
+    os.remove(original)
+
+    assert catalog.update(original, recompressed)
+    entry = catalog.nearest("2024-01-02 14:10:00", frames_root)
+    assert entry["path"] == os.path.normpath(recompressed)
+    assert entry["task"] == "Reading"
+
+    catalog.remove([recompressed])
+    os.remove(recompressed)
+    assert catalog.count("2024-01-02 14:10:00", "2024-01-02 14:10:00", frames_root=frames_root) == 0
+
+    write_frame(frames_root, "2024-01-03 11:00:00")
+    catalog.invalidate(frames_root, ["2024-01-03"])
+    assert catalog.count("2024-01-03 00:00:00", "2024-01-03 23:59:59", frames_root=frames_root) == 2
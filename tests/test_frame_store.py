@@ -0,0 +1,39 @@
+import os
+from datetime import datetime
+
+import numpy as np
+
+from app_config import DEFAULT_CONFIG
+from frame_manifest import frame_timestamp
+from frame_store import FrameWriter, list_frame_files
+
+
+def test_frames_within_one_second_get_distinct_ordered_names(tmp_path):
+    config = dict(DEFAULT_CONFIG, frame_format="npy")
+    writer = FrameWriter(config)
+    frames_dir = str(tmp_path)
+    times = [datetime(2024, 1, 2, 14, 0, 0, 100000), datetime(2024, 1, 2, 14, 0, 0, 400000),
+             datetime(2024, 1, 2, 14, 0, 0, 900000), datetime(2024, 1, 2, 14, 0, 1)]
+    paths = []
+    for value, captured_at in enumerate(times):
+        path = writer.frame_path(frames_dir, captured_at)
+        writer.submit(np.full((4, 4, 3), value, np.uint8), path)
+        paths.append(path)
+    writer.close()
+
+    assert len(set(paths)) == len(paths)
+    assert list_frame_files(frames_dir) == paths
+    assert [os.path.basename(path) for path in paths[:2]] == ["frame_20240102_140000.npy",
+                                                              "frame_20240102_140000_001.npy"]
+    assert [frame_timestamp(path) for path in paths] == [t.replace(microsecond=0) for t in times]
+    assert not [name for name in os.listdir(frames_dir) if name.endswith(".part")]
+
+
+def test_existing_frame_is_not_overwritten_after_restart(tmp_path):
+    config = dict(DEFAULT_CONFIG, frame_format="npy")
+    captured_at = datetime(2024, 1, 2, 14, 0, 0)
+    first = FrameWriter(config).frame_path(str(tmp_path), captured_at)
+    open(first, "wb").close()
+    second = FrameWriter(config).frame_path(str(tmp_path), captured_at)
+    assert second != first
+    assert frame_timestamp(second) == captured_at
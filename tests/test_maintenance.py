@@ -0,0 +1,34 @@
+import gc
+import warnings
+
+import numpy as np
+from PIL import Image
+
+from app_config import DEFAULT_CONFIG
+from tools.maintenance import process_frame
+
+
+def options(repair):
+    return {"repair": repair, "delete_corrupt": False, "resize": None, "recompress": False,
+            "config": dict(DEFAULT_CONFIG)}
+
+
+def test_verify_and_repair_close_their_files(tmp_path):
+    # 截断的 JPEG 能通过 verify，在 load 时才出错
+    good = str(tmp_path / "frame_20240102_120000.jpg")
+    Image.fromarray(np.random.default_rng(0).integers(0, 255, (64, 64, 3), np.uint8)).save(good, quality=90)
+    truncated = str(tmp_path / "frame_20240102_120001.jpg")
+    with open(good, "rb") as f:
+        data = f.read()
+    with open(truncated, "wb") as f:
+        f.write(data[:len(data) // 2])
+
+    # 未关闭的文件被回收时会发出 ResourceWarning
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always", ResourceWarning)
+        assert process_frame((good, options(repair=False)))["status"] == "ok"
+        assert process_frame((truncated, options(repair=False)))["status"] == "corrupt"
+        process_frame((truncated, options(repair=True)))
+        gc.collect()
+
+    assert not [warning for warning in caught if issubclass(warning.category, ResourceWarning)]
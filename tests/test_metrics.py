@@ -0,0 +1,26 @@
+import json
+
+from metrics import Metrics
+
+
+def test_log_summary_covers_only_the_current_window():
+    registry = Metrics()
+    for _ in range(10):
+        registry.observe("stage_seconds", 0.2, "save")
+    registry.snapshot(reset_window=True)
+    registry.observe("stage_seconds", 0.004, "save")
+
+    summary = registry.snapshot(reset_window=True)["histograms"]["stage_seconds[save]"]
+
+    assert summary == {"count": 1, "mean_ms": 4.0, "p95_ms": 4.0, "max_ms": 4.0}
+    # Prometheus 端点仍是累计值
+    assert 'timelapse_stage_seconds_count{stage="save"} 11' in registry.render_prometheus()
+
+
+def test_p95_beyond_the_last_bucket_is_finite_json():
+    registry = Metrics()
+    registry.observe("stage_seconds", 42.0, "save")
+
+    line = json.dumps(registry.snapshot()["histograms"], allow_nan=False)
+
+    assert json.loads(line)["stage_seconds[save]"]["p95_ms"] == 42000.0
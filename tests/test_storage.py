@@ -0,0 +1,116 @@
+import json
+import os
+
+from storage import EventLogStorage, JsonStorage, SQLiteStorage
+
+
+def test_json_get_all_sessions_is_a_snapshot(json_storage):
+    json_storage.add_session("2024-01-02", "Reading", "2024-01-02 14:00:00", "2024-01-02 14:30:00", 1800)
+    sessions = json_storage.get_all_sessions()
+    # 图表线程遍历快照期间，GUI 线程继续写入新的日期和记录
+    json_storage.add_session("2024-01-02", "Math", "2024-01-02 15:00:00", "2024-01-02 15:30:00", 1800)
+    json_storage.add_session("2024-01-03", "Math", "2024-01-03 09:00:00", "2024-01-03 09:30:00", 1800)
+    assert list(sessions) == ["2024-01-02"]
+    assert [record["task_name"] for record in sessions["2024-01-02"]] == ["Reading"]
+    assert len(json_storage.get_all_sessions()["2024-01-02"]) == 2
+
+
+def test_json_get_all_study_times_is_a_snapshot(json_storage):
+    json_storage.add_study_time("2024-01-02", 60)
+    study_times = json_storage.get_all_study_times()
+    json_storage.add_study_time("2024-01-03", 60)
+    assert study_times == {"2024-01-02": 60}
+
+
+def write_json_data(tmp_path):
+    (tmp_path / "tasks.json").write_text(json.dumps({"Reading": 1800, "Math": 600}))
+    (tmp_path / "task_log.json").write_text(json.dumps({
+        "2024-01-02": [{"task_name": "Reading", "start_time": "2024-01-02 14:00:00", "end_time": "2024-01-02 14:30:00"},
+                       {"task_name": "Math", "start_time": "2024-01-02 15:00:00", "end_time": "2024-01-02 15:10:00"}],
+        "2024-01-03": [{"task_name": "Reading", "start_time": "2024-01-03 09:00:00", "end_time": None}],
+    }))
+    (tmp_path / "study_time.json").write_text(json.dumps({"2024-01-02": 2400}))
+
+
+def open_sqlite(tmp_path):
+    return SQLiteStorage(db_path=str(tmp_path / "timelapsecam.db"), task_file=str(tmp_path / "tasks.json"),
+                         log_file=str(tmp_path / "task_log.json"), study_time_file=str(tmp_path / "study_time.json"))
+
+
+def test_sqlite_migrates_json_data_once(tmp_path):
+    write_json_data(tmp_path)
+    storage = open_sqlite(tmp_path)
+    storage.add_session("2024-01-03", "Math", "2024-01-03 10:00:00", "2024-01-03 10:20:00", 1200)
+    storage.close()
+
+    storage = open_sqlite(tmp_path)
+    assert storage.load_task_totals() == {"Reading": 1800, "Math": 1800}
+    assert [record["task_name"] for record in storage.get_sessions("2024-01-02")] == ["Reading", "Math"]
+    assert storage.get_sessions("2024-01-03") == [
+        {"task_name": "Reading", "start_time": "2024-01-03 09:00:00", "end_time": None},
+        {"task_name": "Math", "start_time": "2024-01-03 10:00:00", "end_time": "2024-01-03 10:20:00"},
+    ]
+    assert storage.get_all_study_times() == {"2024-01-02": 2400}
+    assert storage.session_count() == 3
+    storage.close()
+
+
+def open_event_log(tmp_path, compact=False):
+    return EventLogStorage(events_dir=str(tmp_path / "task_events"), task_file=str(tmp_path / "tasks.json"),
+                           log_file=str(tmp_path / "task_log.json"), study_time_file=str(tmp_path / "study_time.json"),
+                           compact=compact)
+
+
+def test_event_log_migrates_json_data(tmp_path):
+    write_json_data(tmp_path)
+    storage = open_event_log(tmp_path)
+
+    assert storage.load_task_totals() == {"Reading": 1800, "Math": 600}
+    assert [record["task_name"] for record in storage.get_sessions("2024-01-02")] == ["Reading", "Math"]
+    # 未结束的记录没有可导入的事件
+    assert storage.get_sessions("2024-01-03") == []
+    assert storage.session_count() == 2
+
+
+def test_event_log_compaction_keeps_sessions_and_offsets(tmp_path):
+    storage = open_event_log(tmp_path)
+    for date_str in ("2024-01-02", "2024-01-03"):
+        storage.start_session(date_str, "Reading", f"{date_str} 14:00:00")
+        storage.add_session(date_str, "Reading", f"{date_str} 14:00:00", f"{date_str} 14:30:00", 1800)
+    storage.start_session("2024-01-03", "Math", "2024-01-03 15:00:00")  # 崩溃前未结束的任务
+    before = {date_str: storage.get_sessions(date_str) for date_str in ("2024-01-02", "2024-01-03")}
+    month_path = tmp_path / "task_events" / "2024-01.jsonl"
+    lines_before = len(month_path.read_text().splitlines())
+
+    storage.compact()
+    storage = open_event_log(tmp_path)
+
+    assert storage.index["compacted"] == ["2024-01"]
+    assert len(month_path.read_text().splitlines()) == 3 < lines_before
+    assert {date_str: storage.get_sessions(date_str) for date_str in before} == before
+    assert before["2024-01-03"][1] == {"task_name": "Math", "start_time": "2024-01-03 15:00:00", "end_time": None}
+    assert storage.get_all_sessions() == before
+    assert storage.load_task_totals() == {"Reading": 3600}
+
+
+def test_json_session_count_does_not_read_the_log(json_storage):
+    json_storage.add_session("2024-01-02", "Reading", "2024-01-02 14:00:00", "2024-01-02 14:30:00", 1800)
+    json_storage.add_session("2024-01-03", "Reading", "2024-01-03 14:00:00", "2024-01-03 14:30:00", 1800)
+
+    reopened = JsonStorage(task_file=json_storage.task_file, log_file=json_storage.log_file,
+                           study_time_file=json_storage.study_time_file)
+
+    assert reopened.session_count() == 2
+    assert reopened._task_log is None
+
+
+def test_event_log_index_is_only_rewritten_for_a_new_day(tmp_path):
+    storage = open_event_log(tmp_path)
+    storage.add_session("2024-01-02", "Reading", "2024-01-02 14:00:00", "2024-01-02 14:30:00", 1800)
+    index_path = tmp_path / "task_events" / "index.json"
+    os.utime(index_path, (0, 0))
+
+    storage.add_session("2024-01-02", "Math", "2024-01-02 15:00:00", "2024-01-02 15:10:00", 600)
+
+    assert os.stat(index_path).st_mtime == 0
+    assert open_event_log(tmp_path).session_count() == 2
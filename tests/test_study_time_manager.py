@@ -0,0 +1,78 @@
+import os
+
+import pytest
+
+from study_time_manager import StudyTimeManager
+
+
+def open_manager(tmp_path, json_storage):
+    return StudyTimeManager(storage=json_storage, flush_interval=3600,
+                            journal_path=str(tmp_path / "study_time.journal"))
+
+
+def test_pending_time_is_batched_until_flush(tmp_path, json_storage):
+    manager = open_manager(tmp_path, json_storage)
+    manager.add_study_time(5)
+    manager.add_study_time(5)
+
+    assert json_storage.get_study_time(manager.today) == 0
+    assert manager.get_today_study_time() == 10
+    manager.close()
+    assert json_storage.get_study_time(manager.today) == 10
+    assert not os.path.exists(tmp_path / "study_time.journal")
+
+
+def test_journal_is_replayed_after_a_crash(tmp_path, json_storage):
+    manager = open_manager(tmp_path, json_storage)
+    manager.add_study_time(5)
+    manager.add_study_time(7)
+    manager._journal.close()  # 崩溃：未写入存储也未删除日志
+    with open(tmp_path / "study_time.journal", "a") as f:
+        f.write('{"date": "2024-01-02", "sec')  # 崩溃时写了一半的最后一行
+
+    manager = open_manager(tmp_path, json_storage)
+
+    assert json_storage.get_study_time(manager.today) == 12
+    assert manager.get_today_study_time() == 12
+    manager.close()
+    assert json_storage.get_study_time(manager.today) == 12
+
+
+def test_crash_after_the_storage_write_is_not_counted_twice(tmp_path, json_storage, monkeypatch):
+    manager = open_manager(tmp_path, json_storage)
+    manager.add_study_time(5)
+    write = json_storage.add_study_time
+
+    def write_then_crash(date_str, seconds):
+        write(date_str, seconds)
+        raise KeyboardInterrupt  # 写入存储后、清空日志前进程退出
+
+    monkeypatch.setattr(json_storage, "add_study_time", write_then_crash)
+    with pytest.raises(KeyboardInterrupt):
+        manager.flush()
+    monkeypatch.undo()
+
+    manager = open_manager(tmp_path, json_storage)
+    assert json_storage.get_study_time(manager.today) == 5
+    manager.close()
+    assert json_storage.get_study_time(manager.today) == 5
+
+
+def test_failed_storage_write_keeps_pending_time(tmp_path, json_storage, monkeypatch):
+    manager = open_manager(tmp_path, json_storage)
+    manager.add_study_time(5)
+
+    def fail(date_str, seconds):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(json_storage, "add_study_time", fail)
+    with pytest.raises(OSError):
+        manager.flush()
+    monkeypatch.undo()
+
+    assert manager.get_today_study_time() == 5
+    manager.add_study_time(3)
+    manager.flush()
+    assert json_storage.get_study_time(manager.today) == 8
+    assert os.path.getsize(tmp_path / "study_time.journal") == 0
+    manager.close()
@@ -0,0 +1,15 @@
+import logging
+
+from task_manager import TaskManager
+
+
+def test_end_current_task_logs_the_ended_task(json_storage, caplog):
+    manager = TaskManager(storage=json_storage)
+    manager.start_task("Reading")
+
+    with caplog.at_level(logging.INFO):
+        manager.end_current_task()
+
+    assert "Task ended: Reading" in caplog.text
+    assert manager.current_task is None
+    assert [record["task_name"] for record in json_storage.get_sessions(manager.date_str)] == ["Reading"]
@@ -0,0 +1,147 @@
+import json
+import os
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from batch_compiler import BatchCompiler
+from video_compiler import IncrementalCompiler
+from video_encoder import concat_segments, encode_frame_files, video_size
+
+
+def write_day(frames_root, date_str, sizes):
+    """
+    在 <frames_root>/<date>/ 中按顺序写入纯色 PNG 帧
+    """
+    frames_dir = os.path.join(frames_root, date_str)
+    os.makedirs(frames_dir, exist_ok=True)
+    paths = []
+    for index, (width, height) in enumerate(sizes):
+        path = os.path.join(frames_dir, f"frame_{date_str.replace('-', '')}_1200{index:02d}.png")
+        Image.fromarray(np.full((height, width, 3), 40 * (index % 5) + 20, np.uint8)).save(path)
+        paths.append(path)
+    return paths
+
+
+def frame_count(path):
+    cap = cv2.VideoCapture(path)
+    count = 0
+    while cap.read()[0]:
+        count += 1
+    cap.release()
+    return count
+
+
+def test_concat_reencodes_segments_of_different_resolutions(tmp_path):
+    small = write_day(str(tmp_path / "a"), "2024-01-01", [(160, 90)] * 3)
+    large = write_day(str(tmp_path / "b"), "2024-01-01", [(320, 180)] * 2)
+    segments = [str(tmp_path / "small.mp4"), str(tmp_path / "large.mp4")]
+    encode_frame_files(small, segments[0], 5)
+    encode_frame_files(large, segments[1], 5)
+    output = str(tmp_path / "joined.mp4")
+
+    concat_segments(segments, output)
+
+    assert video_size(output) == (160, 90)
+    assert frame_count(output) == 5
+
+
+def test_concat_copies_segments_of_the_same_resolution(tmp_path):
+    paths = write_day(str(tmp_path), "2024-01-01", [(160, 90)] * 4)
+    segments = [str(tmp_path / "one.mp4"), str(tmp_path / "two.mp4")]
+    encode_frame_files(paths[:2], segments[0], 5)
+    encode_frame_files(paths[2:], segments[1], 5)
+    output = str(tmp_path / "joined.mp4")
+
+    concat_segments(segments, output, sizes=[(160, 90), (160, 90)])
+
+    assert video_size(output) == (160, 90)
+    assert frame_count(output) == 4
+
+
+def test_incremental_segments_share_the_first_frame_resolution(tmp_path):
+    frames_root = str(tmp_path / "frames")
+    write_day(frames_root, "2024-01-01", [(160, 90)] * 3 + [(320, 180)] * 4)
+    compiler = IncrementalCompiler(frames_root=frames_root, cache_root=str(tmp_path / "cache"), chunk_frames=3)
+    output = str(tmp_path / "day.mp4")
+
+    assert compiler.compile("2024-01-01", output, 5)
+
+    with open(tmp_path / "cache" / "2024-01-01" / "cache.json") as f:
+        segments = json.load(f)["segments"]
+    assert [segment["size"] for segment in segments] == [[160, 90]] * 3
+    assert video_size(output) == (160, 90)
+    assert frame_count(output) == 7
+
+
+def test_single_range_video_joins_days_of_different_resolutions(tmp_path):
+    frames_root = str(tmp_path / "frames")
+    write_day(frames_root, "2024-01-01", [(160, 90)] * 2)
+    write_day(frames_root, "2024-01-02", [(320, 180)] * 3)
+    compiler = BatchCompiler(frames_root=frames_root, cache_root=str(tmp_path / "cache"),
+                             output_dir=str(tmp_path / "output"), workers=1)
+
+    outputs = compiler.compile_range("2024-01-01", "2024-01-02", 5, single=True)
+
+    assert outputs == [str(tmp_path / "output" / "timelapse_2024-01-01_2024-01-02.mp4")]
+    assert video_size(outputs[0]) == (160, 90)
+    assert frame_count(outputs[0]) == 5
+
+
+def test_catalog_frames_reuse_segments_cached_from_the_manifest(tmp_path):
+    from frame_catalog import FrameCatalog
+
+    frames_root = str(tmp_path / "frames")
+    write_day(frames_root, "2024-01-01", [(160, 90)] * 4)
+    compiler = IncrementalCompiler(frames_root=frames_root, cache_root=str(tmp_path / "cache"), chunk_frames=2)
+    compiler.compile("2024-01-01", str(tmp_path / "first.mp4"), 5)
+    cache_path = tmp_path / "cache" / "2024-01-01" / "cache.json"
+    segments = json.loads(cache_path.read_text())["segments"]
+    catalog = FrameCatalog(str(tmp_path / "catalog.db"))
+    frames = catalog.frames("2024-01-01 00:00:00", "2024-01-01 23:59:59", frames_root=frames_root)
+    catalog.close()
+    encoded = []
+
+    assert compiler.compile("2024-01-01", str(tmp_path / "second.mp4"), 5,
+                            on_progress=lambda done, total: encoded.append(done), frames=frames)
+
+    # 帧索引与清单的校验和一致，所有分段直接复用
+    assert encoded == [4]
+    assert json.loads(cache_path.read_text())["segments"] == segments
+    assert frame_count(str(tmp_path / "second.mp4")) == 4
+
+
+def test_batch_reports_frame_progress_across_days(tmp_path):
+    frames_root = str(tmp_path / "frames")
+    write_day(frames_root, "2024-01-01", [(160, 90)] * 2)
+    write_day(frames_root, "2024-01-02", [(160, 90)] * 3)
+    compiler = BatchCompiler(frames_root=frames_root, cache_root=str(tmp_path / "cache"),
+                             output_dir=str(tmp_path / "output"), workers=1)
+    frames = []
+
+    outputs = compiler.compile_range("2024-01-01", "2024-01-02", 5,
+                                     on_frames=lambda done, total: frames.append((done, total)))
+
+    assert len(outputs) == 2
+    assert frames[-1] == (5, 5)
+    assert all(total == 5 for _, total in frames)
+
+
+def test_batch_cancel_stops_running_days_and_skips_the_join(tmp_path):
+    frames_root = str(tmp_path / "frames")
+    write_day(frames_root, "2024-01-01", [(160, 90)] * 3)
+    write_day(frames_root, "2024-01-02", [(160, 90)] * 3)
+    compiler = BatchCompiler(frames_root=frames_root, cache_root=str(tmp_path / "cache"),
+                             output_dir=str(tmp_path / "output"), workers=1)
+    statuses = {}
+
+    def on_progress(date_str, status, completed, total):
+        statuses[date_str] = status
+
+    outputs = compiler.compile_range("2024-01-01", "2024-01-02", 5, single=True, on_progress=on_progress,
+                                     should_cancel=lambda: True)
+
+    assert outputs == []
+    assert statuses == {"2024-01-01": "cancelled", "2024-01-02": "cancelled"}
+    assert not os.path.exists(tmp_path / "output" / "timelapse_2024-01-01_2024-01-02.mp4")
@@ -0,0 +1,84 @@
+import cv2
+import numpy as np
+import pytest
+from PIL import Image
+
+from video_encoder import EncodeCancelled, encode_frame_files
+
+BACKENDS = {
+    "moviepy": None,
+    "ffmpeg": {"backend": "ffmpeg", "preset": "ultrafast", "crf": 23, "threads": 0, "pix_fmt": "yuv420p"},
+}
+
+
+def write_frames(frames_dir, sizes_and_values):
+    """
+    按顺序写入纯色 PNG 帧
+    Returns:
+        list: 帧文件路径
+    """
+    frames_dir.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for index, ((width, height), value) in enumerate(sizes_and_values):
+        path = frames_dir / f"frame_20240101_1200{index:02d}.png"
+        Image.fromarray(np.full((height, width, 3), value, np.uint8)).save(path)
+        paths.append(str(path))
+    return paths
+
+
+def read_video(path):
+    """
+    Returns:
+        list: 解码后的 BGR 帧
+    """
+    cap = cv2.VideoCapture(path)
+    frames = []
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_mixed_frame_sizes_are_fitted_to_the_first_frame(tmp_path, backend):
+    # 当天中途更换分辨率：3 帧 160x90，3 帧 320x180
+    paths = write_frames(tmp_path / "frames", [((160, 90), 60)] * 3 + [((320, 180), 200)] * 3)
+    output = str(tmp_path / "out.mp4")
+
+    size = encode_frame_files(paths, output, 5, options=BACKENDS[backend])
+
+    frames = read_video(output)
+    assert size == (160, 90)
+    assert len(frames) == 6
+    assert all(frame.shape == (90, 160, 3) for frame in frames)
+    assert abs(frames[0].mean() - 60) < 8
+    assert abs(frames[-1].mean() - 200) < 8
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_explicit_size_letterboxes_other_aspect_ratios(tmp_path, backend):
+    paths = write_frames(tmp_path / "frames", [((160, 160), 200)] * 2)
+    output = str(tmp_path / "out.mp4")
+
+    encode_frame_files(paths, output, 5, options=BACKENDS[backend], size=(320, 180))
+
+    frame = read_video(output)[0]
+    assert frame.shape == (180, 320, 3)
+    # 正方形帧居中，两侧为黑边
+    assert frame[:, :60].mean() < 10
+    assert abs(frame[:, 100:220].mean() - 200) < 8
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_cancel_stops_encoding(tmp_path, backend):
+    paths = write_frames(tmp_path / "frames", [((160, 90), 100)] * 10)
+    done = []
+
+    with pytest.raises(EncodeCancelled):
+        encode_frame_files(paths, str(tmp_path / "out.mp4"), 5, on_progress=done.append,
+                           should_cancel=lambda: len(done) >= 3, options=BACKENDS[backend], memory_mb=16)
+
+    assert done == [1, 2, 3]
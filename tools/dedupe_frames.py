@@ -0,0 +1,216 @@
+"""
+帧去重工具：为 frames/<date>/ 中的帧计算感知哈希（dHash），找出长时间静止画面中的重复帧。
+
+哈希并行计算并缓存在每个日期目录的 phash.json 中（按文件大小和修改时间判断是否需要重算），
+再按采集顺序与上一张保留帧比较汉明距离，生成去重后的帧列表。
+
+    python tools/dedupe_frames.py [--date YYYY-MM-DD | --all] [--threshold 4] [--max-gap 300]
+                                  [--action list|link|delete] [--dest frames_dedup] [--yes]
+
+    list   写出 frames/<date>/dedup.txt（保留的帧文件名，每行一个）
+    link   把保留的帧硬链接到 <dest>/<date>/，可用 python cli.py compile --frames-root <dest> 编译较短的视频
+    delete 删除重复帧（默认只打印计划，需 --yes 才执行）
+
+删除的帧从帧索引（frame_catalog_path）中移除；link 改写的 <dest>/<date>/ 在下次查询时重新补录。
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app_config import load_config  # noqa: E402
+from frame_catalog import open_existing_catalog  # noqa: E402
+from frame_manifest import frame_timestamp  # noqa: E402
+from frame_store import list_frame_files, load_frame  # noqa: E402
+
+HASH_INDEX_NAME = "phash.json"
+DEDUP_LIST_NAME = "dedup.txt"
+
+
+def dhash(path, hash_size=8):
+    """
+    计算差值哈希：缩小为 (hash_size+1) x hash_size 灰度图，比较相邻像素
+    Args:
+        path (str): 帧文件路径
+    Returns:
+        str: 16 进制哈希
+    """
+    if path.endswith(".npy"):
+        image = Image.fromarray(load_frame(path))
+    else:
+        image = Image.open(path)
+        image.draft("L", (hash_size * 16, hash_size * 16))  # JPEG 解码时直接降采样
+    small = image.convert("L").resize((hash_size + 1, hash_size), Image.BILINEAR, reducing_gap=2.0)
+    pixels = np.asarray(small, dtype=np.int16)
+    bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+    return np.packbits(bits).tobytes().hex()
+
+
+def _hash_file(path):
+    try:
+        return path, dhash(path)
+    except Exception as e:
+        return path, f"error: {e}"
+
+
+def hamming(hash_a, hash_b):
+    return bin(int(hash_a, 16) ^ int(hash_b, 16)).count("1")
+
+
+def load_hash_index(frames_dir):
+    index_path = os.path.join(frames_dir, HASH_INDEX_NAME)
+    if os.path.exists(index_path):
+        with open(index_path, "r") as f:
+            return json.load(f)
+    return {}
+
+
+def save_hash_index(frames_dir, index):
+    index_path = os.path.join(frames_dir, HASH_INDEX_NAME)
+    tmp_path = index_path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(index, f)
+    os.replace(tmp_path, index_path)
+
+
+def update_hashes(frames_dir, pool, chunksize=64):
+    """
+    计算目录中新增或已变化帧的哈希并更新持久化索引
+    Returns:
+        tuple: (frame_files, index, computed) index 为 {file: {size, mtime, hash}}
+    """
+    frame_files = list_frame_files(frames_dir)
+    index = load_hash_index(frames_dir)
+    names = set()
+    pending = []
+    for path in frame_files:
+        name = os.path.basename(path)
+        names.add(name)
+        stat = os.stat(path)
+        entry = index.get(name)
+        if entry is None or entry["size"] != stat.st_size or entry["mtime"] != stat.st_mtime:
+            index[name] = {"size": stat.st_size, "mtime": stat.st_mtime, "hash": None}
+            pending.append(path)
+    for name in list(index):
+        if name not in names:
+            del index[name]
+    for path, frame_hash in pool.map(_hash_file, pending, chunksize=chunksize):
+        if frame_hash.startswith("error:"):
+            print(f"Could not hash {path}: {frame_hash[len('error: '):]}")
+            del index[os.path.basename(path)]
+        else:
+            index[os.path.basename(path)]["hash"] = frame_hash
+    if pending:
+        save_hash_index(frames_dir, index)
+    return frame_files, index, len(pending)
+
+
+def dedupe(frame_files, index, threshold=4, max_gap=300):
+    """
+    按采集顺序去重：与上一张保留帧的汉明距离不超过 threshold 的帧视为重复，
+    但距上一张保留帧超过 max_gap 秒时仍保留一帧，使视频保持时间连续
+    Returns:
+        tuple: (kept, duplicates) 两个帧路径列表
+    """
+    kept, duplicates = [], []
+    last_hash, last_time = None, None
+    for path in frame_files:
+        entry = index.get(os.path.basename(path))
+        if entry is None:
+            continue
+        captured_at = frame_timestamp(path)
+        gap_exceeded = (max_gap > 0 and captured_at is not None and last_time is not None
+                        and (captured_at - last_time).total_seconds() >= max_gap)
+        if last_hash is None or gap_exceeded or hamming(entry["hash"], last_hash) > threshold:
+            kept.append(path)
+            last_hash, last_time = entry["hash"], captured_at
+        else:
+            duplicates.append(path)
+    return kept, duplicates
+
+
+def apply_action(args, date_str, frames_dir, kept, duplicates, catalog=None):
+    if args.action == "list":
+        with open(os.path.join(frames_dir, DEDUP_LIST_NAME), "w") as f:
+            f.writelines(os.path.basename(path) + "\n" for path in kept)
+    elif args.action == "link":
+        dest_dir = os.path.join(args.dest, date_str)
+        os.makedirs(dest_dir, exist_ok=True)
+        kept_names = {os.path.basename(path) for path in kept}
+        # 移除上次运行留下、现在已判定为重复的链接
+        for path in list_frame_files(dest_dir):
+            if os.path.basename(path) not in kept_names:
+                os.remove(path)
+        for path in kept:
+            link_path = os.path.join(dest_dir, os.path.basename(path))
+            if not os.path.exists(link_path):
+                os.link(path, link_path)
+        if catalog:
+            catalog.invalidate(args.dest, [date_str])
+    elif args.action == "delete":
+        for path in duplicates:
+            if args.yes:
+                os.remove(path)
+            else:
+                print(f"Would delete {path}")
+        if args.yes and catalog:
+            catalog.remove(duplicates)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Find and remove duplicate frames using perceptual hashes")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--date", help="date folder to process (default: today)")
+    group.add_argument("--all", action="store_true", help="process every date folder")
+    parser.add_argument("--frames-root", default="frames", help="frame root directory")
+    parser.add_argument("--threshold", type=int, default=4, help="max Hamming distance (0-64) treated as a duplicate")
+    parser.add_argument("--max-gap", type=float, default=300,
+                        help="keep at least one frame every N seconds of a static scene (0 disables)")
+    parser.add_argument("--action", choices=("list", "link", "delete"), default="list")
+    parser.add_argument("--dest", default="frames_dedup", help="target root for --action link")
+    parser.add_argument("--yes", action="store_true", help="actually delete with --action delete")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="hashing processes")
+    args = parser.parse_args(argv)
+
+    if args.all:
+        dates = sorted(d for d in os.listdir(args.frames_root) if os.path.isdir(os.path.join(args.frames_root, d)))
+    else:
+        dates = [args.date or time.strftime("%Y-%m-%d")]
+
+    started = time.perf_counter()
+    total_frames = total_kept = total_hashed = 0
+    catalog = open_existing_catalog(load_config()) if args.action != "list" else None
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        for date_str in dates:
+            frames_dir = os.path.join(args.frames_root, date_str)
+            if not os.path.isdir(frames_dir):
+                print(f"No frames found for {date_str}")
+                continue
+            frame_files, index, computed = update_hashes(frames_dir, pool)
+            kept, duplicates = dedupe(frame_files, index, args.threshold, args.max_gap)
+            apply_action(args, date_str, frames_dir, kept, duplicates, catalog)
+            total_frames += len(frame_files)
+            total_kept += len(kept)
+            total_hashed += computed
+            print(f"{date_str}: {len(kept)}/{len(frame_files)} frames kept, "
+                  f"{len(duplicates)} duplicates ({computed} hashed)")
+
+    if catalog:
+        catalog.close()
+    elapsed = time.perf_counter() - started
+    if total_frames:
+        print(f"Total: {total_kept}/{total_frames} frames kept "
+              f"({100 * (1 - total_kept / total_frames):.1f}% shorter video), "
+              f"{total_hashed} hashed in {elapsed:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,250 @@
+"""
+帧维护工具：遍历 frames/<date>/ 下的所有帧，在进程池中分块并行地校验、修复、缩放和重新压缩。
+（取代原来的 tools/resize.py 和 tools/image_verify.py）
+
+已处理过的文件按 (大小, 修改时间, 操作) 记录在 <frames_root>/maintenance_cache.json 中，
+再次运行时直接跳过，适合每晚定时执行。被改写或删除的帧同步更新到帧索引（frame_catalog_path）。
+
+    python tools/maintenance.py [--date YYYY-MM-DD ...] [--repair] [--delete-corrupt]
+                                [--resize [WxH]] [--recompress] [--workers N] [--chunksize 64]
+
+    --repair          尝试读取截断的图像并重新保存
+    --delete-corrupt  删除无法修复的损坏帧（默认只报告）
+    --resize          把尺寸不符的帧缩放到目标分辨率（默认 1920x1080）
+    --recompress      按 config.json 中的 frame_format / png_compress_level / frame_quality 重新编码
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from collections import Counter
+from multiprocessing import Pool
+
+import numpy as np
+from PIL import Image, ImageFile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app_config import load_config  # noqa: E402
+from frame_catalog import open_existing_catalog  # noqa: E402
+from frame_manifest import file_checksum  # noqa: E402
+from frame_store import FRAME_FORMATS, list_frame_files, save_frame  # noqa: E402
+
+CACHE_NAME = "maintenance_cache.json"
+
+# 文件扩展名 -> frame_format
+EXTENSION_FORMATS = {".png": "png", ".jpg": "jpeg", ".jpeg": "jpeg", ".webp": "webp", ".npy": "npy"}
+
+
+def _open_image(path, allow_truncated=False):
+    """
+    完整解码一帧（verify 只检查结构，load 才能发现截断的数据）
+    Returns:
+        PIL.Image: 已加载的图像
+    """
+    if path.lower().endswith(".npy"):
+        array = np.load(path)
+        if array.ndim != 3 or array.dtype != np.uint8:
+            raise ValueError(f"unexpected array {array.shape} {array.dtype}")
+        return Image.fromarray(array)
+    ImageFile.LOAD_TRUNCATED_IMAGES = allow_truncated
+    try:
+        if not allow_truncated:
+            with Image.open(path) as img:
+                img.verify()
+        # 自行打开文件：load 出错时也能关闭文件，成功时解码后的数据保留在图像中
+        with open(path, "rb") as f:
+            img = Image.open(f)
+            img.load()
+        return img
+    finally:
+        ImageFile.LOAD_TRUNCATED_IMAGES = False
+
+
+def process_frame(task):
+    """
+    处理单个帧文件（在工作进程中执行）
+    Args:
+        task (tuple): (path, options)
+    Returns:
+        dict: {path, status, output, bytes}，帧被改写时还有新文件的 checksum
+    """
+    path, options = task
+    result = {"path": path, "status": "ok", "output": path, "bytes": os.path.getsize(path)}
+    try:
+        try:
+            image = _open_image(path)
+            changed = False
+        except Exception:
+            if not options["repair"]:
+                raise
+            image = _open_image(path, allow_truncated=True)
+            result["status"] = "repaired"
+            changed = True
+
+        target_size = options["resize"]
+        if target_size and image.size != target_size:
+            image = image.resize(target_size, Image.LANCZOS)
+            result["status"] = "resized"
+            changed = True
+
+        config = dict(options["config"])
+        extension = os.path.splitext(path)[1].lower()
+        output = path
+        if options["recompress"]:
+            output = os.path.splitext(path)[0] + FRAME_FORMATS[config["frame_format"]][0]
+            result["status"] = "recompressed" if result["status"] == "ok" else result["status"]
+            changed = True
+        else:
+            config["frame_format"] = EXTENSION_FORMATS[extension]
+
+        if changed:
+            save_frame(np.asarray(image.convert("RGB")), output, config)
+            if output != path:
+                os.remove(path)
+            result["output"] = output
+            result["checksum"] = file_checksum(output)
+    except Exception as e:
+        result["status"] = "corrupt"
+        result["error"] = str(e)
+        if options["delete_corrupt"]:
+            os.remove(path)
+            result["status"] = "deleted"
+    return result
+
+
+def load_cache(frames_root):
+    cache_path = os.path.join(frames_root, CACHE_NAME)
+    if os.path.exists(cache_path):
+        with open(cache_path, "r") as f:
+            return json.load(f)
+    return {}
+
+
+def save_cache(frames_root, cache):
+    cache_path = os.path.join(frames_root, CACHE_NAME)
+    tmp_path = cache_path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(cache, f)
+    os.replace(tmp_path, cache_path)
+
+
+def options_key(options):
+    """
+    缓存键：只有相同操作处理过的文件才会被跳过
+    """
+    parts = ["verify"]
+    if options["resize"]:
+        parts.append("resize={}x{}".format(*options["resize"]))
+    if options["recompress"]:
+        config = options["config"]
+        parts.append(f"recompress={config['frame_format']}:{config['png_compress_level']}:{config['frame_quality']}")
+    return ",".join(parts)
+
+
+def collect_frames(frames_root, dates):
+    frame_files = []
+    for date_str in dates:
+        frames_dir = os.path.join(frames_root, date_str)
+        if os.path.isdir(frames_dir):
+            frame_files.extend(list_frame_files(frames_dir))
+        else:
+            print(f"No frames found for {date_str}")
+    return frame_files
+
+
+def parse_size(value):
+    width, height = value.lower().split("x")
+    return int(width), int(height)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Verify, repair, resize and recompress captured frames")
+    parser.add_argument("--frames-root", default="frames", help="frame root directory")
+    parser.add_argument("--date", action="append", help="date folder to process (repeatable, default: all)")
+    parser.add_argument("--repair", action="store_true", help="re-save truncated images that can still be decoded")
+    parser.add_argument("--delete-corrupt", action="store_true", help="delete frames that cannot be decoded")
+    parser.add_argument("--resize", nargs="?", const="1920x1080", type=str, help="resize frames to WxH")
+    parser.add_argument("--recompress", action="store_true", help="re-encode frames with the configured format")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes")
+    parser.add_argument("--chunksize", type=int, default=64, help="frames handed to a worker at a time")
+    parser.add_argument("--no-cache", action="store_true", help="process every frame, ignoring the cache")
+    args = parser.parse_args(argv)
+
+    options = {
+        "repair": args.repair,
+        "delete_corrupt": args.delete_corrupt,
+        "resize": parse_size(args.resize) if args.resize else None,
+        "recompress": args.recompress,
+        "config": load_config(),
+    }
+    key = options_key(options)
+    dates = args.date or sorted(
+        d for d in os.listdir(args.frames_root) if os.path.isdir(os.path.join(args.frames_root, d))
+    )
+
+    started = time.perf_counter()
+    cache = {} if args.no_cache else load_cache(args.frames_root)
+    pending = []
+    skipped = 0
+    present = set()
+    for path in collect_frames(args.frames_root, dates):
+        stat = os.stat(path)
+        relpath = os.path.relpath(path, args.frames_root)
+        present.add(relpath)
+        if cache.get(relpath) == [stat.st_size, stat.st_mtime, key]:
+            skipped += 1
+        else:
+            pending.append(path)
+    print(f"{len(pending)} frames to process, {skipped} unchanged since the last run")
+
+    catalog = open_existing_catalog(options["config"])
+    counts = Counter()
+    processed_bytes = 0
+    progress_step = max(1, len(pending) // 20)
+    # 分块分发以减少进程间通信；文件较少时缩小分块，保证每个进程都有活干
+    chunksize = max(1, min(args.chunksize, len(pending) // (args.workers * 4)))
+    with Pool(args.workers) as pool:
+        tasks = ((path, options) for path in pending)
+        for done, result in enumerate(pool.imap_unordered(process_frame, tasks, chunksize=chunksize), 1):
+            counts[result["status"]] += 1
+            processed_bytes += result["bytes"]
+            relpath = os.path.relpath(result["path"], args.frames_root)
+            cache.pop(relpath, None)
+            if result["status"] in ("corrupt", "deleted"):
+                print(f"{result['status'].capitalize()}: {result['path']} ({result['error']})")
+                if result["status"] == "deleted":
+                    present.discard(relpath)
+                    if catalog:
+                        catalog.remove([result["path"]])
+            else:
+                if catalog and "checksum" in result:
+                    catalog.update(result["path"], result["output"], result["checksum"])
+                stat = os.stat(result["output"])
+                output_relpath = os.path.relpath(result["output"], args.frames_root)
+                cache[output_relpath] = [stat.st_size, stat.st_mtime, key]
+                if output_relpath != relpath:
+                    present.discard(relpath)
+                    present.add(output_relpath)
+            if done % progress_step == 0:
+                elapsed = time.perf_counter() - started
+                print(f"{done}/{len(pending)} frames ({done / elapsed:.0f} frames/s)")
+
+    # 清理本次处理的日期中已不存在的文件
+    processed_dates = set(dates)
+    cache = {relpath: entry for relpath, entry in cache.items()
+             if relpath in present or os.path.dirname(relpath) not in processed_dates}
+    save_cache(args.frames_root, cache)
+    if catalog:
+        catalog.close()
+
+    elapsed = time.perf_counter() - started
+    summary = ", ".join(f"{count} {status}" for status, count in sorted(counts.items()))
+    print(f"Processed {len(pending)} frames in {elapsed:.1f}s "
+          f"({len(pending) / elapsed:.0f} frames/s, {processed_bytes / elapsed / 1e6:.1f} MB/s): {summary or 'nothing to do'}")
+    return 1 if counts["corrupt"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
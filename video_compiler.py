@@ -0,0 +1,171 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+
+from frame_manifest import FrameManifest
+from video_encoder import EncodeCancelled, encode_frame_files, concat_segments
+
+
+def entries_digest(entries):
+    """
+    计算一组清单条目的摘要，用于判断缓存分段是否仍然有效
+    """
+    sha1 = hashlib.sha1()
+    for entry in entries:
+        sha1.update(f"{entry['file']}:{entry['checksum']}\n".encode("utf-8"))
+    return sha1.hexdigest()
+
+
+class IncrementalCompiler:
+    """
+    增量、可恢复的按日视频编译器。
+    已编码的帧区间作为分段缓存在 <cache_root>/<date>/ 中，每完成一个分段立即登记，
+    再次编译时只编码新增帧并与已有分段无损拼接；中断后从最后一个完成的分段继续。
+    """
+
+    CACHE_INDEX_NAME = "cache.json"
+
+    def __init__(self, frames_root="frames", cache_root=os.path.join("output", "cache"), chunk_frames=500,
+                 encoder_options=None, memory_mb=0):
+        """
+        Args:
+            frames_root (str): 帧根目录
+            cache_root (str): 分段缓存根目录
+            chunk_frames (int): 每个缓存分段的最大帧数（也是中断后最多需要重做的帧数）
+            encoder_options (dict): 编码器设置（video_encoder.encoder_options），None 时使用 moviepy 默认参数
+            memory_mb (int): 编码时预读解码帧的内存上限（MB），0 表示逐帧解码
+        """
+        self.frames_root = frames_root
+        self.cache_root = cache_root
+        self.chunk_frames = chunk_frames
+        self.encoder_options = encoder_options
+        self.memory_mb = memory_mb
+
+    def _cache_dir(self, date_str):
+        return os.path.join(self.cache_root, date_str)
+
+    def load_cache(self, date_str, fps):
+        """
+        加载分段缓存索引，帧率或编码器设置变化时缓存作废（不同参数的分段无法无损拼接）
+        Returns:
+            dict: {fps, encoder, segments: [{file, start, end, digest, size}]}
+        """
+        index_path = os.path.join(self._cache_dir(date_str), self.CACHE_INDEX_NAME)
+        if os.path.exists(index_path):
+            with open(index_path, "r") as f:
+                cache = json.load(f)
+            if cache.get("fps") == fps and cache.get("encoder") == self.encoder_options:
+                return cache
+            logging.info(f"FPS or encoder settings changed for {date_str}, discarding cached segments")
+            shutil.rmtree(self._cache_dir(date_str), ignore_errors=True)
+        return {"fps": fps, "encoder": self.encoder_options, "segments": []}
+
+    def save_cache(self, date_str, cache):
+        cache_dir = self._cache_dir(date_str)
+        os.makedirs(cache_dir, exist_ok=True)
+        index_path = os.path.join(cache_dir, self.CACHE_INDEX_NAME)
+        tmp_path = index_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(cache, f, indent=4)
+        os.replace(tmp_path, index_path)
+
+    def _valid_segments(self, date_str, cache, entries):
+        """
+        返回仍与清单一致的前缀分段；某个分段失效后，其后的分段全部丢弃
+        """
+        cache_dir = self._cache_dir(date_str)
+        valid = []
+        for segment in cache["segments"]:
+            segment_path = os.path.join(cache_dir, segment["file"])
+            if (segment["end"] > len(entries) or not os.path.exists(segment_path)
+                    or entries_digest(entries[segment["start"]:segment["end"]]) != segment["digest"]):
+                break
+            valid.append(segment)
+        for segment in cache["segments"][len(valid):]:
+            stale_path = os.path.join(cache_dir, segment["file"])
+            if os.path.exists(stale_path):
+                os.remove(stale_path)
+        return valid
+
+    def compile(self, date_str, output_filename, fps, on_progress=None, should_cancel=None, frames=None):
+        """
+        增量编译指定日期的视频
+        Args:
+            date_str (str): 日期 'YYYY-MM-DD'
+            output_filename (str): 输出视频路径
+            fps (int): 帧率
+            on_progress (callable): on_progress(frames_done, frames_total)，缓存的帧计入已完成
+            should_cancel (callable): 返回 True 时中止编码并抛出 EncodeCancelled，
+                已完成的分段保留在缓存中，下次从中断处继续
+            frames (list): 帧索引中当天的帧（FrameCatalog.frames()），指定时不扫描帧文件夹和清单
+        Returns:
+            bool: 是否生成了视频（没有帧时返回 False）
+        """
+        if frames is not None:
+            # 帧索引中的校验和与清单中的含义相同，已有的缓存分段仍然有效
+            entries = [{"file": os.path.basename(frame["path"]), "checksum": frame["checksum"]} for frame in frames]
+            frame_paths = [frame["path"] for frame in frames]
+        else:
+            frames_dir = os.path.join(self.frames_root, date_str)
+            if not os.path.isdir(frames_dir):
+                return False
+            manifest = FrameManifest(frames_dir)
+            entries = manifest.refresh()
+            frame_paths = manifest.frame_paths()
+        if not entries:
+            return False
+
+        cache = self.load_cache(date_str, fps)
+        cache["segments"] = self._valid_segments(date_str, cache, entries)
+        covered = cache["segments"][-1]["end"] if cache["segments"] else 0
+        if covered:
+            logging.info(f"Reusing {covered} cached frames for {date_str}")
+
+        total = len(entries)
+        if on_progress:
+            on_progress(covered, total)
+
+        cache_dir = self._cache_dir(date_str)
+        os.makedirs(cache_dir, exist_ok=True)
+        # 新分段按已有分段的分辨率编码，当天中途改变分辨率的帧被缩放，分段之间可以无损拼接
+        # （较早版本的缓存没有记录分辨率，拼接时从文件读取）
+        size = cache["segments"][0].get("size") if cache["segments"] else None
+        for start in range(covered, len(entries), self.chunk_frames):
+            if should_cancel and should_cancel():
+                raise EncodeCancelled()
+            end = min(start + self.chunk_frames, len(entries))
+            segment_name = f"part_{start:06d}_{end:06d}.mp4"
+            tmp_path = os.path.join(cache_dir, "encoding_" + segment_name)
+
+            def chunk_progress(done, offset=start):
+                if on_progress:
+                    on_progress(offset + done, total)
+
+            try:
+                size = encode_frame_files(frame_paths[start:end], tmp_path, fps, chunk_progress, should_cancel,
+                                          self.encoder_options, self.memory_mb, size)
+            except BaseException:
+                # 删除编码了一半的分段
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+            os.replace(tmp_path, os.path.join(cache_dir, segment_name))
+            cache["segments"].append({
+                "file": segment_name,
+                "start": start,
+                "end": end,
+                "digest": entries_digest(entries[start:end]),
+                "size": list(size)
+            })
+            # 每完成一个分段立即登记，中断后可从这里继续
+            self.save_cache(date_str, cache)
+
+        segment_files = [os.path.join(cache_dir, segment["file"]) for segment in cache["segments"]]
+        if len(segment_files) == 1:
+            shutil.copyfile(segment_files[0], output_filename)
+        else:
+            concat_segments(segment_files, output_filename, [segment.get("size") for segment in cache["segments"]],
+                            self.encoder_options)
+        return True
@@ -0,0 +1,485 @@
+import itertools
+import json
+import logging
+import os
+import subprocess
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from frame_store import load_frame
+
+
+def get_ffmpeg_exe():
+    """
+    获取 ffmpeg 可执行文件路径（优先使用 moviepy 依赖的 imageio-ffmpeg 自带版本）
+    Returns:
+        str: ffmpeg 路径
+    """
+    try:
+        import imageio_ffmpeg
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except Exception:
+        return "ffmpeg"
+
+
+PREFETCH_WORKERS = min(4, os.cpu_count() or 1)  # 预读解码线程数
+MAX_PREFETCH_FRAMES = 64  # 预读窗口上限（再大也不会更快）
+
+
+def prefetch_window(frame_bytes, memory_mb):
+    """
+    按内存上限计算预读窗口：已解码待编码的帧、正在写入的帧和写入管道中的副本合计不超过 memory_mb
+    Args:
+        frame_bytes (int): 一帧解码后的字节数
+        memory_mb (int): 内存上限（MB），0 表示不预读（逐帧解码）
+    Returns:
+        int: 预读窗口大小（帧数，至少为 1）
+    """
+    if memory_mb <= 0:
+        return 1
+    return max(1, min(MAX_PREFETCH_FRAMES, memory_mb * 1024 * 1024 // frame_bytes - 2))
+
+
+class FramePrefetcher:
+    """
+    按顺序预读帧：在线程池中提前解码后续帧（图像解码和磁盘读取大多会释放 GIL），
+    同时存在的已解码帧不超过 window + 1 个，内存占用与当天的帧数无关
+    """
+
+    def __init__(self, frame_files, window, workers=PREFETCH_WORKERS):
+        """
+        Args:
+            frame_files (list): 帧文件路径列表（按编码顺序）
+            window (int): 最多提前解码的帧数
+            workers (int): 解码线程数
+        """
+        self.frame_files = frame_files
+        self.window = max(1, window)
+        self.executor = ThreadPoolExecutor(max_workers=max(1, min(workers, self.window)),
+                                           thread_name_prefix="frame-prefetch")
+
+    def __iter__(self):
+        files = iter(self.frame_files)
+        pending = deque(self.executor.submit(load_frame, path) for path in itertools.islice(files, self.window))
+        while pending:
+            frame = pending.popleft().result()
+            path = next(files, None)
+            if path is not None:
+                pending.append(self.executor.submit(load_frame, path))
+            yield frame
+
+    def close(self):
+        """
+        取消尚未开始的解码并等待线程结束
+        """
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+
+class EncodeCancelled(Exception):
+    """
+    编码被用户取消
+    """
+
+
+def encoder_options(config):
+    """
+    从应用配置中提取编码器设置
+    Args:
+        config (dict): 应用配置
+    Returns:
+        dict | None: {backend, preset, crf, threads, pix_fmt}；moviepy 后端返回 None（使用其默认参数）
+    """
+    if config["encoder_backend"] != "ffmpeg":
+        return None
+    return {
+        "backend": config["encoder_backend"],
+        "preset": config["ffmpeg_preset"],
+        "crf": config["ffmpeg_crf"],
+        "threads": config["ffmpeg_threads"],
+        "pix_fmt": config["ffmpeg_pix_fmt"],
+    }
+
+
+class FFmpegPipeWriter:
+    """
+    通过管道把原始 RGB 帧直接送入 ffmpeg（libx264），可配置 preset / CRF / 线程数 / 像素格式
+    """
+
+    def __init__(self, output_filename, size, fps, preset="medium", crf=23, threads=0, pix_fmt="yuv420p"):
+        """
+        Args:
+            output_filename (str): 输出视频路径
+            size (tuple): (width, height)
+            fps (int): 帧率
+            preset (str): x264 速度预设（ultrafast ... veryslow）
+            crf (int): 质量（0-51，越小质量越高）
+            threads (int): 编码线程数，0 表示由 ffmpeg 自动决定
+            pix_fmt (str): 输出像素格式
+        """
+        width, height = size
+        command = [
+            get_ffmpeg_exe(), "-y", "-loglevel", "error",
+            "-f", "rawvideo", "-vcodec", "rawvideo", "-pix_fmt", "rgb24",
+            "-s", f"{width}x{height}", "-r", str(fps), "-i", "-",
+            "-an", "-c:v", "libx264", "-preset", preset, "-crf", str(crf),
+            "-threads", str(threads), "-pix_fmt", pix_fmt,
+        ]
+        if pix_fmt == "yuv420p" and (width % 2 or height % 2):
+            # yuv420p 要求宽高为偶数
+            command += ["-vf", "scale=trunc(iw/2)*2:trunc(ih/2)*2"]
+        command.append(output_filename)
+        self.proc = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL,
+                                     stderr=subprocess.PIPE)
+        self.killed = False
+
+    def write_frame(self, frame):
+        """
+        Args:
+            frame (numpy.ndarray): RGB uint8 帧
+        """
+        try:
+            self.proc.stdin.write(np.ascontiguousarray(frame, dtype=np.uint8).tobytes())
+        except BrokenPipeError:
+            raise RuntimeError(f"ffmpeg encode failed: {self._stderr()}")
+
+    def _stderr(self):
+        return self.proc.stderr.read().decode(errors="ignore").strip()
+
+    def kill(self):
+        self.killed = True
+        self.proc.kill()
+
+    def close(self):
+        try:
+            self.proc.stdin.close()
+        except BrokenPipeError:
+            pass
+        error = self._stderr()
+        if self.proc.wait() != 0 and not self.killed:
+            raise RuntimeError(f"ffmpeg encode failed: {error}")
+
+
+class MoviepyWriter:
+    """
+    moviepy 的 FFMPEG_VideoWriter（默认编码参数）
+    """
+
+    def __init__(self, output_filename, size, fps):
+        from moviepy.video.io.ffmpeg_writer import FFMPEG_VideoWriter
+
+        self.writer = FFMPEG_VideoWriter(output_filename, size, fps, codec='libx264')
+
+    def write_frame(self, frame):
+        self.writer.write_frame(frame)
+
+    def kill(self):
+        self.writer.proc.kill()
+
+    def close(self):
+        self.writer.close()
+
+
+def open_video_writer(output_filename, size, fps, options=None):
+    """
+    按编码器设置创建视频写入器
+    Args:
+        output_filename (str): 输出视频路径
+        size (tuple): (width, height)
+        fps (int): 帧率
+        options (dict): encoder_options() 的结果，None 时使用 moviepy
+    """
+    if options and options["backend"] == "ffmpeg":
+        return FFmpegPipeWriter(output_filename, size, fps, options["preset"], options["crf"],
+                                options["threads"], options["pix_fmt"])
+    return MoviepyWriter(output_filename, size, fps)
+
+
+def fit_frame(frame, size):
+    """
+    把帧缩放到视频尺寸：保持宽高比缩放后居中，其余部分填充黑色
+    Args:
+        frame (numpy.ndarray): RGB uint8 帧
+        size (tuple): (width, height)
+    Returns:
+        numpy.ndarray: size 大小的 RGB 帧
+    """
+    width, height = size
+    frame_height, frame_width = frame.shape[:2]
+    scale = min(width / frame_width, height / frame_height)
+    scaled_width = max(1, min(width, round(frame_width * scale)))
+    scaled_height = max(1, min(height, round(frame_height * scale)))
+    interpolation = cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR
+    scaled = cv2.resize(frame, (scaled_width, scaled_height), interpolation=interpolation)
+    if (scaled_width, scaled_height) == (width, height):
+        return scaled
+    fitted = np.zeros((height, width, 3), dtype=np.uint8)
+    top = (height - scaled_height) // 2
+    left = (width - scaled_width) // 2
+    fitted[top:top + scaled_height, left:left + scaled_width] = scaled
+    return fitted
+
+
+def encode_frame_files(frame_files, output_filename, fps, on_progress=None, should_cancel=None, options=None,
+                       memory_mb=0, size=None):
+    """
+    将帧图片列表流式编码为视频：帧在有界的预读窗口中解码，一遍写入 ffmpeg。
+    尺寸与视频不同的帧（例如当天更换过分辨率）按 fit_frame 缩放，而不是按原始字节写入
+    Args:
+        frame_files (list): 帧文件路径列表（已排序）
+        output_filename (str): 输出视频路径
+        fps (int): 帧率
+        on_progress (callable): on_progress(frames_done)，每写入一帧调用一次
+        should_cancel (callable): 返回 True 时立即结束 ffmpeg 并抛出 EncodeCancelled，
+            输出文件不完整，由调用方删除
+        options (dict): 编码器设置（encoder_options()），None 时使用 moviepy 默认参数
+        memory_mb (int): 已解码帧占用的内存上限（MB），决定预读窗口大小，0 表示逐帧解码
+        size (tuple): 视频尺寸 (width, height)，None 时使用第一帧的尺寸
+    Returns:
+        tuple: 视频尺寸 (width, height)
+    """
+    first_frame = load_frame(frame_files[0])
+    size = tuple(size) if size else (first_frame.shape[1], first_frame.shape[0])
+    window = prefetch_window(size[0] * size[1] * 3, memory_mb)
+    logging.info(f"Encoding {len(frame_files)} frames to {output_filename} (prefetching up to {window} frames)")
+    writer = open_video_writer(output_filename, size, fps, options)
+    prefetcher = FramePrefetcher(frame_files[1:], window)
+    resized = 0
+    try:
+        for index, frame in enumerate(itertools.chain([first_frame], prefetcher)):
+            if should_cancel and should_cancel():
+                raise EncodeCancelled()
+            if (frame.shape[1], frame.shape[0]) != size:
+                frame = fit_frame(frame, size)
+                resized += 1
+            writer.write_frame(frame)
+            if on_progress:
+                on_progress(index + 1)
+    except BaseException:
+        # 不等待 ffmpeg 编码完缓冲中的帧
+        writer.kill()
+        raise
+    finally:
+        prefetcher.close()
+        writer.close()
+    if resized:
+        logging.warning(f"{resized} of {len(frame_files)} frames did not match {size[0]}x{size[1]} "
+                        f"and were resized for {output_filename}")
+    return size
+
+
+def video_size(path):
+    """
+    读取视频文件的分辨率
+    Returns:
+        tuple: (width, height)
+    """
+    cap = cv2.VideoCapture(path)
+    try:
+        if not cap.isOpened():
+            raise RuntimeError(f"Cannot open video {path}")
+        return int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    finally:
+        cap.release()
+
+
+def concat_segments(segment_files, output_filename, sizes=None, options=None):
+    """
+    拼接视频分段：分辨率全部相同时用 ffmpeg concat demuxer 无损拼接（不重新编码），
+    否则重新编码，各分段按比例缩放到第一个分段的分辨率（-c copy 无法拼接不同分辨率的流）
+    Args:
+        segment_files (list): 分段文件路径列表（按播放顺序）
+        output_filename (str): 输出视频路径
+        sizes (list): 各分段已知的分辨率 (width, height)，缺少（None）的从文件读取
+        options (dict): 需要重新编码时使用的编码器设置（encoder_options()），None 时使用 libx264 默认参数
+    """
+    sizes = [tuple(size) if size else video_size(path)
+             for path, size in zip(segment_files, sizes or [None] * len(segment_files))]
+    if len(set(sizes)) > 1:
+        logging.info(f"Segments for {output_filename} have different resolutions {sorted(set(sizes))}, "
+                     f"re-encoding at {sizes[0][0]}x{sizes[0][1]}")
+        _concat_reencode(segment_files, output_filename, sizes[0], options)
+        return
+    list_path = output_filename + ".concat.txt"
+    with open(list_path, "w", encoding="utf-8") as f:
+        for segment in segment_files:
+            escaped = os.path.abspath(segment).replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+    try:
+        result = subprocess.run(
+            [get_ffmpeg_exe(), "-y", "-loglevel", "error", "-f", "concat", "-safe", "0",
+             "-i", list_path, "-c", "copy", output_filename],
+            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+        )
+        if result.returncode != 0:
+            raise RuntimeError(f"ffmpeg concat failed: {result.stderr.decode(errors='ignore').strip()}")
+    finally:
+        os.remove(list_path)
+
+
+def _concat_reencode(segment_files, output_filename, size, options=None):
+    """
+    用 concat 滤镜拼接分辨率不同的分段：每个分段保持宽高比缩放并补黑边到 size 后重新编码
+    """
+    width, height = size
+    command = [get_ffmpeg_exe(), "-y", "-loglevel", "error"]
+    filters = []
+    for index, segment in enumerate(segment_files):
+        command += ["-i", segment]
+        filters.append(f"[{index}:v]scale={width}:{height}:force_original_aspect_ratio=decrease,"
+                       f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2,setsar=1[v{index}]")
+    inputs = "".join(f"[v{index}]" for index in range(len(segment_files)))
+    filters.append(f"{inputs}concat=n={len(segment_files)}:v=1:a=0[out]")
+    command += ["-filter_complex", ";".join(filters), "-map", "[out]", "-an", "-c:v", "libx264"]
+    if options:
+        command += ["-preset", options["preset"], "-crf", str(options["crf"]), "-threads", str(options["threads"]),
+                    "-pix_fmt", options["pix_fmt"]]
+    else:
+        command += ["-pix_fmt", "yuv420p"]
+    command.append(output_filename)
+    result = subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg concat failed: {result.stderr.decode(errors='ignore').strip()}")
+
+
+class LiveVideoEncoder:
+    """
+    实时分段编码器：每采集一帧就写入当天的视频分段，停止采集后只需无损拼接。
+    分段目录结构: <segments_root>/<date>/segment_0001.mp4 + segments.json
+    只有正常关闭的分段才会写入 segments.json，崩溃时未完成的分段会被忽略。
+    """
+
+    INDEX_NAME = "segments.json"
+
+    def __init__(self, segments_root="segments", segment_frames=300, fourcc="mp4v"):
+        """
+        Args:
+            segments_root (str): 分段存储根目录
+            segment_frames (int): 每个分段的最大帧数
+            fourcc (str): OpenCV VideoWriter 使用的编码 FourCC
+        """
+        self.segments_root = segments_root
+        self.segment_frames = segment_frames
+        self.fourcc = fourcc
+        self.date_str = None
+        self.writer = None
+        self.segment_path = None
+        self.segment_fps = None
+        self.segment_size = None
+        self.segment_count = 0
+        self._lock = threading.Lock()  # 写入线程与界面线程（生成视频时关闭分段）互斥
+
+    def _segments_dir(self, date_str):
+        return os.path.join(self.segments_root, date_str)
+
+    def load_index(self, date_str):
+        """
+        加载指定日期的分段索引
+        Returns:
+            list: [{file, fps, frames, size}]
+        """
+        index_path = os.path.join(self._segments_dir(date_str), self.INDEX_NAME)
+        if not os.path.exists(index_path):
+            return []
+        with open(index_path, "r") as f:
+            return json.load(f)
+
+    def _save_index(self, date_str, index):
+        index_path = os.path.join(self._segments_dir(date_str), self.INDEX_NAME)
+        tmp_path = index_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(index, f, indent=4)
+        os.replace(tmp_path, index_path)
+
+    def _open_segment(self, date_str, fps, size):
+        segments_dir = self._segments_dir(date_str)
+        os.makedirs(segments_dir, exist_ok=True)
+        index = self.load_index(date_str)
+        number = len(index) + 1
+        segment_path = os.path.join(segments_dir, f"segment_{number:04d}.mp4")
+        while os.path.exists(segment_path):
+            # 上次崩溃遗留的未完成分段，跳过其编号
+            number += 1
+            segment_path = os.path.join(segments_dir, f"segment_{number:04d}.mp4")
+        writer = cv2.VideoWriter(segment_path, cv2.VideoWriter_fourcc(*self.fourcc), fps, size)
+        if not writer.isOpened():
+            raise RuntimeError(f"Cannot open video segment {segment_path}")
+        self.writer = writer
+        self.date_str = date_str
+        self.segment_path = segment_path
+        self.segment_fps = fps
+        self.segment_size = size
+        self.segment_count = 0
+        logging.info(f"Opened live video segment: {segment_path}")
+
+    def write(self, frame, date_str, fps, bgr=False):
+        """
+        写入一帧
+        Args:
+            frame (PIL.Image | numpy.ndarray): 帧
+            date_str (str): 帧所属日期 'YYYY-MM-DD'
+            fps (int): 当前输出帧率
+            bgr (bool): frame 是否已经是 BGR 数组
+        """
+        frame_bgr = frame if bgr else cv2.cvtColor(np.asarray(frame), cv2.COLOR_RGB2BGR)
+        size = (frame_bgr.shape[1], frame_bgr.shape[0])
+        with self._lock:
+            if (self.writer is None or date_str != self.date_str or fps != self.segment_fps
+                    or size != self.segment_size or self.segment_count >= self.segment_frames):
+                self._close_segment()
+                self._open_segment(date_str, fps, size)
+            self.writer.write(frame_bgr)
+            self.segment_count += 1
+
+    def close(self):
+        """
+        关闭当前分段并登记到索引
+        """
+        with self._lock:
+            self._close_segment()
+
+    def _close_segment(self):
+        if self.writer is None:
+            return
+        self.writer.release()
+        self.writer = None
+        if self.segment_count > 0:
+            index = self.load_index(self.date_str)
+            index.append({
+                "file": os.path.basename(self.segment_path),
+                "fps": self.segment_fps,
+                "frames": self.segment_count,
+                "size": list(self.segment_size)
+            })
+            self._save_index(self.date_str, index)
+        else:
+            os.remove(self.segment_path)
+        self.segment_path = None
+        self.segment_count = 0
+
+    def get_segment_files(self, date_str, fps, expected_frames=None):
+        """
+        获取可直接拼接的分段列表
+        Args:
+            date_str (str): 日期
+            fps (int): 期望帧率，所有分段必须一致
+            expected_frames (int): 期望总帧数，不一致说明有未实时编码的帧
+        Returns:
+            list | None: 分段路径列表，无法直接拼接时返回 None
+        """
+        if date_str == self.date_str:
+            self.close()
+        index = self.load_index(date_str)
+        if not index:
+            return None
+        if any(entry["fps"] != fps for entry in index):
+            return None
+        if len({tuple(entry["size"]) for entry in index}) != 1:
+            return None
+        if expected_frames is not None and sum(entry["frames"] for entry in index) != expected_frames:
+            return None
+        segments_dir = self._segments_dir(date_str)
+        return [os.path.join(segments_dir, entry["file"]) for entry in index]
@@ -1,12 +1,48 @@
 import json
 import os
+import threading
+from collections import OrderedDict
 from datetime import datetime
-import matplotlib.pyplot as plt
+
+# 范围图表类型 -> 说明（task_totals 的周期或 trend / heatmap）
+RANGE_CHARTS = {
+    "day": "Daily totals per task",
+    "week": "Weekly totals per task",
+    "month": "Monthly totals per task",
+    "year": "Yearly totals per task",
+    "trend": "Daily trend with 7-day average",
+    "heatmap": "Hour-of-day heatmap",
+}
+
+# 各周期的横轴标签格式
+PERIOD_LABELS = {"day": "%Y-%m-%d", "week": "%Y-%m-%d", "month": "%Y-%m", "year": "%Y"}
 
 class LogVisualizer:
-    def __init__(self, log_file="task_log.json"):
+    """
+    每日学习时间图表。生成的图表按 (日期, 方向) 缓存，并记录生成时的当天数据，
+    当天任务记录变化后下次请求时重新生成。
+    使用 matplotlib.figure.Figure 而不是 pyplot，可以在后台线程中生成。
+    """
+
+    def __init__(self, log_file="task_log.json", storage=None, aggregates=None, cache_size=32):
+        """
+        Args:
+            log_file (str): 任务日志文件（未指定 storage / aggregates 时读取）
+            storage: 存储后端，按天读取任务记录
+            aggregates (AggregateIndex): 聚合索引，优先使用
+            cache_size (int): 最多缓存的图表数量
+        """
         self.log_file = log_file
-        self.load_logs()
+        self.storage = storage
+        self.aggregates = aggregates
+        self.cache_size = cache_size
+        self._figures = OrderedDict()  # (date_str, orientation) -> (task_times, Figure)
+        self._lock = threading.Lock()
+        self._analytics = None
+        # 有聚合索引或存储后端时按天查询，无需加载全部日志
+        self.logs = {}
+        if aggregates is None and storage is None:
+            self.load_logs()
 
     def load_logs(self):
         if not os.path.exists(self.log_file):
@@ -17,24 +53,41 @@ class LogVisualizer:
             self.logs = json.load(f)
 
     def visualize_daily_study_time(self, date_str, orientation='horizontal'):
-        if date_str not in self.logs:
-            print(f"No logs found for {date_str}.")
-            return None
-        tasks = self.logs[date_str]
-        task_times = {}
-        for task in tasks:
-            if task["end_time"]:
-                start = datetime.strptime(task["start_time"], "%Y-%m-%d %H:%M:%S")
-                end = datetime.strptime(task["end_time"], "%Y-%m-%d %H:%M:%S")
-                duration = (end - start).total_seconds() / 3600  # in hours
-                task_times[task["task_name"]] = task_times.get(task["task_name"], 0) + duration
+        """
+        获取某天的学习时间图表；当天数据与缓存时相同则直接返回缓存的图表
+        Returns:
+            matplotlib.figure.Figure | None: 没有已完成的任务时为 None
+        """
+        task_times = self.get_daily_data(date_str)
         if not task_times:
             print(f"No completed tasks for {date_str}.")
             return None
-        # Plotting
+        key = (date_str, orientation)
+        with self._lock:
+            cached = self._figures.get(key)
+            if cached is not None and cached[0] == task_times:
+                self._figures.move_to_end(key)
+                return cached[1]
+        fig = self.build_figure(date_str, task_times, orientation)
+        with self._lock:
+            self._figures[key] = (task_times, fig)
+            self._figures.move_to_end(key)
+            while len(self._figures) > self.cache_size:
+                self._figures.popitem(last=False)
+        return fig
+
+    @staticmethod
+    def build_figure(date_str, task_times, orientation='horizontal'):
+        """
+        生成图表（matplotlib 在首次绘图时才导入，以缩短启动时间）
+        """
+        from matplotlib.figure import Figure
+
         tasks = list(task_times.keys())
         hours = list(task_times.values())
-        fig, ax = plt.subplots(figsize=(10, 6))
+        # 布局在绘制时按画布实际大小计算
+        fig = Figure(figsize=(10, 6), layout='tight')
+        ax = fig.subplots()
         if orientation == 'horizontal':
             ax.barh(tasks, hours, color='skyblue')
             ax.set_xlabel('Hours Spent')
@@ -45,14 +98,88 @@ class LogVisualizer:
             ax.set_ylabel('Hours Spent')
         ax.set_title(f'Study Time for {date_str}')
         ax.tick_params(axis='y', rotation=45)
-        plt.tight_layout()
+        return fig
+
+    @property
+    def analytics(self):
+        """
+        范围统计（首次使用时创建，analytics 模块依赖 NumPy）
+        """
+        if self._analytics is None:
+            from analytics import RangeAnalytics
+            from storage import JsonStorage
+
+            self._analytics = RangeAnalytics(self.storage or JsonStorage(log_file=self.log_file))
+        return self._analytics
+
+    def invalidate(self):
+        """
+        任务记录变化后调用：范围统计在下次查询时重新加载（单日图表按当天数据自动失效）
+        """
+        if self._analytics is not None:
+            self._analytics.invalidate()
+
+    def visualize_range(self, start_date, end_date, chart="week", today=None):
+        """
+        生成日期范围的统计图表
+        Args:
+            start_date (str): 起始日期 'YYYY-MM-DD'
+            end_date (str): 结束日期 'YYYY-MM-DD'
+            chart (str): RANGE_CHARTS 中的类型
+            today (str): 计算当前连续天数的日期，默认今天
+        Returns:
+            matplotlib.figure.Figure | None: 范围内没有记录时为 None
+        """
+        from matplotlib.figure import Figure
+
+        analytics = self.analytics
+        if not analytics.table.select(start_date, end_date).any():
+            print(f"No completed tasks between {start_date} and {end_date}.")
+            return None
+        fig = Figure(figsize=(10, 6), layout='tight')
+        ax = fig.subplots()
+        title = f'{RANGE_CHARTS[chart]}, {start_date} to {end_date}'
+        if chart == "heatmap":
+            from analytics import WEEKDAYS
+
+            heatmap = analytics.hour_heatmap(start_date, end_date)
+            image = ax.imshow(heatmap, aspect='auto', cmap='Blues')
+            ax.set_yticks(range(7), WEEKDAYS)
+            ax.set_xticks(range(0, 24, 2))
+            ax.set_xlabel('Hour of Day')
+            fig.colorbar(image, ax=ax, label='Hours Spent')
+        elif chart == "trend":
+            days, hours, average = analytics.rolling_average(start_date, end_date, window=7)
+            dates = days.astype(datetime)
+            ax.bar(dates, hours, color='skyblue', label='Daily')
+            ax.plot(dates, average, color='tab:blue', label='7-day average')
+            ax.set_ylabel('Hours Spent')
+            ax.legend()
+            fig.autofmt_xdate()
+            streaks = analytics.streaks(today or datetime.now().strftime('%Y-%m-%d'))
+            title += f"\nCurrent streak: {streaks['current']} days, longest: {streaks['longest']} days"
+            if streaks['longest']:
+                title += f" ({streaks['longest_start']} to {streaks['longest_end']})"
+        else:
+            periods, task_names, hours = analytics.task_totals(start_date, end_date, chart)
+            labels = [period.strftime(PERIOD_LABELS[chart]) for period in periods.astype(datetime)]
+            bottom = 0.0
+            for index, task_name in enumerate(task_names):
+                ax.bar(labels, hours[:, index], bottom=bottom, label=task_name)
+                bottom = bottom + hours[:, index]
+            ax.set_ylabel('Hours Spent')
+            ax.legend(fontsize='small')
+            ax.tick_params(axis='x', rotation=45)
+        ax.set_title(title)
         return fig
 
     def get_daily_data(self, date_str):
-        if date_str not in self.logs:
+        if self.aggregates is not None:
+            return {task: seconds / 3600 for task, seconds in self.aggregates.get_day(date_str).items()}
+        tasks = self.storage.get_sessions(date_str) if self.storage is not None else self.logs.get(date_str)
+        if not tasks:
             print(f"No logs found for {date_str}.")
             return {}
-        tasks = self.logs[date_str]
         task_times = {}
         for task in tasks:
             if task["end_time"]:
@@ -65,4 +192,7 @@ class LogVisualizer:
 if __name__ == "__main__":
     visualizer = LogVisualizer()
     date = input("Enter date (YYYY-MM-DD): ")
-    visualizer.visualize_daily_study_time(date)
\ No newline at end of file
+    fig = visualizer.visualize_daily_study_time(date)
+    if fig:
+        fig.savefig(f"study_time_{date}.png")
+        print(f"Chart saved to study_time_{date}.png")